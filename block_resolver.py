@@ -0,0 +1,189 @@
+import bisect
+import threading
+from log_scanner import rpc_call, SONIC_RPC_URL
+
+ANCHOR_TOLERANCE = 60  # Seconds; bracketing anchors closer than this are interpolated without any lookup
+MAX_INTERPOLATION_GAP = 900  # Seconds; widest anchor gap we'll still interpolate across after refinement
+MAX_HEADER_READS = 6  # Binary/interpolation search header reads before giving up on the RPC
+MAX_ANCHORS = 20_000  # Thinned out when exceeded so memory stays bounded
+DEFAULT_BLOCK_TIME = 0.5  # Seconds per block, only used before two anchors are known
+
+_lock = threading.Lock()
+_anchor_times = []  # Sorted block timestamps
+_anchor_blocks = []  # Block numbers, parallel to _anchor_times
+
+def _to_int(value):
+    """Hex string or int -> int (None stays None)."""
+    if value is None or isinstance(value, int):
+        return value
+    return int(value, 16) if value.startswith("0x") else int(value)
+
+def add_anchor(timestamp, block_number):
+    """Remember that `block_number` was produced at `timestamp` (unix seconds)."""
+    if timestamp is None or block_number is None:
+        return
+    timestamp, block_number = int(timestamp), int(block_number)
+    with _lock:
+        i = bisect.bisect_left(_anchor_times, timestamp)
+        # Same timestamp already known: keep the lowest block so lookups stay "closest before".
+        if i < len(_anchor_times) and _anchor_times[i] == timestamp:
+            _anchor_blocks[i] = min(_anchor_blocks[i], block_number)
+            return
+        _anchor_times.insert(i, timestamp)
+        _anchor_blocks.insert(i, block_number)
+        if len(_anchor_times) > MAX_ANCHORS:
+            # Drop every other anchor but keep the newest, which is the most useful for "N hours ago".
+            del _anchor_times[-2::-2]
+            del _anchor_blocks[-2::-2]
+
+def add_anchors_from_logs(logs):
+    """Collect anchors from scanned logs (Etherscan `timeStamp`, RPC `blockTimestamp` where the node provides it)."""
+    for log in logs or []:
+        timestamp = log.get("timeStamp") or log.get("blockTimestamp")
+        if timestamp:
+            try:
+                add_anchor(_to_int(timestamp), _to_int(log.get("blockNumber")))
+            except (TypeError, ValueError):
+                continue
+
+def add_anchor_from_header(header):
+    """Collect an anchor from an eth_getBlockByNumber result."""
+    if header:
+        add_anchor(_to_int(header.get("timestamp")), _to_int(header.get("number")))
+
+def _read_header(block):
+    """Fetch a block header from the RPC and record it as an anchor. Returns (timestamp, block) or None."""
+    try:
+        header = rpc_call("eth_getBlockByNumber", [block if isinstance(block, str) else hex(block), False])
+    except Exception as e:
+        print(f"⚠️ Header read for block {block} failed: {e}")
+        return None
+    if not header:
+        return None
+    add_anchor_from_header(header)
+    return _to_int(header["timestamp"]), _to_int(header["number"])
+
+def _bracket(timestamp):
+    """Nearest anchors at-or-before and after `timestamp`, each as (timestamp, block) or None."""
+    with _lock:
+        i = bisect.bisect_right(_anchor_times, timestamp)
+        lo = (_anchor_times[i - 1], _anchor_blocks[i - 1]) if i > 0 else None
+        hi = (_anchor_times[i], _anchor_blocks[i]) if i < len(_anchor_times) else None
+        cadence = DEFAULT_BLOCK_TIME
+        if len(_anchor_times) >= 2 and _anchor_blocks[-1] > _anchor_blocks[0]:
+            cadence = (_anchor_times[-1] - _anchor_times[0]) / (_anchor_blocks[-1] - _anchor_blocks[0])
+    return lo, hi, cadence
+
+def _interpolate(timestamp, lo, hi):
+    """Block at `timestamp` assuming a steady cadence between the two anchors."""
+    if hi[0] == lo[0]:
+        return lo[1]
+    return lo[1] + int((timestamp - lo[0]) * (hi[1] - lo[1]) / (hi[0] - lo[0]))
+
+def resolve_block(timestamp, fallback=None):
+    """
+    Block number closest before `timestamp`.
+    Interpolates between cached anchors when they're close enough; otherwise narrows the bracket with a
+    few header reads against the Sonic RPC; only when that isn't possible calls `fallback(timestamp)`
+    (e.g. Etherscan's getblocknobytime). Returns None if every source fails.
+    """
+    lo, hi, cadence = _bracket(timestamp)
+    if lo and lo[0] == timestamp:
+        return lo[1]
+    if lo and hi and hi[0] - lo[0] <= ANCHOR_TOLERANCE:
+        return _interpolate(timestamp, lo, hi)
+
+    reads = 0
+    while SONIC_RPC_URL and reads < MAX_HEADER_READS:
+        if hi is None:
+            # Nothing known after the target yet: the head is the natural upper bound.
+            head = _read_header("latest")
+            reads += 1
+            if head is None:
+                break
+            if head[0] <= timestamp:
+                return head[1]
+        else:
+            if lo is None:
+                guess = max(hi[1] - int((hi[0] - timestamp) / cadence), 0)
+            else:
+                if hi[1] - lo[1] <= 1:
+                    return lo[1]
+                guess = min(max(_interpolate(timestamp, lo, hi), lo[1] + 1), hi[1] - 1)
+            if _read_header(guess) is None:
+                break
+            reads += 1
+
+        lo, hi, cadence = _bracket(timestamp)
+        if lo and lo[0] == timestamp:
+            return lo[1]
+        if lo and hi and hi[0] - lo[0] <= ANCHOR_TOLERANCE:
+            return _interpolate(timestamp, lo, hi)
+
+    if lo and hi and hi[0] - lo[0] <= MAX_INTERPOLATION_GAP:
+        return _interpolate(timestamp, lo, hi)
+
+    if fallback is not None:
+        print(f"🕰️ No nearby block anchor for timestamp {timestamp}; falling back to block-by-time API.")
+        return fallback(timestamp)
+    return None
+
+def block_timestamps(blocks):
+    """
+    Real timestamps for block numbers, for rows that are stored and rolled up: an anchor at the block itself,
+    interpolation only between anchors on both sides at most ANCHOR_TOLERANCE seconds apart, otherwise the
+    block's header from the RPC. Returns {block: timestamp}; blocks that couldn't be dated are left out.
+    """
+    stamps = {}
+    rpc_ok = bool(SONIC_RPC_URL)
+    with _lock:
+        anchor_blocks = list(_anchor_blocks)
+        anchor_times = list(_anchor_times)
+    for block in sorted(set(blocks)):
+        i = bisect.bisect_left(anchor_blocks, block)
+        if i < len(anchor_blocks) and anchor_blocks[i] == block:
+            stamps[block] = anchor_times[i]
+            continue
+        if 0 < i < len(anchor_blocks) and anchor_times[i] - anchor_times[i - 1] <= ANCHOR_TOLERANCE:
+            lo = (anchor_times[i - 1], anchor_blocks[i - 1])
+            hi = (anchor_times[i], anchor_blocks[i])
+            stamps[block] = int(lo[0] + (block - lo[1]) * (hi[0] - lo[0]) / (hi[1] - lo[1]))
+            continue
+        if not rpc_ok:
+            continue
+        header = _read_header(block)
+        if header is None:
+            rpc_ok = False  # Don't hammer a failing RPC; the rest are dated on a later pass
+            continue
+        stamps[block] = header[0]
+        with _lock:  # The header is an anchor now, and may date the next blocks without another read
+            anchor_blocks = list(_anchor_blocks)
+            anchor_times = list(_anchor_times)
+    return stamps
+
+def estimate_timestamps(blocks):
+    """
+    Approximate timestamps for many block numbers at once, interpolated between cached anchors
+    (extrapolated at the recent cadence beyond them). No network calls. Returns a list parallel to `blocks`,
+    or None if no anchors are known yet.
+    """
+    with _lock:
+        if not _anchor_blocks:
+            return None
+        anchor_blocks = list(_anchor_blocks)
+        anchor_times = list(_anchor_times)
+    _, _, cadence = _bracket(anchor_times[-1])
+
+    timestamps = []
+    for block in blocks:
+        i = bisect.bisect_right(anchor_blocks, block)
+        if 0 < i < len(anchor_blocks):
+            lo = (anchor_times[i - 1], anchor_blocks[i - 1])
+            hi = (anchor_times[i], anchor_blocks[i])
+            span = hi[1] - lo[1]
+            timestamps.append(lo[0] + (block - lo[1]) * (hi[0] - lo[0]) / span if span else lo[0])
+        elif i == 0:
+            timestamps.append(anchor_times[0] - (anchor_blocks[0] - block) * cadence)
+        else:
+            timestamps.append(anchor_times[-1] + (block - anchor_blocks[-1]) * cadence)
+    return timestamps
@@ -0,0 +1,46 @@
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal
+from checkpoints import atomic_write_json
+
+BOT_STATE_FILE = "/data/bot_state.json"  # /data is the mounted volume
+# State older than this is ignored at startup: the bot boots paused and cold, as it did before warm starts
+WARM_START_MAX_AGE = int(os.getenv("WARM_START_MAX_AGE", "86400"))
+
+def load_state(path=BOT_STATE_FILE, max_age=WARM_START_MAX_AGE):
+    """
+    The last saved state (pause flag and reason, report anchor, queue/balance snapshot, deposit watcher
+    state, decode cache), or {} if there is none, it can't be read, or it is older than `max_age` seconds.
+    """
+    try:
+        with open(path, "r") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"⚠️ Bot state file unreadable ({e}); starting cold.")
+        return {}
+    if not isinstance(state, dict):
+        return {}
+    age = time.time() - state.get("saved_at", 0)
+    if age > max_age:
+        print(f"🧊 Bot state is {age / 3600:,.1f} h old; starting cold.")
+        return {}
+    return state
+
+def _encode(value):
+    """JSON fallback for the state's non-JSON values (the staking balance is a Decimal)."""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def save_state(state, path=BOT_STATE_FILE):
+    """Atomically write `state` (stamped with saved_at). Failures are logged, never raised."""
+    try:
+        atomic_write_json(path, dict(state, saved_at=time.time()), default=_encode)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"⚠️ Could not save bot state: {e}")
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+BROADCAST_DEDUP_SECONDS = int(os.getenv("BROADCAST_DEDUP_SECONDS", "60"))  # Identical messages within this are merged
+CHANNEL_BURST = 5  # Discord lets a channel take 5 messages...
+CHANNEL_BURST_SECONDS = 5.0  # ...per 5 seconds
+
+class BroadcastQueue:
+    """
+    Outbound messages to every designated channel. Channels are resolved once by `resolve_channels()` and cached;
+    each channel has its own FIFO worker that keeps under Discord's per-channel rate limit, so one message reaches
+    all guilds in parallel while multi-part messages still arrive in order. The same message (the whole text, not
+    one of its parts) sent again within BROADCAST_DEDUP_SECONDS of reaching a channel, or while it is still being
+    sent, is merged into the first one instead of going out twice. A message no channel accepted can be re-sent.
+    """
+
+    def __init__(self, resolve_channels, dedup_seconds=BROADCAST_DEDUP_SECONDS):
+        self.resolve_channels = resolve_channels
+        self.dedup_seconds = dedup_seconds
+        self._channels = None
+        self._queues = {}  # channel id -> asyncio.Queue of (channel, message, future)
+        self._workers = {}  # channel id -> worker task
+        self._recent = {}  # message text -> time.monotonic() it last reached a channel
+        self._inflight = {}  # message text -> future resolved with True once it reached a channel, False if none
+        self.sent = 0
+        self.merged = 0
+        self.failed = 0
+
+    def channels(self):
+        """The cached designated channels, resolving them on first use."""
+        if self._channels is None:
+            self._channels = self.resolve_channels()
+            print(f"📣 Broadcasting to {len(self._channels)} designated channel(s).")
+        return self._channels
+
+    def invalidate_channels(self):
+        """Re-resolve channels on next use (guild joined/left, permissions changed, a send was refused)."""
+        self._channels = None
+
+    def _recently_sent(self, message, now):
+        for text in [t for t, sent_at in self._recent.items() if now - sent_at >= self.dedup_seconds]:
+            del self._recent[text]
+        return message in self._recent
+
+    async def _is_duplicate(self, message):
+        """True if `message` reached a channel recently, or does so from a copy still in flight."""
+        while message in self._inflight:
+            if await asyncio.shield(self._inflight[message]):
+                return True
+        return self._recently_sent(message, time.monotonic())
+
+    def _queue(self, channel):
+        worker = self._workers.get(channel.id)
+        if worker is None or worker.done():
+            self._queues[channel.id] = asyncio.Queue()
+            self._workers[channel.id] = asyncio.ensure_future(self._worker(self._queues[channel.id]))
+        return self._queues[channel.id]
+
+    async def _worker(self, queue):
+        sent_times = deque(maxlen=CHANNEL_BURST)
+        while True:
+            channel, message, future = await queue.get()
+            if len(sent_times) == CHANNEL_BURST:
+                wait = sent_times[0] + CHANNEL_BURST_SECONDS - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)  # Stay inside the channel's bucket instead of collecting 429s
+            try:
+                await channel.send(message)
+                sent_times.append(time.monotonic())
+                self.sent += 1
+                ok = True
+            except Exception as send_error:
+                print(f"Error sending message to channel {channel.name}: {send_error}")
+                self.failed += 1
+                ok = False
+            if not future.done():
+                future.set_result(ok)
+
+    async def broadcast(self, message, parts=None, dedupe=True):
+        """
+        Send `message` to every designated channel concurrently, as `parts` (in order) if it was split for
+        Discord's length limit, and wait until each channel has sent it (or failed). De-duplication is keyed by
+        the whole message. Returns the number of channels that took every part; 0 if it was merged into a duplicate.
+        """
+        if dedupe and await self._is_duplicate(message):
+            self.merged += 1
+            print(f"📣 Merged a duplicate broadcast ({message[:60]!r}...).")
+            return 0
+
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        if dedupe:
+            self._inflight[message] = done
+        reached = 0
+        try:
+            per_channel = []
+            for channel in self.channels():
+                futures = []
+                for part in parts or [message]:
+                    future = loop.create_future()
+                    self._queue(channel).put_nowait((channel, part, future))
+                    futures.append(future)
+                per_channel.append(asyncio.gather(*futures))
+            results = await asyncio.gather(*per_channel)
+            reached = sum(all(channel_results) for channel_results in results)
+            if not all(all(channel_results) for channel_results in results):
+                self.invalidate_channels()  # A channel may be gone or no longer writable
+            if dedupe and any(any(channel_results) for channel_results in results):
+                self._recent[message] = time.monotonic()  # Only now: a message nobody accepted stays re-sendable
+        finally:
+            if dedupe:
+                self._inflight.pop(message, None)
+            done.set_result(message in self._recent)
+        return reached
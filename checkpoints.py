@@ -0,0 +1,115 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+CHECKPOINT_FILE = "/data/checkpoints.json"  # /data is the mounted volume
+LEGACY_CHECKPOINT_FILE = "/data/last_scanned_block.json"  # Pre-cursor format, migrated on first load
+REORG_DEPTH = int(os.getenv("REORG_DEPTH", "16"))  # Blocks rescanned when a checkpointed block hash changes
+# resume_block calls between block-hash checks; each check is one uncached header lookup
+REORG_CHECK_EVERY = int(os.getenv("REORG_CHECK_EVERY", "6"))
+
+_lock = threading.Lock()
+_cursors = None  # stream name -> {"block": int, "hash": str|None, "updated_at": float}
+_reorg_checks = {}  # stream name -> {"calls": resume_block calls since the last check, "verified_block": int}
+
+def atomic_write_json(path, data, default=None):
+    """
+    Write JSON so readers only ever see the old or the new file: write to a temp file in the same
+    directory, fsync it, rename it over the target, then fsync the directory entry.
+    `default` is passed to json.dump for values it can't encode itself.
+    """
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, default=default)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass  # Not every filesystem lets you fsync a directory
+
+def _load():
+    """Load cursors from disk once (migrating the legacy single-block file if that's all there is)."""
+    global _cursors
+    if _cursors is not None:
+        return _cursors
+    try:
+        with open(CHECKPOINT_FILE, "r") as f:
+            _cursors = json.load(f).get("streams", {})
+            return _cursors
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, AttributeError) as e:
+        print(f"🚨 Checkpoint file unreadable ({e}); falling back to legacy checkpoint if present.")
+
+    _cursors = {}
+    try:
+        with open(LEGACY_CHECKPOINT_FILE, "r") as f:
+            legacy_block = json.load(f).get("last_scanned_block")
+        if legacy_block is not None:
+            print(f"📦 Migrating legacy last_scanned_block {legacy_block} into the deposits cursor.")
+            _cursors["deposits"] = {"block": int(legacy_block), "hash": None, "updated_at": time.time()}
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError, TypeError, ValueError):
+        pass
+    return _cursors
+
+def get_cursor(stream):
+    """The stream's cursor as {"block", "hash", "updated_at"}, or None if it has never been saved."""
+    with _lock:
+        cursor = _load().get(stream)
+        return dict(cursor) if cursor else None
+
+def set_cursor(stream, block_number, block_hash=None):
+    """Advance a stream's cursor and persist every cursor atomically."""
+    with _lock:
+        cursors = _load()
+        cursors[stream] = {"block": int(block_number), "hash": block_hash, "updated_at": time.time()}
+        atomic_write_json(CHECKPOINT_FILE, {"streams": cursors})
+
+def resume_block(stream, fetch_block_hash=None, reorg_depth=REORG_DEPTH, on_reorg=None, check_every=REORG_CHECK_EVERY):
+    """
+    First block the stream should scan next, or None if it has no cursor yet.
+    On the first call and every `check_every` calls after it, the cursor's recorded block hash is compared with
+    `fetch_block_hash(block)`. If it changed, the chain reorganised under us: rewind `reorg_depth` blocks before
+    the last block that passed a check (blocks scanned since then aren't trusted either), call
+    `on_reorg(rewind_block)` so derived state can be dropped, and resume from there.
+    A failed hash lookup resumes normally and is retried on the next call.
+    """
+    cursor = get_cursor(stream)
+    if cursor is None:
+        return None
+    block_number, saved_hash = cursor["block"], cursor.get("hash")
+    if not saved_hash or fetch_block_hash is None:
+        return block_number + 1
+
+    check = _reorg_checks.setdefault(stream, {"calls": 0, "verified_block": None})
+    if check["verified_block"] is not None and check["calls"] + 1 < check_every:
+        check["calls"] += 1
+        return block_number + 1
+
+    current_hash = fetch_block_hash(block_number)
+    if not current_hash:
+        return block_number + 1
+    if current_hash.lower() != saved_hash.lower():
+        last_good = min(block_number, check["verified_block"] if check["verified_block"] is not None else block_number)
+        rewind_block = max(last_good - reorg_depth + 1, 0)
+        print(f"🔀 Reorg detected on '{stream}' at block {block_number}; rescanning from block {rewind_block}.")
+        check.update(calls=0, verified_block=None)  # The rescan's new cursor is checked on the next call
+        if on_reorg is not None:
+            on_reorg(rewind_block)
+        return rewind_block
+    check.update(calls=0, verified_block=block_number)
+    return block_number + 1
@@ -0,0 +1,132 @@
+import os
+from web3 import Web3
+from eth_abi.abi import decode
+
+DECIMALS = 10**18  # Convert wei to human-readable format
+
+# Staking contract events, as (name, signature, indexed params, data params).
+# Topics are derived from the signatures so there are no magic hashes to get wrong.
+EVENT_SPECS = [
+    ("Deposited", "Deposited(address,uint256,uint256)",
+     [("user", "address")], [("amountAssets", "uint256"), ("amountShares", "uint256")]),
+    ("Undelegated", "Undelegated(address,uint256,uint256,uint256,uint8)",
+     [("user", "address")], [("withdrawId", "uint256"), ("validatorId", "uint256"), ("amountAssets", "uint256"), ("kind", "uint8")]),
+    ("Withdrawn", "Withdrawn(address,uint256,uint256,uint8,bool)",
+     [("user", "address")], [("withdrawId", "uint256"), ("amountAssets", "uint256"), ("kind", "uint8"), ("emergency", "bool")]),
+    ("OperatorClawBackInitiated", "OperatorClawBackInitiated(uint256,uint256,uint256)",
+     [("withdrawId", "uint256"), ("validatorId", "uint256")], [("amountAssets", "uint256")]),
+    ("OperatorClawBackExecuted", "OperatorClawBackExecuted(uint256,uint256,bool)",
+     [("withdrawId", "uint256")], [("amountAssets", "uint256"), ("emergency", "bool")]),
+]
+EVENTS = {
+    Web3.to_hex(Web3.keccak(text=signature)): {"name": name, "indexed": indexed, "data": data}
+    for name, signature, indexed, data in EVENT_SPECS
+}
+TOPIC_BY_NAME = {spec["name"]: topic for topic, spec in EVENTS.items()}
+# Comma-separated event names the watcher pulls alongside deposits (all known events by default)
+WATCHED_EVENTS = [
+    name.strip() for name in os.getenv("WATCHED_EVENTS", ",".join(TOPIC_BY_NAME)).split(",") if name.strip() in TOPIC_BY_NAME
+]
+
+def topics_for(names):
+    """topic0 hashes for the given event names, in the same order."""
+    return [TOPIC_BY_NAME[name] for name in names]
+
+def _to_int(value):
+    if value is None or isinstance(value, int):
+        return value
+    return int(value, 16) if value.startswith("0x") else int(value)
+
+def _decode_topic(topic, abi_type):
+    topic = topic if isinstance(topic, str) else Web3.to_hex(topic)
+    if abi_type == "address":
+        return "0x" + topic[-40:].lower()
+    return int(topic, 16)
+
+def decode_event(log):
+    """
+    Decode a raw log (Etherscan or RPC shape) of any known staking event into
+    {"event", "block_number", "log_index", "tx_hash", "args"}; amounts stay in wei, with an `amount`
+    float (tokens) added when the event carries amountAssets. Returns None for unknown or malformed logs.
+    """
+    topics = log.get("topics") or []
+    topic0 = topics[0] if topics and isinstance(topics[0], str) else (Web3.to_hex(topics[0]) if topics else None)
+    spec = EVENTS.get(topic0.lower()) if topic0 else None
+    if spec is None:
+        return None
+    try:
+        args = {name: _decode_topic(topics[i + 1], abi_type) for i, (name, abi_type) in enumerate(spec["indexed"])}
+        data = log.get("data") or "0x"
+        data = bytes.fromhex(data[2:] if data.startswith("0x") else data) if isinstance(data, str) else bytes(data)
+        values = decode([abi_type for _, abi_type in spec["data"]], data)
+        args.update({name: value for (name, _), value in zip(spec["data"], values)})
+    except Exception as e:
+        print(f"Error decoding {spec['name']} log: {e}")
+        return None
+
+    event = {
+        "event": spec["name"],
+        "block_number": _to_int(log.get("blockNumber")),
+        "log_index": _to_int(log.get("logIndex")),
+        "tx_hash": log.get("transactionHash", "N/A"),
+        "args": args,
+    }
+    if "amountAssets" in args:
+        event["amount"] = args["amountAssets"] / DECIMALS
+    return event
+
+def dispatch(logs, handlers):
+    """
+    Decode each log once and hand it to `handlers[event_name](event)`. Logs without a handler are skipped.
+    Returns {event_name: count} of the events dispatched.
+    """
+    counts = {}
+    for log in logs or []:
+        topics = log.get("topics") or []
+        if not topics:
+            continue
+        spec = EVENTS.get(topics[0].lower() if isinstance(topics[0], str) else Web3.to_hex(topics[0]))
+        if spec is None or spec["name"] not in handlers:
+            continue
+        event = decode_event(log)
+        if event is None:
+            continue
+        handlers[event["event"]](event)
+        counts[event["event"]] = counts.get(event["event"], 0) + 1
+    return counts
+
+class FlowTally:
+    """Running per-event totals (count and tokens) for net-flow reporting, fed as a dispatch handler."""
+
+    def __init__(self):
+        self.counts = {}
+        self.amounts = {}
+        self.first_block = None
+        self.last_block = None
+
+    def handle(self, event):
+        name = event["event"]
+        self.counts[name] = self.counts.get(name, 0) + 1
+        self.amounts[name] = self.amounts.get(name, 0.0) + event.get("amount", 0.0)
+        block = event["block_number"]
+        if block is not None:
+            self.first_block = block if self.first_block is None else min(self.first_block, block)
+            self.last_block = block if self.last_block is None else max(self.last_block, block)
+
+    def handlers(self, names=None):
+        """A handlers dict routing every named event (default: all known) into this tally."""
+        return {name: self.handle for name in (names or TOPIC_BY_NAME)}
+
+    def net_flow(self):
+        """Deposited minus Withdrawn tokens."""
+        return self.amounts.get("Deposited", 0.0) - self.amounts.get("Withdrawn", 0.0)
+
+    def summary_text(self):
+        """Discord-ready net-flow block."""
+        if not self.counts:
+            return "🔁 **Contract flows:** no staking events seen yet."
+        lines = [f"🔁 **Contract flows** (blocks {self.first_block}–{self.last_block}): net {self.net_flow():+,.1f} S"]
+        for name in TOPIC_BY_NAME:
+            if name in self.counts:
+                lines.append(f"- **{name}**: {self.counts[name]:,} events, {self.amounts[name]:,.1f} S")
+        return "\n".join(lines)
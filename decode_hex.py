@@ -1,8 +1,33 @@
 from eth_utils import decode_hex
 from eth_abi.abi import decode
 
+DECODE_CACHE_SIZE = 256  # Decoded calldata kept; the queue only ever holds a handful of distinct payloads
+_decode_cache = {}  # hex data -> decoded dict
+
 def decode_hex_data(hex_data):
-    """Decode hex-encoded data for the staking contract."""
+    """Decode hex-encoded data for the staking contract (cached: the same queue is decoded on every recheck)."""
+    cached = _decode_cache.get(hex_data)
+    if cached is not None:
+        return dict(cached)
+    decoded = _decode_hex_data(hex_data)
+    if decoded is not None:
+        if len(_decode_cache) >= DECODE_CACHE_SIZE:
+            del _decode_cache[next(iter(_decode_cache))]  # Drop the oldest entry
+        _decode_cache[hex_data] = decoded
+        return dict(decoded)
+    return None
+
+def export_decode_cache():
+    """The decode cache as a JSON-ready dict, for the warm-start state file."""
+    return dict(_decode_cache)
+
+def load_decode_cache(entries):
+    """Seed the decode cache from export_decode_cache() output."""
+    for hex_data, decoded in list((entries or {}).items())[-DECODE_CACHE_SIZE:]:
+        if isinstance(decoded, dict) and "validatorId" in decoded and "amountInTokens" in decoded:
+            _decode_cache[hex_data] = decoded
+
+def _decode_hex_data(hex_data):
     try:
         # Remove the 0x prefix if it exists
         hex_data = hex_data[2:] if hex_data.startswith("0x") else hex_data
@@ -0,0 +1,67 @@
+import os
+from checkpoints import get_cursor, set_cursor
+from http_transport import rate_limit_headroom
+from deposit_index import uncovered_ranges, record_deposits
+from deposit_monitor import fetch_deposit_logs, get_latest_block, log_backend_url, get_contract_deploy_block
+
+BACKFILL_ENABLED = os.getenv("DEPOSIT_BACKFILL", "true").lower() in ("1", "true", "yes")
+BACKFILL_STREAM = "deposit_backfill"  # Checkpoint cursor: last block the backfill has indexed
+BACKFILL_INTERVAL = 2  # Seconds between backfill steps
+BACKFILL_INITIAL_RANGE = 25_000  # Blocks per step to start with
+BACKFILL_MIN_RANGE = 500  # A range that still fails at this size is retried on the next step
+BACKFILL_MAX_RANGE = 200_000
+BACKFILL_SPARSE_LOGS = 250  # Fewer logs than this in a range -> double the next range
+# Fraction of the backend's rate-limit bucket that must be free before the backfill spends a request;
+# below it the backfill sits out so the live watcher and commands get the budget.
+BACKFILL_MIN_HEADROOM = float(os.getenv("BACKFILL_MIN_HEADROOM", "0.5"))
+
+_span = BACKFILL_INITIAL_RANGE
+_target_block = None  # Head when this process started backfilling; the live watcher covers everything after it
+
+def backfill_step():
+    """
+    Index the next range of deposit history, from the contract's deploy block towards the head, skipping blocks the
+    index already covers, and checkpoint after the range. Blocking; run it in a thread from the Discord loop.
+    Returns "done", "progress", "yielded" (rate-limit budget tight) or "error" (including while the deploy block
+    is unknown: the backfill doesn't start from genesis).
+    """
+    global _span, _target_block
+    deploy_block = get_contract_deploy_block()
+    if deploy_block is None:
+        return "error"
+    cursor = get_cursor(BACKFILL_STREAM)
+    next_block = cursor["block"] + 1 if cursor else deploy_block
+
+    if _target_block is None:
+        if rate_limit_headroom(log_backend_url()) < BACKFILL_MIN_HEADROOM:
+            return "yielded"
+        _target_block = get_latest_block()
+        if _target_block is None:
+            return "error"
+    if next_block > _target_block:
+        return "done"
+
+    end_block = min(next_block + _span - 1, _target_block)
+    gaps = uncovered_ranges(next_block, end_block)
+    if gaps is None:
+        return "error"
+
+    for gap_start, gap_end in gaps:
+        if rate_limit_headroom(log_backend_url()) < BACKFILL_MIN_HEADROOM:
+            return "yielded"  # Cursor still points before this gap, so nothing is skipped
+        logs = fetch_deposit_logs(gap_start, gap_end)
+        if logs is None:
+            _span = max(_span // 2, BACKFILL_MIN_RANGE)
+            print(f"✂️ Backfill range {gap_start}-{gap_end} failed; next range size {_span}.")
+            if gap_start > next_block:
+                set_cursor(BACKFILL_STREAM, gap_start - 1)
+            return "error"
+        if not record_deposits(logs, gap_start, gap_end):
+            return "error"
+        if len(logs) < BACKFILL_SPARSE_LOGS:
+            _span = min(_span * 2, BACKFILL_MAX_RANGE)
+
+    set_cursor(BACKFILL_STREAM, end_block)
+    total = max(_target_block - deploy_block, 1)
+    print(f"📚 Backfill indexed up to block {end_block} ({(end_block - deploy_block) / total:.1%} of history).")
+    return "done" if end_block >= _target_block else "progress"
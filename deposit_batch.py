@@ -0,0 +1,191 @@
+import heapq
+import math
+from array import array
+from block_resolver import estimate_timestamps
+
+DECIMALS = 10**18  # Convert wei to human-readable format
+SENDER_BYTES = 20
+TX_HASH_BYTES = 32
+PERCENTILES = (50, 90, 99)
+TOP_DEPOSITORS = 5
+PERCENTILE_BUCKET_RATIO = 1.01  # Amount histogram bucket width: percentiles are exact to within 1%
+HOUR_CHUNK_ROWS = 5_000  # Rows whose timestamps are estimated together for the per-hour histogram
+DEBANK_URL = "https://debank.com/profile/"
+
+def _strip_0x(value):
+    return value[2:] if value.startswith("0x") else value
+
+class DepositBatch:
+    """
+    Column-oriented set of Deposit events: block numbers and amounts in typed arrays, senders and
+    tx hashes packed as fixed-width bytes. Roughly 70 bytes per deposit versus ~1 KB for a log dict.
+    Used for one scanned range at a time; window statistics are accumulated by DepositStats instead.
+    """
+
+    def __init__(self):
+        self.blocks = array("Q")  # Block numbers
+        self.amounts = array("d")  # Token amounts (assets / 1e18)
+        self.senders = bytearray()  # SENDER_BYTES per row
+        self.tx_hashes = bytearray()  # TX_HASH_BYTES per row
+        self.timestamps = None  # array("d"), filled lazily by block_timestamps()
+
+    def __len__(self):
+        return len(self.blocks)
+
+    @classmethod
+    def from_logs(cls, logs):
+        """
+        Bulk-decode raw Deposit logs (Etherscan or RPC shape). Each field is hex-decoded for the whole
+        batch in one bytes.fromhex call rather than row by row.
+        """
+        batch = cls()
+        if not logs:
+            return batch
+        batch.blocks = array("Q", (
+            int(log["blockNumber"], 16) if isinstance(log["blockNumber"], str) else int(log["blockNumber"])
+            for log in logs
+        ))
+        batch.senders = bytearray.fromhex("".join(_strip_0x(log["topics"][1])[-40:] for log in logs))
+        batch.tx_hashes = bytearray.fromhex("".join(_strip_0x(log.get("transactionHash") or "0" * 64) for log in logs))
+        # First 32-byte data word is `assets`; pad short/empty data so offsets stay fixed.
+        assets = bytes.fromhex("".join(_strip_0x(log.get("data") or "")[:64].ljust(64, "0") for log in logs))
+        batch.amounts = array("d", (
+            int.from_bytes(assets[i:i + 32], "big") / DECIMALS for i in range(0, len(assets), 32)
+        ))
+        return batch
+
+    def append(self, block_number, sender, tx_hash, amount):
+        """Add one decoded deposit (sender/tx_hash as 0x-hex strings)."""
+        self.blocks.append(block_number or 0)
+        self.amounts.append(amount)
+        self.senders += bytes.fromhex(_strip_0x(sender)[-40:].rjust(40, "0"))
+        self.tx_hashes += bytes.fromhex(_strip_0x(tx_hash if tx_hash and tx_hash != "N/A" else "").rjust(64, "0"))
+        self.timestamps = None
+
+    def sender(self, i):
+        return "0x" + self.senders[i * SENDER_BYTES:(i + 1) * SENDER_BYTES].hex()
+
+    def tx_hash(self, i):
+        return "0x" + self.tx_hashes[i * TX_HASH_BYTES:(i + 1) * TX_HASH_BYTES].hex()
+
+    def indices_at_least(self, threshold):
+        """Row indices whose amount is >= threshold, in block order."""
+        return [i for i, amount in enumerate(self.amounts) if amount >= threshold]
+
+    def total(self):
+        return math.fsum(self.amounts)
+
+    def block_timestamps(self):
+        """
+        Per-row timestamps estimated from the block resolver's anchors (cached on the batch),
+        or None if no anchors are known.
+        """
+        if self.timestamps is None:
+            estimated = estimate_timestamps(self.blocks)
+            if estimated is None:
+                return None
+            self.timestamps = array("d", estimated)
+        return self.timestamps
+
+class DepositStats:
+    """
+    Statistics for a window of deposits, accumulated one row at a time while the rows stream past, so a
+    summary never needs the window held in memory or a second pass: running count, total and max, an amount
+    histogram for percentiles, per-hour buckets and per-depositor totals (bounded by distinct depositors).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.amount_buckets = {}  # log(amount, PERCENTILE_BUCKET_RATIO) bucket -> count; amounts <= 0 under None
+        self.hours = {}  # hour_start_unix -> [count, total]; None once timestamps turned out to be unavailable
+        self.depositors = {}  # sender -> [total, count]
+        self._pending_blocks = array("Q")  # Rows waiting for their timestamps, estimated a chunk at a time
+        self._pending_amounts = array("d")
+
+    def __len__(self):
+        return self.count
+
+    def add(self, block_number, sender, amount):
+        """Fold one deposit into the statistics (sender as a 0x-hex string)."""
+        self.count += 1
+        self.total += amount
+        self.max = max(self.max, amount)
+        bucket = math.floor(math.log(amount, PERCENTILE_BUCKET_RATIO)) if amount > 0 else None
+        self.amount_buckets[bucket] = self.amount_buckets.get(bucket, 0) + 1
+        depositor = self.depositors.get(sender)
+        if depositor is None:
+            self.depositors[sender] = [amount, 1]
+        else:
+            depositor[0] += amount
+            depositor[1] += 1
+        if self.hours is not None:
+            self._pending_blocks.append(block_number or 0)
+            self._pending_amounts.append(amount)
+            if len(self._pending_blocks) >= HOUR_CHUNK_ROWS:
+                self._fold_hours()
+
+    def _fold_hours(self):
+        if self.hours is not None and self._pending_blocks:
+            estimated = estimate_timestamps(self._pending_blocks)
+            if estimated is None:
+                self.hours = None  # No block anchors: the summary leaves the hourly line out
+            else:
+                for timestamp, amount in zip(estimated, self._pending_amounts):
+                    bucket = self.hours.setdefault(int(timestamp) // 3600 * 3600, [0, 0.0])
+                    bucket[0] += 1
+                    bucket[1] += amount
+        self._pending_blocks = array("Q")
+        self._pending_amounts = array("d")
+
+    def percentiles(self, points=PERCENTILES):
+        """{p: amount} from the amount histogram (nearest rank), within PERCENTILE_BUCKET_RATIO of exact."""
+        if not self.count:
+            return {p: 0.0 for p in points}
+        ordered = sorted(self.amount_buckets.items(), key=lambda item: -math.inf if item[0] is None else item[0])
+        result = {}
+        for p in points:
+            rank = (self.count - 1) * p / 100
+            seen = 0
+            for bucket, count in ordered:
+                seen += count
+                if seen > rank:
+                    break
+            result[p] = 0.0 if bucket is None else min(PERCENTILE_BUCKET_RATIO ** (bucket + 0.5), self.max)
+        return result
+
+    def per_hour(self):
+        """Per-hour histogram as a sorted list of (hour_start_unix, count, total); empty if no anchors are known."""
+        self._fold_hours()
+        if not self.hours:
+            return []
+        return [(hour, count, total) for hour, (count, total) in sorted(self.hours.items())]
+
+    def top_depositors(self, n=TOP_DEPOSITORS):
+        """[(sender, total, count)] for the n largest depositors by total amount."""
+        top = heapq.nlargest(n, self.depositors.items(), key=lambda item: item[1][0])
+        return [(sender, total, count) for sender, (total, count) in top]
+
+    def summary_text(self):
+        """Discord-ready statistics block for !history / !deposits."""
+        if not self.count:
+            return "📊 **Deposit statistics:** no deposits in this window."
+
+        pct = self.percentiles()
+        lines = [
+            f"📊 **Deposit statistics:** {self.count:,} deposits totaling {self.total:,.1f} S tokens",
+            f"- **Median**: {pct[50]:,.1f} | **p90**: {pct[90]:,.1f} | **p99**: {pct[99]:,.1f} | **Max**: {self.max:,.1f}",
+        ]
+
+        hours = self.per_hour()
+        if hours:
+            busiest = heapq.nlargest(3, hours, key=lambda bucket: bucket[2])
+            lines.append(f"- **Active hours**: {len(hours)} | **Busiest**: " + ", ".join(
+                f"<t:{hour}:f> {total:,.0f} S ({count})" for hour, count, total in busiest
+            ))
+
+        lines.append("- **Top depositors**:")
+        for rank, (sender, total, count) in enumerate(self.top_depositors(), start=1):
+            lines.append(f"  {rank}. [{sender[:8]}…{sender[-4:]}](<{DEBANK_URL}{sender}>) {total:,.1f} S ({count} deposits)")
+        return "\n".join(lines)
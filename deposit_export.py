@@ -0,0 +1,164 @@
+import csv
+import gzip
+import io
+
+# Parquet output is optional; the bot runs fine without pyarrow installed.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+DISCORD_ATTACHMENT_LIMIT = 8 * 1024 * 1024  # Bytes; Discord's default upload cap
+PART_SIZE_MARGIN = 256 * 1024  # Headroom for data still buffered inside the compressor
+PARQUET_BATCH_ROWS = 10_000  # Rows per Parquet row group
+PARQUET_FIRST_BATCH_ROWS = 1_000  # First row group of a part is small, to measure bytes per row
+PARQUET_FOOTER_MARGIN = 64 * 1024  # Headroom for the footer (schema + row-group metadata) written on close
+PARQUET_SIZE_SAFETY = 1.5  # Later row groups may compress worse than the one measured
+EXPORT_FORMATS = ("csv", "parquet")
+CSV_HEADER = ["Tx Hash", "Depositor Address", "Deposit Amount", "Running Total"]
+
+def parquet_available():
+    """True if pyarrow is installed and Parquet exports can be offered."""
+    return pq is not None
+
+def collect_stats(deposits, stats):
+    """Pipeline stage: pass deposits through unchanged while folding them into a DepositStats."""
+    for deposit in deposits:
+        stats.add(deposit.get("block_number"), deposit["sender"], deposit["amount"])
+        yield deposit
+
+def with_running_total(deposits, summary):
+    """
+    Pipeline stage: attach a running total to each decoded deposit.
+    `summary` is updated in place with `count` and `total` as rows flow through.
+    """
+    summary.setdefault("count", 0)
+    summary.setdefault("total", 0.0)
+    for deposit in deposits:
+        summary["count"] += 1
+        summary["total"] += deposit["amount"]
+        yield {
+            "block_number": deposit.get("block_number"),
+            "tx_hash": deposit["tx_hash"],
+            "sender": deposit["sender"],
+            "amount": deposit["amount"],
+            "running_total": summary["total"],
+        }
+
+def _part_filename(base, part, extension):
+    return f"{base}{extension}" if part == 1 else f"{base}_part{part}{extension}"
+
+def iter_csv_gz_parts(rows, base_filename="all_deposits", max_bytes=DISCORD_ATTACHMENT_LIMIT):
+    """
+    Writer stage: stream rows into gzip-compressed CSV held in memory, starting a new part (with its own
+    header) whenever the compressed size nears `max_bytes`. Yields (filename, bytes) per finished part.
+    """
+    part = 1
+    buffer = None
+    gz = None
+    text = None
+    writer = None
+
+    def open_part():
+        nonlocal buffer, gz, text, writer
+        buffer = io.BytesIO()
+        gz = gzip.GzipFile(fileobj=buffer, mode="wb")
+        text = io.TextIOWrapper(gz, encoding="utf-8", newline="")
+        writer = csv.writer(text)
+        writer.writerow(CSV_HEADER)
+
+    def close_part():
+        text.flush()
+        text.detach()
+        gz.close()
+        return buffer.getvalue()
+
+    open_part()
+    rows_in_part = 0
+    for row in rows:
+        # Round both the deposit amount and the running total to 1 decimal place
+        writer.writerow([row["tx_hash"], row["sender"], f"{row['amount']:,.1f}", f"{row['running_total']:,.1f}"])
+        rows_in_part += 1
+        if buffer.tell() >= max_bytes - PART_SIZE_MARGIN:
+            yield _part_filename(base_filename, part, ".csv.gz"), close_part()
+            part += 1
+            rows_in_part = 0
+            open_part()
+
+    if rows_in_part:
+        yield _part_filename(base_filename, part, ".csv.gz"), close_part()
+
+def iter_parquet_parts(rows, base_filename="all_deposits", max_bytes=DISCORD_ATTACHMENT_LIMIT):
+    """
+    Writer stage: stream rows into in-memory Parquet files, one row group per PARQUET_BATCH_ROWS rows,
+    starting a new part whenever the file nears `max_bytes`. Bytes per row are measured from the last row
+    group written, and a row group is cut short when it would fill the part, so a part never overshoots.
+    Yields (filename, bytes) per finished part.
+    """
+    if pq is None:
+        raise RuntimeError("Parquet export needs pyarrow installed.")
+
+    schema = pa.schema([
+        ("block_number", pa.int64()),
+        ("tx_hash", pa.string()),
+        ("sender", pa.string()),
+        ("amount", pa.float64()),
+        ("running_total", pa.float64()),
+    ])
+    part = 1
+    buffer = io.BytesIO()
+    writer = pq.ParquetWriter(buffer, schema, compression="zstd")
+    rows_in_part = 0
+    batch = []
+    bytes_per_row = None  # Measured from the last row group written
+
+    def flush_batch():
+        nonlocal bytes_per_row
+        before = buffer.tell()
+        columns = {name: [row[name] for row in batch] for name in schema.names}
+        writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+        bytes_per_row = (buffer.tell() - before) / len(batch)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        rows_in_part += 1
+        if bytes_per_row is None:
+            fills_part = False
+            full_batch = len(batch) >= PARQUET_FIRST_BATCH_ROWS
+        else:
+            room = max_bytes - PARQUET_FOOTER_MARGIN - buffer.tell()
+            fills_part = len(batch) * bytes_per_row * PARQUET_SIZE_SAFETY >= room
+            full_batch = len(batch) >= PARQUET_BATCH_ROWS
+        if full_batch or fills_part:
+            flush_batch()
+        if fills_part:
+            writer.close()
+            yield _part_filename(base_filename, part, ".parquet"), buffer.getvalue()
+            part += 1
+            rows_in_part = 0
+            buffer = io.BytesIO()
+            writer = pq.ParquetWriter(buffer, schema, compression="zstd")
+
+    if batch:
+        flush_batch()
+    writer.close()
+    if rows_in_part:
+        yield _part_filename(base_filename, part, ".parquet"), buffer.getvalue()
+
+def iter_export_parts(deposits, fmt="csv", summary=None, max_bytes=DISCORD_ATTACHMENT_LIMIT, stats=None):
+    """
+    Full export pipeline: decoded deposits -> (statistics) -> running total -> compressed writer.
+    Yields (filename, bytes) attachments, each under `max_bytes`. `summary` receives count/total;
+    if `stats` (a DepositStats) is given, every deposit is also folded into it as it streams past.
+    """
+    summary = {} if summary is None else summary
+    if stats is not None:
+        deposits = collect_stats(deposits, stats)
+    rows = with_running_total(deposits, summary)
+    if fmt == "parquet":
+        yield from iter_parquet_parts(rows, max_bytes=max_bytes)
+    else:
+        yield from iter_csv_gz_parts(rows, max_bytes=max_bytes)
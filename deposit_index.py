@@ -0,0 +1,590 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from block_resolver import block_timestamps, resolve_block
+
+DEPOSIT_INDEX_FILE = "/data/deposit_index.db"  # /data is the mounted volume
+DECIMALS = 10**18  # Convert wei to human-readable format
+HOUR = 3600
+DAY = 86400
+ROLLUP_GRANULARITIES = {"hour": HOUR, "day": DAY}
+# Raw rows older than this are compacted into the rollups (large deposits are always kept)
+RAW_RETENTION_DAYS = int(os.getenv("RAW_RETENTION_DAYS", "90"))
+HOURLY_RETENTION_DAYS = int(os.getenv("HOURLY_RETENTION_DAYS", "400"))  # Daily rollups are kept forever (their depositor lists aren't)
+KEEP_RAW_AMOUNT = float(os.getenv("KEEP_RAW_AMOUNT", "100000"))  # Raw rows at or above this survive compaction
+
+_lock = threading.Lock()  # Monitor, history scans and exports all write from worker threads
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deposits (
+    block_number INTEGER NOT NULL,
+    log_index    INTEGER NOT NULL,
+    tx_hash      TEXT    NOT NULL,
+    sender       TEXT    NOT NULL,
+    assets       TEXT    NOT NULL,  -- wei, as a decimal string (exceeds SQLite's 64-bit ints)
+    shares       TEXT    NOT NULL,
+    amount       REAL    NOT NULL,  -- assets / 1e18, for fast sums and filters
+    block_time   INTEGER,           -- unix seconds (from the log or the block header); NULL until it can be dated
+    PRIMARY KEY (tx_hash, log_index)
+);
+CREATE INDEX IF NOT EXISTS deposits_block ON deposits (block_number, log_index);
+CREATE INDEX IF NOT EXISTS deposits_amount ON deposits (amount);
+CREATE INDEX IF NOT EXISTS deposits_sender ON deposits (sender, block_number);
+CREATE TABLE IF NOT EXISTS covered_ranges (
+    start_block INTEGER NOT NULL,
+    end_block   INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sender_ranges (
+    sender      TEXT    NOT NULL,  -- Blocks scanned for this depositor only (topic1-filtered backfills)
+    start_block INTEGER NOT NULL,
+    end_block   INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sender_ranges_sender ON sender_ranges (sender, start_block);
+CREATE TABLE IF NOT EXISTS deposit_rollups (
+    granularity  TEXT    NOT NULL,  -- "hour" or "day"
+    bucket_start INTEGER NOT NULL,  -- unix seconds
+    count        INTEGER NOT NULL,
+    total        REAL    NOT NULL,
+    max_amount   REAL    NOT NULL,
+    depositors   INTEGER NOT NULL,  -- distinct senders in the bucket
+    first_block  INTEGER NOT NULL,
+    last_block   INTEGER NOT NULL,
+    PRIMARY KEY (granularity, bucket_start)
+);
+CREATE TABLE IF NOT EXISTS rollup_depositors (
+    granularity  TEXT    NOT NULL,
+    bucket_start INTEGER NOT NULL,
+    sender       TEXT    NOT NULL,
+    PRIMARY KEY (granularity, bucket_start, sender)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS folded_depositors (
+    sender    TEXT    PRIMARY KEY,  -- Senders whose daily depositor rows were folded away by compact_index
+    first_day INTEGER NOT NULL      -- Earliest folded day they deposited in
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS index_meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER
+);
+"""
+_migrated = False
+
+def _hex_to_int(value):
+    """Etherscan/RPC quantities come as hex strings (Etherscan uses "0x" for zero); tolerate ints too."""
+    if isinstance(value, int):
+        return value
+    if not value or value == "0x":
+        return 0
+    return int(value, 16)
+
+def decode_deposit_log(log):
+    """
+    Decode a raw Deposit log (Etherscan or RPC shape) into a plain dict:
+    block_number, log_index, tx_hash, sender, assets, shares (wei ints) and amount (float tokens).
+    """
+    data = log.get("data", "0x")
+    data = data[2:] if data.startswith("0x") else data
+    assets = int(data[:64] or "0", 16)
+    shares = int(data[64:128] or "0", 16)
+    return {
+        "block_number": _hex_to_int(log.get("blockNumber")),
+        "log_index": _hex_to_int(log.get("logIndex")),
+        "tx_hash": log.get("transactionHash", "N/A"),
+        "sender": f"0x{log['topics'][1][-40:]}",
+        "assets": assets,
+        "shares": shares,
+        "amount": assets / DECIMALS,
+    }
+
+@contextmanager
+def _connect():
+    """Serialised connection to the index, committed on success and always closed."""
+    with _lock:
+        conn = sqlite3.connect(DEPOSIT_INDEX_FILE)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")  # Long streaming reads must not block the monitor's writes
+            conn.executescript(SCHEMA)
+            _migrate(conn)
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+def _migrate(conn):
+    """Bring indexes created before rollups existed up to the current schema (once per process)."""
+    global _migrated
+    if _migrated:
+        return
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(deposits)")}
+    if "block_time" not in columns:
+        conn.execute("ALTER TABLE deposits ADD COLUMN block_time INTEGER")
+    conn.execute("CREATE INDEX IF NOT EXISTS deposits_time ON deposits (block_time)")
+    _migrated = True
+
+def _get_meta(conn, key, default=None):
+    row = conn.execute("SELECT value FROM index_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else default
+
+def _set_meta(conn, key, value):
+    conn.execute("INSERT OR REPLACE INTO index_meta (key, value) VALUES (?, ?)", (key, value))
+
+def normalize_sender(sender):
+    """Lowercase 0x-prefixed 20-byte address, the form senders are stored in."""
+    sender = sender.lower()
+    return sender if sender.startswith("0x") else f"0x{sender}"
+
+def _mark_covered(conn, start_block, end_block, sender=None):
+    """
+    Record [start_block, end_block] as fully indexed, merging with overlapping/adjacent ranges.
+    With `sender`, the range is only complete for that depositor's deposits.
+    """
+    table, scope, params = ("sender_ranges", "sender = ? AND ", (sender,)) if sender else ("covered_ranges", "", ())
+    rows = conn.execute(
+        f"SELECT rowid, start_block, end_block FROM {table} WHERE {scope}end_block >= ? AND start_block <= ?",
+        params + (start_block - 1, end_block + 1),
+    ).fetchall()
+    for rowid, existing_start, existing_end in rows:
+        start_block = min(start_block, existing_start)
+        end_block = max(end_block, existing_end)
+        conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (rowid,))
+    if sender:
+        conn.execute("INSERT INTO sender_ranges (sender, start_block, end_block) VALUES (?, ?, ?)", (sender, start_block, end_block))
+    else:
+        conn.execute("INSERT INTO covered_ranges (start_block, end_block) VALUES (?, ?)", (start_block, end_block))
+
+def _log_times(logs, deposits):
+    """
+    Block timestamps for decoded logs: from the log itself where present, else from the block (see
+    block_timestamps). None where neither is available; compact_index dates and rolls those rows up later.
+    """
+    times = []
+    missing = []
+    for i, log in enumerate(logs):
+        stamp = log.get("timeStamp") or log.get("blockTimestamp")
+        times.append(_hex_to_int(stamp) if stamp else None)
+        if not stamp:
+            missing.append(i)
+    if missing:
+        stamps = block_timestamps([deposits[i]["block_number"] for i in missing])
+        for i in missing:
+            times[i] = stamps.get(deposits[i]["block_number"])
+    return times
+
+def _was_covered(conn, block_number, sender):
+    """True if `block_number` had already been scanned (for everyone, or for `sender`) before this write."""
+    return conn.execute(
+        "SELECT 1 FROM covered_ranges WHERE start_block <= ? AND end_block >= ? "
+        "UNION ALL SELECT 1 FROM sender_ranges WHERE sender = ? AND start_block <= ? AND end_block >= ? LIMIT 1",
+        (block_number, block_number, sender, block_number, block_number),
+    ).fetchone() is not None
+
+def _add_to_rollups(conn, rows):
+    """
+    Fold newly inserted rows (block_number, sender, amount, block_time) into the hourly and daily rollups.
+    Rows are aggregated per bucket first, so a batch costs one upsert per touched bucket.
+    """
+    folded_before = _get_meta(conn, "depositors_folded_before", 0)
+    for granularity, size in ROLLUP_GRANULARITIES.items():
+        buckets = {}
+        for block_number, sender, amount, block_time in rows:
+            start = block_time // size * size
+            bucket = buckets.get(start)
+            if bucket is None:
+                buckets[start] = [1, amount, amount, block_number, block_number, {sender}]
+            else:
+                bucket[0] += 1
+                bucket[1] += amount
+                bucket[2] = max(bucket[2], amount)
+                bucket[3] = min(bucket[3], block_number)
+                bucket[4] = max(bucket[4], block_number)
+                bucket[5].add(sender)
+        for start, (count, total, max_amount, first_block, last_block, senders) in buckets.items():
+            if granularity == "day" and start < folded_before:
+                _add_to_folded_day(conn, start, count, total, max_amount, first_block, last_block, senders)
+                continue
+            conn.executemany(
+                "INSERT OR IGNORE INTO rollup_depositors (granularity, bucket_start, sender) VALUES (?, ?, ?)",
+                [(granularity, start, sender) for sender in senders],
+            )
+            depositors = conn.execute(
+                "SELECT COUNT(*) FROM rollup_depositors WHERE granularity = ? AND bucket_start = ?", (granularity, start)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO deposit_rollups (granularity, bucket_start, count, total, max_amount, depositors, first_block, last_block) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (granularity, bucket_start) DO UPDATE SET "
+                "count = count + excluded.count, total = total + excluded.total, "
+                "max_amount = max(max_amount, excluded.max_amount), depositors = excluded.depositors, "
+                "first_block = min(first_block, excluded.first_block), last_block = max(last_block, excluded.last_block)",
+                (granularity, start, count, total, max_amount, depositors, first_block, last_block),
+            )
+
+def _add_to_folded_day(conn, start, count, total, max_amount, first_block, last_block, senders):
+    """
+    Late rows for a day whose depositor list was already folded: the distinct count can no longer be
+    recomputed, so the new senders are added to it (an upper bound) and to folded_depositors.
+    """
+    conn.executemany(
+        "INSERT INTO folded_depositors (sender, first_day) VALUES (?, ?) "
+        "ON CONFLICT (sender) DO UPDATE SET first_day = min(first_day, excluded.first_day)",
+        [(sender, start) for sender in senders],
+    )
+    conn.execute(
+        "INSERT INTO deposit_rollups (granularity, bucket_start, count, total, max_amount, depositors, first_block, last_block) "
+        "VALUES ('day', ?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (granularity, bucket_start) DO UPDATE SET "
+        "count = count + excluded.count, total = total + excluded.total, "
+        "max_amount = max(max_amount, excluded.max_amount), depositors = depositors + excluded.depositors, "
+        "first_block = min(first_block, excluded.first_block), last_block = max(last_block, excluded.last_block)",
+        (start, count, total, max_amount, len(senders), first_block, last_block),
+    )
+
+def _rebuild_rollups(conn, block_times):
+    """Recompute the hourly/daily buckets containing `block_times` from the raw rows (after deletes or migrations)."""
+    compacted = _get_meta(conn, "compacted_through_block", -1)
+    for granularity, size in ROLLUP_GRANULARITIES.items():
+        for start in {block_time // size * size for block_time in block_times}:
+            if _bucket_compacted(conn, granularity, start, compacted):
+                continue  # Raw rows are gone; the rollup is the only record of this bucket
+            conn.execute("DELETE FROM deposit_rollups WHERE granularity = ? AND bucket_start = ?", (granularity, start))
+            conn.execute("DELETE FROM rollup_depositors WHERE granularity = ? AND bucket_start = ?", (granularity, start))
+            conn.execute(
+                "INSERT INTO rollup_depositors (granularity, bucket_start, sender) "
+                "SELECT DISTINCT ?, ?, sender FROM deposits WHERE block_time >= ? AND block_time < ?",
+                (granularity, start, start, start + size),
+            )
+            conn.execute(
+                "INSERT INTO deposit_rollups (granularity, bucket_start, count, total, max_amount, depositors, first_block, last_block) "
+                "SELECT ?, ?, COUNT(*), SUM(amount), MAX(amount), COUNT(DISTINCT sender), MIN(block_number), MAX(block_number) "
+                "FROM deposits WHERE block_time >= ? AND block_time < ? HAVING COUNT(*) > 0",
+                (granularity, start, start, start + size),
+            )
+
+def _bucket_compacted(conn, granularity, start, compacted):
+    """True if raw rows for any part of this bucket have been compacted away."""
+    if compacted < 0:
+        return False
+    row = conn.execute(
+        "SELECT first_block FROM deposit_rollups WHERE granularity = ? AND bucket_start = ?", (granularity, start)
+    ).fetchone()
+    return row is not None and row[0] <= compacted
+
+def record_deposits(logs, from_block=None, to_block=None, sender=None):
+    """
+    Append raw Deposit logs to the index and fold the new ones into the hourly/daily rollups.
+    If from_block/to_block are given, that range is marked as fully scanned so later queries
+    won't fetch it again (only for `sender` if the logs were filtered to one depositor).
+    Duplicate logs are ignored.
+    Returns True on success, False if the index could not be written.
+    """
+    try:
+        deposits = [decode_deposit_log(log) for log in logs]
+        times = _log_times(logs, deposits)
+        with _connect() as conn:
+            compacted = _get_meta(conn, "compacted_through_block", -1)
+            inserted = []
+            for deposit, block_time in zip(deposits, times):
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO deposits (block_number, log_index, tx_hash, sender, assets, shares, amount, block_time) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        deposit["block_number"], deposit["log_index"], deposit["tx_hash"], deposit["sender"],
+                        str(deposit["assets"]), str(deposit["shares"]), deposit["amount"], block_time,
+                    ),
+                )
+                if cursor.rowcount != 1 or block_time is None:
+                    continue  # Already indexed, or undated (compact_index rolls it up once it has a timestamp)
+                # Below the compaction watermark, a block scanned before was counted before its rows were compacted
+                if deposit["block_number"] > compacted or not _was_covered(conn, deposit["block_number"], deposit["sender"]):
+                    inserted.append((deposit["block_number"], deposit["sender"], deposit["amount"], block_time))
+            if inserted:
+                _add_to_rollups(conn, inserted)
+            if from_block is not None and to_block is not None and from_block <= to_block:
+                _mark_covered(conn, from_block, to_block, normalize_sender(sender) if sender else None)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not write to deposit index: {e}")
+        return False
+
+def uncovered_ranges(from_block, to_block, sender=None):
+    """
+    Block ranges inside [from_block, to_block] the index has never scanned, as a list of (start, end).
+    With `sender`, ranges scanned for that depositor alone count as covered too.
+    Returns None if the index is unavailable.
+    """
+    try:
+        with _connect() as conn:
+            covered = conn.execute(
+                "SELECT start_block, end_block FROM covered_ranges WHERE end_block >= ? AND start_block <= ? "
+                "ORDER BY start_block",
+                (from_block, to_block),
+            ).fetchall()
+            if sender:
+                covered = sorted(covered + conn.execute(
+                    "SELECT start_block, end_block FROM sender_ranges WHERE sender = ? AND end_block >= ? AND start_block <= ?",
+                    (normalize_sender(sender), from_block, to_block),
+                ).fetchall())
+    except Exception as e:
+        print(f"⚠️ Could not read deposit index coverage: {e}")
+        return None
+
+    gaps = []
+    cursor = from_block
+    for start_block, end_block in covered:
+        if start_block > cursor:
+            gaps.append((cursor, min(start_block - 1, to_block)))
+        cursor = max(cursor, end_block + 1)
+        if cursor > to_block:
+            break
+    if cursor <= to_block:
+        gaps.append((cursor, to_block))
+    return gaps
+
+DEPOSIT_COLUMNS = "block_number, log_index, tx_hash, sender, assets, shares, amount"
+STREAM_BATCH_ROWS = 5_000  # Rows pulled per fetchmany() when streaming
+
+def _row_to_deposit(row):
+    block_number, log_index, tx_hash, sender, assets, shares, amount = row
+    return {
+        "block_number": block_number,
+        "log_index": log_index,
+        "tx_hash": tx_hash,
+        "sender": sender,
+        "assets": int(assets),
+        "shares": int(shares),
+        "amount": amount,
+    }
+
+def query_deposits(from_block, to_block):
+    """Indexed deposits in [from_block, to_block], in block/log order, as dicts like decode_deposit_log."""
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT {DEPOSIT_COLUMNS} FROM deposits "
+            "WHERE block_number BETWEEN ? AND ? ORDER BY block_number, log_index",
+            (from_block, to_block),
+        ).fetchall()
+    return [_row_to_deposit(row) for row in rows]
+
+def iter_deposits(from_block, to_block):
+    """
+    Stream indexed deposits in [from_block, to_block] in block/log order without materialising them.
+    Uses its own read-only connection (outside the write lock) so a slow consumer never stalls the monitor.
+    """
+    conn = sqlite3.connect(f"file:{DEPOSIT_INDEX_FILE}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            f"SELECT {DEPOSIT_COLUMNS} FROM deposits "
+            "WHERE block_number BETWEEN ? AND ? ORDER BY block_number, log_index",
+            (from_block, to_block),
+        )
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_ROWS)
+            if not rows:
+                break
+            for row in rows:
+                yield _row_to_deposit(row)
+    finally:
+        conn.close()
+
+def forget_blocks(from_block):
+    """
+    Drop every indexed deposit at or after `from_block` and shrink coverage to end before it.
+    Used after a reorg so the rescanned blocks replace, rather than sit alongside, orphaned logs.
+    The rollup buckets those deposits fell in are recomputed from what remains.
+    """
+    try:
+        with _connect() as conn:
+            block_times = [row[0] for row in conn.execute(
+                "SELECT DISTINCT block_time FROM deposits WHERE block_number >= ? AND block_time IS NOT NULL", (from_block,)
+            )]
+            conn.execute("DELETE FROM deposits WHERE block_number >= ?", (from_block,))
+            conn.execute("DELETE FROM covered_ranges WHERE start_block >= ?", (from_block,))
+            conn.execute("UPDATE covered_ranges SET end_block = ? WHERE end_block >= ?", (from_block - 1, from_block))
+            conn.execute("DELETE FROM sender_ranges WHERE start_block >= ?", (from_block,))
+            conn.execute("UPDATE sender_ranges SET end_block = ? WHERE end_block >= ?", (from_block - 1, from_block))
+            _rebuild_rollups(conn, block_times)
+        return True
+    except Exception as e:
+        print(f"⚠️ Could not rewind deposit index to block {from_block}: {e}")
+        return False
+
+def compacted_through_block():
+    """Highest block whose small raw deposits have been compacted away (-1 if none), or None if the index is unavailable."""
+    try:
+        with _connect() as conn:
+            return _get_meta(conn, "compacted_through_block", -1)
+    except Exception as e:
+        print(f"⚠️ Could not read deposit index metadata: {e}")
+        return None
+
+def compact_index(now=None, block_at=resolve_block):
+    """
+    Retention pass, run daily:
+    - undated rows (indexed before rollups existed, or when no timestamp was available) are dated from their
+      block headers and rolled up,
+    - raw deposits below KEEP_RAW_AMOUNT in blocks before `block_at(now - RAW_RETENTION_DAYS)` are deleted
+      (rollups keep their totals; undated rows are kept until they can be rolled up),
+    - hourly rollups older than HOURLY_RETENTION_DAYS are dropped (daily rollups stay), and the per-sender
+      rows behind those days' depositor counts are folded into folded_depositors (first day per sender).
+    Header reads and the cutoff lookup run outside the index lock. Returns the number of raw rows deleted, or None on failure.
+    """
+    now = int(time.time()) if now is None else int(now)
+    try:
+        with _connect() as conn:
+            untimed = conn.execute("SELECT block_number FROM deposits WHERE block_time IS NULL").fetchall()
+        stamps = block_timestamps([block_number for (block_number,) in untimed]) if untimed else {}
+        raw_cutoff = now - RAW_RETENTION_DAYS * DAY
+        cutoff_block = block_at(raw_cutoff)
+
+        with _connect() as conn:
+            dated = []
+            for block_number, stamp in stamps.items():
+                rows = conn.execute(
+                    "SELECT block_number, sender, amount FROM deposits WHERE block_number = ? AND block_time IS NULL",
+                    (block_number,),
+                ).fetchall()
+                conn.execute("UPDATE deposits SET block_time = ? WHERE block_number = ? AND block_time IS NULL", (stamp, block_number))
+                dated += [(block, sender, amount, stamp) for block, sender, amount in rows]
+            if dated:
+                # Undated rows were never counted, so they're added even to buckets whose raw rows are gone
+                _add_to_rollups(conn, dated)
+                print(f"📦 Dated and rolled up {len(dated)} deposits.")
+            if len(stamps) < len({block_number for (block_number,) in untimed}):
+                print(f"⚠️ {len(untimed) - len(dated)} deposits still have no timestamp; retrying on the next pass.")
+
+            deleted = 0
+            if cutoff_block is None:
+                print(f"⚠️ Could not resolve the block {RAW_RETENTION_DAYS} days ago; raw deposits kept until the next pass.")
+            else:
+                deleted = conn.execute(
+                    "DELETE FROM deposits WHERE block_number <= ? AND amount < ? AND block_time IS NOT NULL",
+                    (cutoff_block, KEEP_RAW_AMOUNT),
+                ).rowcount
+                _set_meta(conn, "compacted_through_block", max(cutoff_block, _get_meta(conn, "compacted_through_block", -1)))
+
+            hourly_cutoff = now - HOURLY_RETENTION_DAYS * DAY
+            conn.execute("DELETE FROM deposit_rollups WHERE granularity = 'hour' AND bucket_start < ?", (hourly_cutoff,))
+            conn.execute("DELETE FROM rollup_depositors WHERE granularity = 'hour' AND bucket_start < ?", (hourly_cutoff,))
+            folded_before = hourly_cutoff // DAY * DAY
+            if folded_before > _get_meta(conn, "depositors_folded_before", 0):
+                conn.execute(
+                    "INSERT INTO folded_depositors (sender, first_day) "
+                    "SELECT sender, MIN(bucket_start) FROM rollup_depositors "
+                    "WHERE granularity = 'day' AND bucket_start < ? GROUP BY sender "
+                    "ON CONFLICT (sender) DO UPDATE SET first_day = min(first_day, excluded.first_day)",
+                    (folded_before,),
+                )
+                conn.execute("DELETE FROM rollup_depositors WHERE granularity = 'day' AND bucket_start < ?", (folded_before,))
+                _set_meta(conn, "depositors_folded_before", folded_before)
+        if deleted:
+            with _connect() as conn:
+                conn.execute("VACUUM")  # Hand the freed pages back to the /data volume
+            print(f"🧹 Compacted {deleted} raw deposits older than {RAW_RETENTION_DAYS} days into the rollups.")
+        return deleted
+    except Exception as e:
+        print(f"⚠️ Deposit index compaction failed: {e}")
+        return None
+
+def rollup_totals(from_time, to_time):
+    """
+    Count, total, max and distinct depositors for deposits in [from_time, to_time) (unix seconds),
+    answered from the rollups: whole days from the daily buckets, the partial days at either end
+    from the hourly ones. Hour resolution at the edges. Days whose depositor lists were folded by
+    compact_index add their stored per-day counts, so `depositors` is then an upper bound (a sender active
+    on several of those days counts once per day). Returns a dict, or None if the index is unavailable.
+    """
+    first_day = (from_time + DAY - 1) // DAY * DAY
+    last_day = to_time // DAY * DAY
+    if first_day >= last_day:
+        spans = [("hour", from_time // HOUR * HOUR, to_time)]
+    else:
+        spans = [("hour", from_time // HOUR * HOUR, first_day), ("day", first_day, last_day), ("hour", last_day, to_time)]
+    where = " OR ".join("(granularity = ? AND bucket_start >= ? AND bucket_start < ?)" for _ in spans)
+    params = [value for span in spans for value in span]
+    try:
+        with _connect() as conn:
+            count, total, max_amount, first_block, last_block = conn.execute(
+                f"SELECT COALESCE(SUM(count), 0), COALESCE(SUM(total), 0), COALESCE(MAX(max_amount), 0), "
+                f"MIN(first_block), MAX(last_block) FROM deposit_rollups WHERE {where}",
+                params,
+            ).fetchone()
+            depositors = conn.execute(
+                f"SELECT COUNT(DISTINCT sender) FROM rollup_depositors WHERE {where}", params
+            ).fetchone()[0]
+            folded_before = _get_meta(conn, "depositors_folded_before", 0)
+            if first_day < last_day and first_day < folded_before:
+                depositors += conn.execute(
+                    "SELECT COALESCE(SUM(depositors), 0) FROM deposit_rollups "
+                    "WHERE granularity = 'day' AND bucket_start >= ? AND bucket_start < ?",
+                    (first_day, min(last_day, folded_before)),
+                ).fetchone()[0]
+    except Exception as e:
+        print(f"⚠️ Could not read deposit rollups: {e}")
+        return None
+    return {
+        "count": count, "total": total, "max": max_amount, "depositors": depositors,
+        "first_block": first_block, "last_block": last_block,
+    }
+
+def rollup_buckets(granularity, from_time, to_time):
+    """[(bucket_start, count, total, max_amount, depositors)] for one granularity in [from_time, to_time), oldest first."""
+    with _connect() as conn:
+        return conn.execute(
+            "SELECT bucket_start, count, total, max_amount, depositors FROM deposit_rollups "
+            "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ? ORDER BY bucket_start",
+            (granularity, from_time, to_time),
+        ).fetchall()
+
+def query_large_deposits(from_block, to_block, threshold):
+    """Indexed deposits of at least `threshold` tokens in [from_block, to_block], via the amount index (survives compaction)."""
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT {DEPOSIT_COLUMNS} FROM deposits "
+            "WHERE amount >= ? AND block_number BETWEEN ? AND ? ORDER BY block_number, log_index",
+            (threshold, from_block, to_block),
+        ).fetchall()
+    return [_row_to_deposit(row) for row in rows]
+
+def query_sender_deposits(sender, limit=None):
+    """
+    One depositor's indexed deposits, newest first, plus their totals, via the sender index.
+    Returns (deposits, summary) where summary has count, total, max, first_block, last_block,
+    first_day (earliest daily rollup that lists the sender, or folded_depositors for days past hourly
+    retention; both outlive raw-row compaction) and
+    compacted_through_block: the watermark if the sender deposited in compacted days, else None. Rollups
+    don't keep per-sender amounts, so the totals then only cover raw rows (the retention window plus
+    deposits of at least KEEP_RAW_AMOUNT).
+    """
+    sender = normalize_sender(sender)
+    with _connect() as conn:
+        count, total, max_amount, first_block, last_block = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(amount), 0), COALESCE(MAX(amount), 0), MIN(block_number), MAX(block_number) "
+            "FROM deposits WHERE sender = ?",
+            (sender,),
+        ).fetchone()
+        first_day = conn.execute(
+            "SELECT MIN(bucket_start) FROM rollup_depositors WHERE granularity = 'day' AND sender = ?", (sender,)
+        ).fetchone()[0]
+        folded = conn.execute("SELECT first_day FROM folded_depositors WHERE sender = ?", (sender,)).fetchone()
+        if folded:
+            first_day = folded[0] if first_day is None else min(first_day, folded[0])
+        compacted = _get_meta(conn, "compacted_through_block", -1)
+        # Folded days are past hourly retention, so well inside the compacted range
+        partial = compacted >= 0 and (folded is not None or conn.execute(
+            "SELECT 1 FROM rollup_depositors AS d JOIN deposit_rollups AS r "
+            "ON r.granularity = d.granularity AND r.bucket_start = d.bucket_start "
+            "WHERE d.granularity = 'day' AND d.sender = ? AND r.first_block <= ? LIMIT 1",
+            (sender, compacted),
+        ).fetchone() is not None)
+        rows = conn.execute(
+            f"SELECT {DEPOSIT_COLUMNS} FROM deposits WHERE sender = ? ORDER BY block_number DESC, log_index DESC"
+            + (" LIMIT ?" if limit else ""),
+            (sender, limit) if limit else (sender,),
+        ).fetchall()
+    summary = {
+        "count": count, "total": total, "max": max_amount,
+        "first_block": first_block, "last_block": last_block, "first_day": first_day,
+        "compacted_through_block": compacted if partial else None,
+    }
+    return [_row_to_deposit(row) for row in rows], summary
@@ -1,110 +1,515 @@
-import requests
 import time
 import os
-from web3 import Web3
+import threading
+from http_transport import get_json
+from log_scanner import scan_logs_rpc, get_block_number, rpc_call, SONIC_RPC_URL
+from scan_scheduler import scan_block_range
+from deposit_index import (
+    record_deposits, uncovered_ranges, query_deposits, iter_deposits, decode_deposit_log,
+    rollup_totals, rollup_buckets, query_large_deposits, compacted_through_block,
+    query_sender_deposits, normalize_sender,
+)
+from block_resolver import resolve_block, add_anchor_from_header, add_anchors_from_logs, estimate_timestamps
+from deposit_batch import DepositBatch, DepositStats
+from flow_window import FlowWindow
+from contract_events import WATCHED_EVENTS, FlowTally, topics_for, dispatch
 
 API_KEY = os.getenv("ETHERSCAN_API_KEY")
 ETHERSCAN_V2 = "https://api.etherscan.io/v2/api?chainid=146"
 CONTRACT_ADDRESS = "0xE5DA20F15420aD15DE0fa650600aFc998bbE3955"
 DEPOSIT_EVENT_TOPIC = "0x73a19dd210f1a7f902193214c0ee91dd35ee5b4d920cba8d519eca65a7b488ca"
 MAX_RETRIES = 5
-INITIAL_DELAY = 1  # API rate limit handling
 REQUEST_TIMEOUT = 5  # Limit API request timeouts to 5s max
 DECIMALS = 10**18  # Convert wei to human-readable format
 FLAG_THRESHOLD = 100000  # Flag deposits ≥ 100,000 S tokens
 MAX_MESSAGE_LENGTH = 2000 # Split long discord messages into 2000-character chunks
+# "etherscan" (default) or "rpc" to pull Deposit logs straight from SONIC_RPC_URL with eth_getLogs
+DEPOSIT_LOG_BACKEND = os.getenv("DEPOSIT_LOG_BACKEND", "etherscan").lower()
+DEPOSIT_CONFIRMATIONS = int(os.getenv("DEPOSIT_CONFIRMATIONS", "2"))  # The monitor scans (and checkpoints) this far behind the head
+ETHERSCAN_MAX_LOGS = 1000  # Etherscan getLogs returns at most this many records per call
+MAX_CACHED_BLOCK_HASHES = 512
+# First block that can hold a Deposit. Unset: looked up from the contract's creation tx (see get_contract_deploy_block)
+CONTRACT_DEPLOY_BLOCK = int(os.getenv("CONTRACT_DEPLOY_BLOCK")) if os.getenv("CONTRACT_DEPLOY_BLOCK") else None
+DEPOSITOR_HISTORY_ROWS = 10  # Most recent deposits listed by !depositor
+ROLLUP_HISTORY_HOURS = 48  # Longer !history windows are summarised from the rollups instead of raw rows
+STREAM_SCAN_BLOCKS = int(os.getenv("STREAM_SCAN_BLOCKS", "200000"))  # Blocks held in memory at once when streaming a direct scan
 
-# Initialize Web3 for decoding hex values
-w3 = Web3()
+_recent_block_hashes = {}  # block number -> hash, from headers and logs we've already fetched
+_block_hash_lock = threading.Lock()
+
+# Watched contract events are fetched with deposits in one query and tallied for net-flow reporting
+WATCHED_TOPICS = [DEPOSIT_EVENT_TOPIC] + [topic for topic in topics_for(WATCHED_EVENTS) if topic != DEPOSIT_EVENT_TOPIC]
+flow_tally = FlowTally()
+event_handlers = flow_tally.handlers(WATCHED_EVENTS)
+
+# Cumulative inflow per sender and in total over a sliding window, fed by every block-range scan
+flow_window = FlowWindow()
+
+
+def _etherscan_rate_limited(data):
+    """Etherscan reports rate limiting as an HTTP 200 with status "0" and a message in `result`."""
+    return isinstance(data, dict) and data.get("status") == "0" and "rate limit" in str(data.get("result", "")).lower()
 
 def make_request(url):
-    """Helper function to make an API request with error handling and retries."""
-    delay = INITIAL_DELAY
-    for attempt in range(MAX_RETRIES):
+    """Helper function to make an API request through the shared, rate-limited transport."""
+    data = get_json(
+        url,
+        timeout=REQUEST_TIMEOUT,
+        max_attempts=MAX_RETRIES,
+        retry_if_json=_etherscan_rate_limited,
+        label="Etherscan API",
+    )
+    if data and "result" in data:
+        return data
+    return None  # Return None if all retries fail
+
+def use_rpc_backend():
+    """True when Deposit logs should come from the Sonic RPC instead of Etherscan."""
+    return DEPOSIT_LOG_BACKEND == "rpc"
+
+def log_backend_url():
+    """URL of the configured log backend, for checking its rate-limit headroom."""
+    return SONIC_RPC_URL if use_rpc_backend() else ETHERSCAN_V2
+
+DEPLOY_LOOKUP_RETRY = 600  # Seconds before a failed deploy-block lookup is tried again
+_deploy_block = CONTRACT_DEPLOY_BLOCK
+_deploy_lookup_failed_at = None
+
+def get_contract_deploy_block():
+    """
+    Block the staking contract was created in: CONTRACT_DEPLOY_BLOCK if set, else Etherscan's
+    getcontractcreation (cached for the process). None if it can't be determined; history scans from
+    the deploy block must not start then, or they would walk the chain from genesis.
+    """
+    global _deploy_block, _deploy_lookup_failed_at
+    if _deploy_block is not None:
+        return _deploy_block
+    if _deploy_lookup_failed_at is not None and time.time() - _deploy_lookup_failed_at < DEPLOY_LOOKUP_RETRY:
+        return None
+    creation_url = f"{ETHERSCAN_V2}&module=contract&action=getcontractcreation&contractaddresses={CONTRACT_ADDRESS}&apikey={API_KEY}"
+    response = make_request(creation_url)
+    try:
+        creation = response["result"][0]
+        if creation.get("blockNumber"):
+            _deploy_block = int(creation["blockNumber"])
+        else:  # Older responses only carry the creation tx
+            tx_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_getTransactionByHash&txhash={creation['txHash']}&apikey={API_KEY}"
+            _deploy_block = int(make_request(tx_url)["result"]["blockNumber"], 16)
+    except (TypeError, KeyError, IndexError, ValueError) as e:
+        print(f"❌ Could not determine the staking contract's deploy block ({e}); set CONTRACT_DEPLOY_BLOCK.")
+        _deploy_lookup_failed_at = time.time()
+        return None
+    print(f"🏗️ Staking contract deployed in block {_deploy_block}.")
+    return _deploy_block
+
+def get_latest_block():
+    """
+    Latest block number from the configured backend, or None on failure.
+    Reads the full head header so its timestamp becomes a block-resolver anchor for free.
+    """
+    if use_rpc_backend():
         try:
-            time.sleep(delay)  # Respect rate limits
-            response = requests.get(url, timeout=REQUEST_TIMEOUT)  # Apply 5-second timeout
-            response.raise_for_status()  # Handle HTTP errors
+            header = rpc_call("eth_getBlockByNumber", ["latest", False])
+            add_anchor_from_header(header)
+            remember_block_hash(header.get("number"), header.get("hash"))
+            return int(header["number"], 16)
+        except Exception as e:
+            print(f"❌ RPC latest header failed, falling back to eth_blockNumber: {e}")
+            return get_block_number()
+    latest_block_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_getBlockByNumber&tag=latest&boolean=false&apikey={API_KEY}"
+    latest_block_response = make_request(latest_block_url)
+    if not latest_block_response or not isinstance(latest_block_response["result"], dict):
+        return None
+    header = latest_block_response["result"]
+    add_anchor_from_header(header)
+    remember_block_hash(header.get("number"), header.get("hash"))
+    return int(header["number"], 16)
+
+def remember_block_hash(block_number, block_hash):
+    """Cache a recently seen block hash (from headers or logs) so checkpoints rarely need a lookup."""
+    if block_number is None or not block_hash:
+        return
+    block_number = int(block_number, 16) if isinstance(block_number, str) else int(block_number)
+    with _block_hash_lock:
+        _recent_block_hashes[block_number] = block_hash
+        if len(_recent_block_hashes) > MAX_CACHED_BLOCK_HASHES:
+            for stale in sorted(_recent_block_hashes)[:-MAX_CACHED_BLOCK_HASHES // 2]:
+                del _recent_block_hashes[stale]
+
+def get_block_hash(block_number, cached=False):
+    """
+    Hash of `block_number` from the configured backend, or None on failure.
+    With cached=True a hash seen in a recent header or log is returned without a lookup;
+    reorg checks must use the default (fresh) lookup.
+    """
+    if cached:
+        with _block_hash_lock:
+            if block_number in _recent_block_hashes:
+                return _recent_block_hashes[block_number]
+    try:
+        if use_rpc_backend():
+            header = rpc_call("eth_getBlockByNumber", [hex(block_number), False])
+        else:
+            block_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_getBlockByNumber&tag={hex(block_number)}&boolean=false&apikey={API_KEY}"
+            response = make_request(block_url)
+            header = response["result"] if response else None
+    except Exception as e:
+        print(f"❌ Could not fetch hash for block {block_number}: {e}")
+        return None
+    if not isinstance(header, dict) or not header.get("hash"):
+        return None
+    remember_block_hash(block_number, header["hash"])
+    return header["hash"]
+
+def fetch_block_by_time_etherscan(timestamp):
+    """Etherscan getblocknobytime lookup (closest block before `timestamp`), or None on failure."""
+    block_time_url = f"{ETHERSCAN_V2}&module=block&action=getblocknobytime&timestamp={timestamp}&closest=before&apikey={API_KEY}"
+    block_response = make_request(block_time_url)
+    if not block_response:
+        return None
+    try:
+        return int(block_response["result"])
+    except (TypeError, ValueError):
+        print(f"❌ Unexpected getblocknobytime result: {block_response['result']}")
+        return None
+
+def get_block_by_time(timestamp):
+    """Closest block before `timestamp`: cached anchors + header reads first, Etherscan only as a fallback."""
+    return resolve_block(timestamp, fallback=fetch_block_by_time_etherscan)
+
+def fetch_contract_logs_rpc(from_block, to_block, topics):
+    """
+    Contract logs whose topic0 is any of `topics` for [from_block, to_block], in one eth_getLogs per range
+    (topic OR-filter) with adaptive range splitting. None on failure.
+    """
+    logs = scan_logs_rpc(CONTRACT_ADDRESS, [list(topics)], from_block, to_block,
+                         initial_range=to_block - from_block + 1)
+    add_anchors_from_logs(logs)
+    return logs
 
-            # Parse JSON safely
-            data = response.json()
-            if "result" in data:
-                return data
+def _log_block(log):
+    block = log["blockNumber"]
+    return int(block, 16) if isinstance(block, str) else int(block)
+
+def _etherscan_contract_logs(from_block, to_block, topic):
+    """
+    One Etherscan getLogs page for the contract, filtered to a single topic0 by Etherscan (the contract's own
+    token Transfer/Approval logs never count against the result cap).
+    Returns (logs, capped_at), or (None, None) on failure; `capped_at` is the block of the page's last log
+    when the page hit the result cap (logs at that block may be cut short), else None.
+    """
+    tx_url = (
+        f"{ETHERSCAN_V2}&module=logs&action=getLogs"
+        f"&fromBlock={from_block}&toBlock={to_block}"
+        f"&address={CONTRACT_ADDRESS}&topic0={topic}&apikey={API_KEY}"
+    )
+    tx_response = make_request(tx_url)
+    if not tx_response:
+        return None, None
+    result = tx_response["result"]
+    if not isinstance(result, list):  # e.g. "Max rate limit reached"
+        print(f"⚠️ Etherscan returned no log list for blocks {from_block} to {to_block}: {result}")
+        return None, None
+    add_anchors_from_logs(result)
+    return result, (_log_block(result[-1]) if len(result) >= ETHERSCAN_MAX_LOGS else None)
+
+def _log_order(log):
+    index = log.get("logIndex")
+    if isinstance(index, str):
+        index = int(index, 16) if index not in ("", "0x") else 0  # Etherscan writes zero as "0x"
+    return _log_block(log), index or 0
+
+def fetch_contract_logs_etherscan(from_block, to_block, topics):
+    """
+    Contract logs matching `topics` via Etherscan's getLogs, one topic0-filtered query per topic, merged in
+    block/log order. None on failure or a truncated result.
+    """
+    logs = []
+    for topic in topics:
+        topic_logs, capped_at = _etherscan_contract_logs(from_block, to_block, topic)
+        if topic_logs is None:
+            return None
+        if capped_at is not None:
+            # Etherscan silently caps getLogs; treat a full page as a failure so the range gets split.
+            print(f"⚠️ Etherscan result cap hit for blocks {from_block} to {to_block}. Range needs splitting.")
+            return None
+        logs += topic_logs
+    return sorted(logs, key=_log_order) if len(topics) > 1 else logs
+
+def fetch_contract_logs(from_block, to_block, topics):
+    """Contract logs matching any of `topics` for [from_block, to_block] from the configured backend. None on failure."""
+    if use_rpc_backend():
+        return fetch_contract_logs_rpc(from_block, to_block, topics)
+    return fetch_contract_logs_etherscan(from_block, to_block, topics)
+
+def fetch_deposit_logs_rpc(from_block, to_block):
+    """Deposit logs for [from_block, to_block] via eth_getLogs with adaptive range splitting. None on failure."""
+    return fetch_contract_logs_rpc(from_block, to_block, [DEPOSIT_EVENT_TOPIC])
+
+def fetch_deposit_logs_etherscan(from_block, to_block):
+    """Deposit logs for [from_block, to_block] via Etherscan's getLogs. None on failure or a truncated result."""
+    return fetch_contract_logs_etherscan(from_block, to_block, [DEPOSIT_EVENT_TOPIC])
+
+def fetch_deposit_logs(from_block, to_block):
+    """Deposit logs for [from_block, to_block] from the configured backend. None on failure."""
+    return fetch_contract_logs(from_block, to_block, [DEPOSIT_EVENT_TOPIC])
+
+def fetch_sender_deposit_logs(from_block, to_block, sender):
+    """
+    One depositor's Deposit logs for [from_block, to_block], filtered on topic1 by the backend so even
+    the whole contract history is usually a single request. None on failure or a truncated result.
+    """
+    sender_topic = "0x" + normalize_sender(sender)[2:].rjust(64, "0")
+    if use_rpc_backend():
+        logs = scan_logs_rpc(CONTRACT_ADDRESS, [DEPOSIT_EVENT_TOPIC, sender_topic], from_block, to_block,
+                             initial_range=to_block - from_block + 1)
+        add_anchors_from_logs(logs)
+        return logs
+    tx_url = (
+        f"{ETHERSCAN_V2}&module=logs&action=getLogs"
+        f"&fromBlock={from_block}&toBlock={to_block}&address={CONTRACT_ADDRESS}"
+        f"&topic0={DEPOSIT_EVENT_TOPIC}&topic0_1_opr=and&topic1={sender_topic}&apikey={API_KEY}"
+    )
+    tx_response = make_request(tx_url)
+    if not tx_response:
+        return None
+    result = tx_response["result"]
+    if not isinstance(result, list):
+        print(f"⚠️ Etherscan returned no log list for blocks {from_block} to {to_block}: {result}")
+        return None
+    if len(result) >= ETHERSCAN_MAX_LOGS:
+        print(f"⚠️ Etherscan result cap hit for blocks {from_block} to {to_block}. Range needs splitting.")
+        return None
+    add_anchors_from_logs(result)
+    return result
+
+def fetch_watched_logs(start_block, latest_block):
+    """
+    Deposits plus every other watched event for [start_block, latest_block]: one eth_getLogs with a topic
+    OR-filter on the RPC, one topic0-filtered getLogs per watched event on Etherscan.
+    Returns (logs, scan_end): scan_end is the last block the logs fully cover, which is below latest_block when an
+    Etherscan page hit its result cap (the cap can cut the last block short, so that block is left for the next scan;
+    every topic is trimmed to the same end so no event type runs ahead of the others).
+    Returns (None, None) on failure, including a single block over the cap: the range is retried rather than
+    narrowed to some event types.
+    """
+    if use_rpc_backend():
+        logs = fetch_contract_logs_rpc(start_block, latest_block, WATCHED_TOPICS)
+        return (logs, latest_block) if logs is not None else (None, None)
+
+    logs = []
+    scan_end = latest_block
+    for topic in WATCHED_TOPICS:
+        topic_logs, capped_at = _etherscan_contract_logs(start_block, scan_end, topic)
+        if topic_logs is None:
+            return None, None
+        if capped_at is not None:
+            # The page is sorted by block; everything before the block it stopped in is complete
+            scan_end = capped_at - 1
+            if scan_end < start_block:
+                print(f"🚨 Etherscan result cap hit inside block {start_block}; retrying the range next scan.")
+                return None, None
+            print(f"⚠️ Etherscan result cap hit for blocks {start_block} to {latest_block}; covering up to {scan_end} this scan.")
+        logs += topic_logs
+    return sorted((log for log in logs if _log_block(log) <= scan_end), key=_log_order), scan_end
+
+def scan_contract_events(from_block, to_block, handlers, progress=None):
+    """
+    Scan [from_block, to_block] for every event named in `handlers` with one log query per range
+    and dispatch each decoded event to its handler. Returns ({event_name: count}, complete).
+    """
+    topics = topics_for(list(handlers))
+    logs, complete = scan_block_range(
+        from_block, to_block, lambda start, end: fetch_contract_logs(start, end, topics), progress=progress
+    )
+    return dispatch(logs, handlers), complete
 
-        except (requests.exceptions.Timeout):
-            print(f"⏳ Timeout error (attempt {attempt + 1}): API did not respond within 5 seconds.")
-        except (requests.exceptions.RequestException, ValueError) as e:
-            print(f"❌ API request failed (attempt {attempt + 1}): {e}")
+def fill_index_gaps(start_block, latest_block, progress=None):
+    """
+    Scan the block ranges inside [start_block, latest_block] that the deposit index has never covered
+    and append them to it. Returns True if every gap was filled, False if some ranges failed,
+    or None if the index is unavailable.
+    """
+    gaps = uncovered_ranges(start_block, latest_block)
+    if gaps is None:
+        return None
+
+    total_blocks = latest_block - start_block + 1
+    gap_blocks = sum(gap_end - gap_start + 1 for gap_start, gap_end in gaps)
+    print(f"📚 Deposit index covers {total_blocks - gap_blocks}/{total_blocks} blocks; fetching {len(gaps)} gap(s).")
+
+    complete = True
+    blocks_before_gap = total_blocks - gap_blocks
+    for gap_start, gap_end in gaps:
+        def gap_progress(done, _total, offset=blocks_before_gap):
+            if progress:
+                progress(offset + done, total_blocks)
+
+        logs, gap_complete = scan_block_range(gap_start, gap_end, fetch_deposit_logs, progress=gap_progress)
+        # Only mark the gap as covered if every range in it came back.
+        if gap_complete:
+            record_deposits(logs, gap_start, gap_end)
+        else:
+            record_deposits(logs)
+            complete = False
+        blocks_before_gap += gap_end - gap_start + 1
+    return complete
+
+def fetch_deposits_indexed(start_block, latest_block, progress=None):
+    """
+    Decoded deposits (see deposit_index.decode_deposit_log) for [start_block, latest_block].
+    Served from the local deposit index; only block ranges it has never covered are fetched,
+    and those are appended to the index. Falls back to a full scan if the index is unavailable
+    or the window reaches back past raw retention (see deposit_index.compact_index).
+    Returns a tuple: (deposits, complete).
+    """
+    compacted = compacted_through_block()
+    complete = None
+    if compacted is None or compacted < start_block:  # Windows past raw retention are rescanned directly
+        complete = fill_index_gaps(start_block, latest_block, progress=progress)
+    if complete is not None:
+        try:
+            return query_deposits(start_block, latest_block), complete
+        except Exception as e:
+            print(f"⚠️ Could not read deposit index, rescanning window directly: {e}")
 
-        delay *= 2  # Exponential backoff (1s, 2s, 4s, 8s, 16s)
+    logs, complete = scan_block_range(start_block, latest_block, fetch_deposit_logs, progress=progress)
+    return [decode_deposit_log(log) for log in logs], complete
 
-    print("🚨 Max retries reached. Skipping this request.")
-    return None  # Return None if all retries fail
+def _iter_scanned_deposits(start_block, latest_block, progress=None):
+    """
+    Scan [start_block, latest_block] straight from the API STREAM_SCAN_BLOCKS at a time, yielding decoded
+    deposits as each slice completes. The generator's return value is False if some range failed.
+    """
+    complete = True
+    total_blocks = latest_block - start_block + 1
+    for slice_start in range(start_block, latest_block + 1, STREAM_SCAN_BLOCKS):
+        slice_end = min(slice_start + STREAM_SCAN_BLOCKS - 1, latest_block)
+
+        def slice_progress(done, _total, offset=slice_start - start_block):
+            if progress:
+                progress(offset + done, total_blocks)
+
+        logs, slice_complete = scan_block_range(slice_start, slice_end, fetch_deposit_logs, progress=slice_progress)
+        complete = complete and slice_complete
+        for log in logs:
+            yield decode_deposit_log(log)
+    return complete
+
+def iter_deposits_indexed(start_block, latest_block, progress=None):
+    """
+    Generator form of fetch_deposits_indexed: yields decoded deposits one at a time, streamed from the
+    index, so memory stays flat however long the window is. Falls back to a full scan if the index is unavailable.
+    """
+    compacted = compacted_through_block()
+    if compacted is not None and compacted >= start_block:
+        # Small deposits this old were compacted into the rollups; re-read them from the API without re-indexing
+        print(f"📦 Blocks {start_block}-{compacted} are past raw retention; reading them from the API.")
+        complete = yield from _iter_scanned_deposits(start_block, min(compacted, latest_block), progress=progress)
+        if not complete:
+            print("🚨 ERROR: Some block ranges failed at minimal chunk size. Export will be partial.")
+        start_block = compacted + 1
+        if start_block > latest_block:
+            return
+
+    complete = fill_index_gaps(start_block, latest_block, progress=progress)
+    if complete is False:
+        print("🚨 ERROR: Some block ranges failed at minimal chunk size. Export will be partial.")
+    if complete is not None:
+        # Only fall back before the first row: once deposits have been yielded a rescan would repeat them.
+        rows = iter_deposits(start_block, latest_block)
+        try:
+            first = next(rows, None)
+        except Exception as e:
+            print(f"⚠️ Could not stream from deposit index, rescanning window directly: {e}")
+        else:
+            if first is not None:
+                yield first
+                yield from rows
+            return
+
+    complete = yield from _iter_scanned_deposits(start_block, latest_block, progress=progress)
+    if not complete:
+        print("🚨 ERROR: Some block ranges failed at minimal chunk size. Export will be partial.")
 
 def check_large_deposits_with_block(start_block=None):
     """
     Runs the deposit monitor check.
     If start_block is provided, scans from that block; otherwise, defaults to a 65-minute lookback.
+    Only blocks with DEPOSIT_CONFIRMATIONS confirmations are scanned, so the cursor saved from the result
+    sits below the head and a shallow reorg can't orphan its block hash.
     Returns a tuple: (alert_triggered, message, last_block_scanned)
     """
     # If no start block provided, do a full 65-minute lookback.
     if start_block is None:
         one_hour_ago = int(time.time()) - 3900  # 65 minutes ago
-        block_time_url = f"{ETHERSCAN_V2}&module=block&action=getblocknobytime&timestamp={one_hour_ago}&closest=before&apikey={API_KEY}"
-        block_response = make_request(block_time_url)
-        if not block_response:
+        start_block = get_block_by_time(one_hour_ago)
+        if start_block is None:
             return False, "Error: Could not fetch block time.", None
-        start_block = int(block_response["result"])
     
-    # Get the latest block number
-    latest_block_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_blockNumber&apikey={API_KEY}"
-    latest_block_response = make_request(latest_block_url)
-    if not latest_block_response:
+    # Get the latest confirmed block number
+    latest_block = get_latest_block()
+    if latest_block is None:
         return False, "Error: Could not fetch latest block.", None
-    latest_block = int(latest_block_response["result"], 16)
+    latest_block -= DEPOSIT_CONFIRMATIONS
+
+    # Nothing new since the last scan (the block watcher polls faster than blocks arrive)
+    if start_block > latest_block:
+        return False, "message", start_block - 1
 
     # Debug log for block numbers
     print(f"🟢 Scanning from block {start_block} to {latest_block}")
     
-    # Fetch deposit transactions from start_block to latest_block
-    tx_url = f"{ETHERSCAN_V2}&module=logs&action=getLogs&fromBlock={start_block}&toBlock={latest_block}&address={CONTRACT_ADDRESS}&topic0={DEPOSIT_EVENT_TOPIC}&apikey={API_KEY}"
-    tx_response = make_request(tx_url)
-    if not tx_response:
+    # Fetch deposits and every other watched contract event in the same query.
+    # A capped page only covers up to scan_end; the rest is picked up by the next scan.
+    logs, scan_end = fetch_watched_logs(start_block, latest_block)
+    if logs is None:
         return False, "Error: Could not fetch deposit logs.", None
-    deposits = tx_response.get("result", [])
-    
+
+    deposits = [log for log in logs if log["topics"][0].lower() == DEPOSIT_EVENT_TOPIC]
+    for log in logs:
+        remember_block_hash(log.get("blockNumber"), log.get("blockHash"))
+
+    # Keep the local deposit index in step with what the monitor has scanned
+    record_deposits(deposits, start_block, scan_end)
+
+    # Withdrawals, undelegations and clawbacks go to their handlers without extra API calls
+    dispatch(logs, event_handlers)
+
     # Process deposits and build the alert message; track the highest block scanned.
     alert_triggered = False
     messages = []
     sonicscan_tx_url = f"https://sonicscan.org/tx/"
     debank_url = f"https://debank.com/profile/"
 
-    if deposits:
-    # Use the last deposit block instead of the latest block if deposits were found
-        last_block_scanned = max(
-            int(deposit["blockNumber"], 16) if isinstance(deposit["blockNumber"], str) else int(deposit["blockNumber"])
-            for deposit in deposits
-    )
-    else:
-        # If no deposits were found, default to the latest block
-        last_block_scanned = latest_block
-
-
-    for deposit in deposits:
-        tx_hash = deposit.get('transactionHash', 'N/A')
-        sender = f"0x{deposit['topics'][1][-40:]}"
-        raw_amount_assets = deposit.get("data", "0x0")[:66]
-        deposit_amount_wei = w3.to_int(hexstr=raw_amount_assets)
-        deposit_amount = deposit_amount_wei / DECIMALS
-
-        # Update last_block_scanned (if blockNumber is hex, convert it)
-        deposit_block = int(deposit.get("blockNumber"), 16) if isinstance(deposit.get("blockNumber"), str) else int(deposit.get("blockNumber"))
-        last_block_scanned = max(last_block_scanned, deposit_block)
-
-        if deposit_amount >= FLAG_THRESHOLD:
-            alert_triggered = True
+    # Decode the whole range column-wise in one pass
+    batch = DepositBatch.from_logs(deposits)
+
+    # Use the last deposit block instead of the end of the covered range if deposits were found,
+    # otherwise default to the end of the covered range
+    last_block_scanned = max(batch.blocks) if len(batch) else scan_end
+
+    flagged_senders = set()
+    for i in batch.indices_at_least(FLAG_THRESHOLD):
+        alert_triggered = True
+        flagged_senders.add(batch.sender(i))
+        messages.append(
+            f"**ALERT!**, {batch.amounts[i]:,.2f} $S deposit by [DeBank Wallet](<{debank_url}{batch.sender(i)}>) at [SonicScan TX]({sonicscan_tx_url}{batch.tx_hash(i)}). Alert threshold = {FLAG_THRESHOLD:,.0f} $S."
+        )
+
+    # Split deposits: catch cumulative inflow that no single deposit pushes over the threshold
+    for rule, sender, window_sum in update_flow_window(batch, scan_end):
+        if rule == "sender" and sender in flagged_senders:
+            continue  # Already alerted on the single deposit itself
+        alert_triggered = True
+        minutes = flow_window.window_seconds // 60
+        if rule == "sender":
             messages.append(
-                f"**ALERT!**, {deposit_amount:,.2f} $S deposit by [DeBank Wallet](<{debank_url}{sender}>) at [SonicScan TX]({sonicscan_tx_url}{tx_hash}). Alert threshold = {FLAG_THRESHOLD:,.0f} $S."
+                f"**ALERT!**, [DeBank Wallet](<{debank_url}{sender}>) has deposited {window_sum:,.2f} $S within {minutes} minutes. Alert threshold = {flow_window.sender_threshold:,.0f} $S."
+            )
+        else:
+            messages.append(
+                f"**ALERT!**, {window_sum:,.2f} $S deposited into the contract within {minutes} minutes. Alert threshold = {flow_window.total_threshold:,.0f} $S."
             )
 
     if alert_triggered:
@@ -113,205 +518,211 @@ def check_large_deposits_with_block(start_block=None):
     else:
         return False, "message", last_block_scanned
 
-def check_large_deposits_custom(hours):
+def update_flow_window(batch, latest_block):
     """
-    Runs a historical large deposit check for a user-specified time window (in hours).
-    This function does NOT trigger alerts or pause automation.
-    Returns a tuple: (alert_triggered, message).
+    Feed a freshly scanned batch into the sliding-window aggregator and move it up to `latest_block`.
+    Returns the window alerts triggered, as (rule, sender, window_sum).
     """
-    BLOCK_CHUNK_SIZE = 25_000 # for history command deep search
-    MIN_BLOCK_CHUNK = 3_125  # Minimum chunk size before failing completely
-    RETRY_LIMIT = 2  # Number of retries before reducing chunk size
+    timestamps = batch.block_timestamps() if len(batch) else None
+    if timestamps is None:
+        # No anchors yet: the blocks were only just produced, so "now" is close enough
+        timestamps = [time.time()] * len(batch)
+    alerts = flow_window.observe_batch(batch, timestamps)
+    latest_timestamp = (estimate_timestamps([latest_block]) or [time.time()])[0]
+    flow_window.advance_to(latest_timestamp, latest_block)
+    return alerts
+
+def format_large_deposit(deposit):
+    """One history line for a large deposit ({"amount", "sender", "tx_hash"})."""
+    return (
+        f"{deposit['amount']:,.2f} $S deposited by [DeBank Wallet](<https://debank.com/profile/{deposit['sender']}>) "
+        f"at [SonicScan TX](https://sonicscan.org/tx/{deposit['tx_hash']})."
+    )
 
+def find_large_deposits(hours, progress=None):
+    """
+    Historical large deposit check (≥ FLAG_THRESHOLD) for a user-specified time window (in hours), as data.
+    This function does NOT trigger alerts or pause automation.
+    `progress(blocks_done, blocks_total)` is called as block ranges complete.
+    Returns {"deposits": [{"block_number", "tx_hash", "sender", "amount"}, ...] in block order,
+    "summary": statistics text}, or {"error": message}.
+    """
     window_seconds = int(hours * 3600)
     start_time = int(time.time()) - window_seconds
-    block_time_url = f"{ETHERSCAN_V2}&module=block&action=getblocknobytime&timestamp={start_time}&closest=before&apikey={API_KEY}"
-
-    block_response = make_request(block_time_url)
-    if not block_response:
+    start_block = get_block_by_time(start_time)
+    if start_block is None:
         print("🚨 Error: Could not fetch block time. Exiting history scan.")
-        return False, "Error: Could not fetch block time."
-
-    start_block = int(block_response["result"])
+        return {"error": "Error: Could not fetch block time."}
 
-    latest_block_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_blockNumber&apikey={API_KEY}"
-    latest_block_response = make_request(latest_block_url)
-    if not latest_block_response:
+    latest_block = get_latest_block()
+    if latest_block is None:
         print("🚨 Error: Could not fetch latest block number. Exiting history scan.")
-        return False, "Error: Could not fetch latest block."
-
-    latest_block = int(latest_block_response["result"], 16)
-
-    # Start with large chunk size but adjust dynamically if API struggles
-    deposits = []
-    current_start_block = start_block
-
-    while current_start_block <= latest_block:
-        current_end_block = min(current_start_block + BLOCK_CHUNK_SIZE, latest_block)
-        retries = 0
-
-        while retries < RETRY_LIMIT:
-            print(f"🔄 Querying blocks {current_start_block} to {current_end_block} (Chunk size: {BLOCK_CHUNK_SIZE})")
-            
-            tx_url = (
-                f"{ETHERSCAN_V2}&module=logs&action=getLogs"
-                f"&fromBlock={current_start_block}&toBlock={current_end_block}"
-                f"&address={CONTRACT_ADDRESS}&topic0={DEPOSIT_EVENT_TOPIC}&apikey={API_KEY}"
-            )
-
-            tx_response = make_request(tx_url)
-
-            if tx_response and "result" in tx_response:
-                print(f"✅ Retrieved {len(tx_response['result'])} transactions from blocks {current_start_block} to {current_end_block}.")
-                deposits.extend(tx_response["result"])
-                break  # Success, exit retry loop
-
-            else:
-                print(f"⚠️ Warning: No response or empty data for blocks {current_start_block} to {current_end_block}. Possible timeout or rate limit.")
-                retries += 1
-                time.sleep(10 * retries)  # Wait longer on each retry
-            
-                # If we hit retry limit, reduce block chunk size
-                if retries == RETRY_LIMIT and BLOCK_CHUNK_SIZE > MIN_BLOCK_CHUNK:
-                    BLOCK_CHUNK_SIZE = max(BLOCK_CHUNK_SIZE // 2, MIN_BLOCK_CHUNK)
-                    print(f"⚠️ Reducing block chunk size to {BLOCK_CHUNK_SIZE} and retrying.")
-
-        # **🚨 Final Failure Condition**
-        if retries == RETRY_LIMIT and BLOCK_CHUNK_SIZE == MIN_BLOCK_CHUNK:
-            print("🚨 ERROR: All retries failed! Could not retrieve deposit history.")
-            return False, "Error: API rate limits or network failures prevented retrieving historical deposits."                    
-
-        # Move to the next chunk
-        current_start_block = current_end_block + 1
-
-    # Process deposits and filter only large ones
-    messages = []
-    sonicscan_tx_url = "https://sonicscan.org/tx/"
-    debank_url = f"https://debank.com/profile/"
-
+        return {"error": "Error: Could not fetch latest block."}
+
+    if hours > ROLLUP_HISTORY_HOURS:
+        rolled_up = check_large_deposits_rollup(hours, start_time, start_block, latest_block, progress=progress)
+        if rolled_up is not None:
+            return rolled_up
+
+    # Serve the window from the deposit index, scanning only blocks it hasn't covered yet
+    deposits, complete = fetch_deposits_indexed(start_block, latest_block, progress=progress)
+    if not complete:
+        print("🚨 ERROR: All retries failed! Could not retrieve deposit history.")
+        return {"error": "Error: API rate limits or network failures prevented retrieving historical deposits."}
+
+    # One pass: fold every deposit into the statistics and keep only the large ones
+    stats = DepositStats()
+    large = []
     for deposit in deposits:
-        tx_hash = deposit.get('transactionHash', 'N/A')
-        sender = f"0x{deposit['topics'][1][-40:]}"
-        raw_amount_assets = deposit.get("data", "0x0")[:66]
-        deposit_amount_wei = w3.to_int(hexstr=raw_amount_assets)
-        deposit_amount = deposit_amount_wei / DECIMALS
-
-        if deposit_amount >= FLAG_THRESHOLD:
-            messages.append(
-                f"{deposit_amount:,.2f} $S deposited by [DeBank Wallet](<{debank_url}{sender}>) at [SonicScan TX]({sonicscan_tx_url}{tx_hash})."
-            )
-
-    if messages:
-        print(f"🚀 Found {len(messages)} large deposits in the last {hours} hours.")
-        return True, "\n\n".join(messages)
-    else:
-        print(f"✅ No large deposits (≥ {FLAG_THRESHOLD:,.0f} S tokens) found in the last {hours} hours.")
-        return False, f"✅ No large deposits (≥ {FLAG_THRESHOLD:,.0f} S tokens) were found in the last {hours} hours."
+        stats.add(deposit["block_number"], deposit["sender"], deposit["amount"])
+        if deposit["amount"] >= FLAG_THRESHOLD:
+            large.append({key: deposit[key] for key in ("block_number", "tx_hash", "sender", "amount")})
+    print(f"🔍 Found {len(large)} large deposits in the last {hours} hours.")
+    return {"deposits": large, "summary": stats.summary_text()}
 
-def fetch_all_deposits_custom(hours):
+def check_large_deposits_custom(hours, progress=None):
+    """
+    Text form of find_large_deposits: every large deposit line followed by the statistics.
+    Returns a tuple: (alert_triggered, message).
+    """
+    result = find_large_deposits(hours, progress=progress)
+    if "error" in result:
+        return False, result["error"]
+    if result["deposits"]:
+        messages = [format_large_deposit(deposit) for deposit in result["deposits"]]
+        return True, "\n\n".join(messages) + "\n\n" + result["summary"]
+    return False, f"✅ No large deposits (≥ {FLAG_THRESHOLD:,.0f} S tokens) were found in the last {hours} hours.\n\n{result['summary']}"
+
+def check_large_deposits_rollup(hours, start_time, start_block, latest_block, progress=None):
+    """
+    Long-window form of find_large_deposits: large deposits come from the index's amount index and the
+    statistics from the hourly/daily rollups, so the cost doesn't grow with the number of raw deposits.
+    Returns the same dict as find_large_deposits, or None if the index can't answer (caller falls back to raw rows).
+    """
+    complete = fill_index_gaps(start_block, latest_block, progress=progress)
+    if complete is None:
+        return None
+    if not complete:
+        print("🚨 ERROR: All retries failed! Could not retrieve deposit history.")
+        return {"error": "Error: API rate limits or network failures prevented retrieving historical deposits."}
+    try:
+        large = query_large_deposits(start_block, latest_block, FLAG_THRESHOLD)
+        now = int(time.time())
+        totals = rollup_totals(start_time, now)
+        days = rollup_buckets("day", start_time // 86400 * 86400, now)
+    except Exception as e:
+        print(f"⚠️ Could not read deposit rollups, falling back to raw rows: {e}")
+        return None
+    if totals is None:
+        return None
+
+    lines = [
+        f"📊 **Deposit statistics** (from rollups): {totals['count']:,} deposits totaling {totals['total']:,.1f} S tokens",
+        f"- **Max**: {totals['max']:,.1f} | **Distinct depositors**: {totals['depositors']:,}",
+    ]
+    if days:
+        busiest = sorted(days, key=lambda bucket: bucket[2], reverse=True)[:3]
+        lines.append(f"- **Active days**: {len(days)} | **Busiest**: " + ", ".join(
+            f"<t:{day}:d> {total:,.0f} S ({count})" for day, count, total, _max, _depositors in busiest
+        ))
+
+    print(f"🔍 Found {len(large)} large deposits in the last {hours} hours (rollups).")
+    return {"deposits": large, "summary": "\n".join(lines)}
+
+def fetch_all_deposits_custom(hours, progress=None):
     """
     Fetches ALL deposits to the staking contract within the specified number of hours.
+    `progress(blocks_done, blocks_total)` is called as block ranges complete.
     Returns a list of deposit dictionaries, each containing:
       - 'tx_hash'
       - 'sender'
       - 'amount'  (float)
     """
-    BLOCK_CHUNK_SIZE = 25_000
-    MIN_BLOCK_CHUNK = 3_125
-    RETRY_LIMIT = 2
-
     # 1) Convert hours to a Unix timestamp
     window_seconds = int(hours * 3600)
     start_time = int(time.time()) - window_seconds
 
     # 2) Convert start_time to a block number
-    block_time_url = (
-        f"{ETHERSCAN_V2}"
-        f"&module=block"
-        f"&action=getblocknobytime"
-        f"&timestamp={start_time}"
-        f"&closest=before"
-        f"&apikey={API_KEY}"
-    )
-    block_response = make_request(block_time_url)
-    if not block_response:
+    start_block = get_block_by_time(start_time)
+    if start_block is None:
         print("🚨 Error: Could not fetch block time. Returning empty list.")
         return []
 
-    start_block = int(block_response["result"])
-
     # 3) Get latest block
-    latest_block_url = f"{ETHERSCAN_V2}&module=proxy&action=eth_blockNumber&apikey={API_KEY}"
-    latest_block_response = make_request(latest_block_url)
-    if not latest_block_response:
+    latest_block = get_latest_block()
+    if latest_block is None:
         print("🚨 Error: Could not fetch latest block number. Returning empty list.")
         return []
 
-    latest_block = int(latest_block_response["result"], 16)
-
-    # 4) Walk through blocks in chunks, collecting all deposit logs
-    deposits = []
-    current_start_block = start_block
-
-    while current_start_block <= latest_block:
-        current_end_block = min(current_start_block + BLOCK_CHUNK_SIZE, latest_block)
-        retries = 0
-
-        while retries < RETRY_LIMIT:
-            print(f"🔄 Querying blocks {current_start_block} to {current_end_block}")
-            tx_url = (
-                f"{ETHERSCAN_V2}&module=logs&action=getLogs"
-                f"&fromBlock={current_start_block}"
-                f"&toBlock={current_end_block}"
-                f"&address={CONTRACT_ADDRESS}"
-                f"&topic0={DEPOSIT_EVENT_TOPIC}"
-                f"&apikey={API_KEY}"
-            )
+    # 4) Read the window from the deposit index, scanning only blocks it hasn't covered yet
+    deposits, complete = fetch_deposits_indexed(start_block, latest_block, progress=progress)
+    if not complete:
+        print("🚨 ERROR: All retries failed at minimal chunk size. Returning partial results we have so far.")
 
-            tx_response = make_request(tx_url)
-            if tx_response and "result" in tx_response:
-                these_logs = tx_response["result"]
-                print(f"✅ Retrieved {len(these_logs)} deposit logs from blocks {current_start_block} to {current_end_block}.")
-                deposits.extend(these_logs)
-                break
-            else:
-                retries += 1
-                print(f"⚠️ Attempt {retries} failed for blocks {current_start_block} to {current_end_block}. Retrying...")
-                time.sleep(10 * retries)
-
-                # If we exhaust retries, reduce chunk size if possible
-                if retries == RETRY_LIMIT and BLOCK_CHUNK_SIZE > MIN_BLOCK_CHUNK:
-                    BLOCK_CHUNK_SIZE = max(BLOCK_CHUNK_SIZE // 2, MIN_BLOCK_CHUNK)
-                    print(f"⚠️ Reducing block chunk size to {BLOCK_CHUNK_SIZE} and retrying.")
-
-        # **Fail condition** if chunk size is already minimal
-        if retries == RETRY_LIMIT and BLOCK_CHUNK_SIZE == MIN_BLOCK_CHUNK:
-            print("🚨 ERROR: All retries failed at minimal chunk size. Returning partial results we have so far.")
-            break
-
-        current_start_block = current_end_block + 1
-
-    # 5) Convert logs to a more convenient structure: (tx_hash, sender, amount)
+    # 5) Convert to a more convenient structure: (tx_hash, sender, amount)
     deposit_list = []
     for deposit in deposits:
-        tx_hash = deposit.get('transactionHash', 'N/A')
-        # sender is in topics[1]
-        sender_topic = deposit["topics"][1]  # raw
-        sender_address = f"0x{sender_topic[-40:]}"
-        
-        # amount is in the first 32 bytes of data
-        raw_amount_assets = deposit.get("data", "0x0")[:66]  # Just the first 32 bytes
-        deposit_amount_wei = w3.to_int(hexstr=raw_amount_assets)
-        deposit_amount = deposit_amount_wei / DECIMALS
-
         deposit_list.append({
-            "tx_hash": tx_hash,
-            "sender": sender_address,
-            "amount": deposit_amount
+            "tx_hash": deposit["tx_hash"],
+            "sender": deposit["sender"],
+            "amount": deposit["amount"]
         })
 
     return deposit_list
 
+def iter_all_deposits_custom(hours, progress=None):
+    """
+    Streaming counterpart of fetch_all_deposits_custom for exports: a generator of decoded deposits
+    (block_number, tx_hash, sender, amount, ...) in block order. Raises RuntimeError if the window
+    itself can't be resolved, so callers can tell "no deposits" from "no data".
+    """
+    start_time = int(time.time()) - int(hours * 3600)
+    start_block = get_block_by_time(start_time)
+    if start_block is None:
+        raise RuntimeError("Could not fetch block time.")
+    latest_block = get_latest_block()
+    if latest_block is None:
+        raise RuntimeError("Could not fetch latest block.")
+
+    yield from iter_deposits_indexed(start_block, latest_block, progress=progress)
+
+def lookup_depositor(sender, progress=None):
+    """
+    Deposit history for one address from the index's sender index. Block ranges never indexed (neither by a
+    full scan nor by an earlier lookup of this address) are backfilled first with topic1-filtered queries.
+    Returns (deposits, summary, complete); deposits are the newest DEPOSITOR_HISTORY_ROWS, or (None, None, False) on failure.
+    """
+    latest_block = get_latest_block()
+    if latest_block is None:
+        print("🚨 Error: Could not fetch latest block number. Exiting depositor lookup.")
+        return None, None, False
+
+    deploy_block = get_contract_deploy_block()
+    if deploy_block is None:
+        gaps, complete = [], False  # Answer from the index alone rather than backfill from genesis
+    else:
+        gaps, complete = uncovered_ranges(deploy_block, latest_block, sender=sender), True
+    if gaps is None:
+        return None, None, False
+    for gap_start, gap_end in gaps:
+        span = gap_end - gap_start + 1
+        logs, gap_complete = scan_block_range(
+            gap_start, gap_end, lambda start, end: fetch_sender_deposit_logs(start, end, sender),
+            initial_chunk=span, max_chunk=span, progress=progress,
+        )
+        if gap_complete:
+            record_deposits(logs, gap_start, gap_end, sender=sender)
+        else:
+            record_deposits(logs)
+            complete = False
+
+    try:
+        deposits, summary = query_sender_deposits(sender, limit=DEPOSITOR_HISTORY_ROWS)
+    except Exception as e:
+        print(f"⚠️ Could not read depositor history: {e}")
+        return None, None, False
+    return deposits, summary, complete
+
 def split_long_message(msg, max_length=MAX_MESSAGE_LENGTH):
     """Splits a long message into multiple messages under Discord's 2000-character limit."""
     messages = []
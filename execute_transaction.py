@@ -1,9 +1,9 @@
 import os
 import time
-import requests
 from web3 import Web3
 from eth_account import Account
 from dotenv import load_dotenv
+from http_transport import request
 
 # Load environment variables
 load_dotenv()
@@ -65,7 +65,10 @@ def fetch_transaction_by_nonce(nonce):
     try:
         # Fetch all pending transactions
         url = f"{BASE_URL}/api/v1/safes/{SAFE_ADDRESS}/multisig-transactions/"
-        response = requests.get(url)
+        response = request("GET", url, timeout=10, label="Gnosis API")
+        if response is None:
+            print(f"Failed to fetch transactions for Safe {SAFE_ADDRESS}: retry budget exhausted.")
+            return None
         print(f"Fetching transactions for Safe {SAFE_ADDRESS}: {response.status_code}")
 
         # Check for successful response
@@ -1,7 +1,7 @@
 import os
-import time
-import requests
 from dotenv import load_dotenv
+from http_transport import get_json
+from safe_events import is_executed_on_chain
 
 # Load environment variables
 load_dotenv()
@@ -9,8 +9,7 @@ load_dotenv()
 # Constants
 SAFE_ADDRESS = os.getenv("SAFE_ADDRESS")
 BASE_URL = os.getenv("BASE_URL")
-MAX_RETRIES    = 4          # 1 s → 2 s → 4 s → 8 s
-BACKOFF_FACTOR = 2
+MAX_RETRIES    = 4          # Retry budget per call; backoff lives in http_transport
 
 def fetch_recent_transactions(limit=15):
     """Fetch the last `limit` transactions from the Gnosis Safe API."""
@@ -18,29 +17,20 @@ def fetch_recent_transactions(limit=15):
         raise ValueError("Environment variables SAFE_ADDRESS and BASE_URL must be set.")
 
     url = f"{BASE_URL}/api/v1/safes/{SAFE_ADDRESS}/multisig-transactions/?limit={limit}"
-    delay = 1
 
-    for attempt in range(MAX_RETRIES):
-    
-        try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            results = response.json().get("results", [])
-
-            # Add signature counts to each transaction
-            for tx in results:
-                tx["signature_count"] = len(tx.get("confirmations", []))
-                tx["confirmations_required"] = tx.get("confirmationsRequired", 0)
-            return results
-        
-        except (requests.exceptions.RequestException, ValueError) as e:
-            print(f"Gnosis API error (attempt {attempt+1}/{MAX_RETRIES}): {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(delay)
-                delay *= BACKOFF_FACTOR
-    # if All retries failed
-    print("Gnosis API unreachable after retries — returning empty list.")
-    return []        # graceful fallback
+    data = get_json(url, timeout=10, max_attempts=MAX_RETRIES, label="Gnosis API")
+    if data is None:
+        # if All retries failed
+        print("Gnosis API unreachable after retries — returning empty list.")
+        return []        # graceful fallback
+
+    results = data.get("results", [])
+
+    # Add signature counts to each transaction
+    for tx in results:
+        tx["signature_count"] = len(tx.get("confirmations", []))
+        tx["confirmations_required"] = tx.get("confirmationsRequired", 0)
+    return results
 
 def filter_and_sort_pending_transactions(transactions):
     """
@@ -51,8 +41,10 @@ def filter_and_sort_pending_transactions(transactions):
 
     for tx in transactions:
 
-        # Ignore executed transactions and remove all others with the same nonce
-        if tx["isExecuted"]:
+        # Ignore executed transactions and remove all others with the same nonce.
+        # The on-chain event follower catches executions the Safe API hasn't indexed yet.
+        if tx["isExecuted"] or is_executed_on_chain(tx):
+            tx["isExecuted"] = True
             # Mark this nonce as executed and remove any existing pending transactions for it
             latest_transactions[tx["nonce"]] = tx
             continue
@@ -0,0 +1,145 @@
+import os
+from array import array
+
+FLOW_WINDOW_SECONDS = int(os.getenv("FLOW_WINDOW_SECONDS", "3600"))  # Sliding window for cumulative inflow alerts
+FLOW_BUCKET_SECONDS = int(os.getenv("FLOW_BUCKET_SECONDS", "60"))  # Ring buffer resolution
+# Cumulative inflow within the window that triggers an alert; 0 disables the rule.
+FLOW_SENDER_THRESHOLD = float(os.getenv("FLOW_SENDER_THRESHOLD", "100000"))
+FLOW_TOTAL_THRESHOLD = float(os.getenv("FLOW_TOTAL_THRESHOLD", "500000"))
+PRUNE_EVERY_SECONDS = 300  # Chain-time interval between sweeps that drop idle senders
+
+class _Ring:
+    """Fixed number of time buckets plus their running sum; old buckets are zeroed as time moves forward."""
+
+    __slots__ = ("buckets", "head", "total")
+
+    def __init__(self, size, head):
+        self.buckets = array("d", bytes(8 * size))
+        self.head = head  # Absolute bucket index of the newest slot
+        self.total = 0.0
+
+    def advance(self, bucket):
+        """Move the head forward to `bucket`, expiring every slot that falls out of the window."""
+        size = len(self.buckets)
+        steps = bucket - self.head
+        if steps <= 0:
+            return
+        if steps >= size:
+            for slot in range(size):
+                self.buckets[slot] = 0.0
+            self.total = 0.0
+        else:
+            for offset in range(1, steps + 1):
+                slot = (self.head + offset) % size
+                self.total -= self.buckets[slot]
+                self.buckets[slot] = 0.0
+        self.head = bucket
+
+    def add(self, bucket, amount):
+        """Add `amount` to `bucket`. Returns False if the bucket is already outside the window."""
+        self.advance(bucket)
+        if self.head - bucket >= len(self.buckets):
+            return False
+        self.buckets[bucket % len(self.buckets)] += amount
+        self.total += amount
+        return True
+
+class FlowWindow:
+    """
+    Incremental sliding-window inflow per sender and for the whole contract.
+    Each deposit costs O(1) (plus the bucket expiry it triggers); state is one ring of
+    window / bucket slots per sender seen within the window, and idle senders are pruned.
+    Rules fire once when a sum crosses its threshold and re-arm after it falls back below.
+    """
+
+    def __init__(self, window_seconds=FLOW_WINDOW_SECONDS, bucket_seconds=FLOW_BUCKET_SECONDS,
+                 sender_threshold=FLOW_SENDER_THRESHOLD, total_threshold=FLOW_TOTAL_THRESHOLD):
+        self.bucket_seconds = bucket_seconds
+        self.size = max(window_seconds // bucket_seconds, 1)
+        self.window_seconds = self.size * bucket_seconds
+        self.sender_threshold = sender_threshold
+        self.total_threshold = total_threshold
+        self.senders = {}  # sender -> _Ring
+        self.total = None  # _Ring for the whole contract, created on the first deposit
+        self.last_block = None  # Highest block already observed; rescanned blocks are skipped
+        self.alerted_senders = set()
+        self.total_alerted = False
+        self._last_prune = None
+
+    def observe(self, timestamp, sender, amount):
+        """
+        Add one deposit. Returns a list of (rule, sender_or_None, window_sum) alerts it triggered,
+        where rule is "sender" or "total".
+        """
+        bucket = int(timestamp) // self.bucket_seconds
+        alerts = []
+
+        if self.total is None:
+            self.total = _Ring(self.size, bucket)
+        self.total.add(bucket, amount)
+
+        ring = self.senders.get(sender)
+        if ring is None:
+            ring = self.senders[sender] = _Ring(self.size, bucket)
+        if ring.add(bucket, amount) and self.sender_threshold:
+            if ring.total >= self.sender_threshold:
+                if sender not in self.alerted_senders:
+                    self.alerted_senders.add(sender)
+                    alerts.append(("sender", sender, ring.total))
+            else:
+                self.alerted_senders.discard(sender)
+
+        if self.total_threshold:
+            if self.total.total >= self.total_threshold:
+                if not self.total_alerted:
+                    self.total_alerted = True
+                    alerts.append(("total", None, self.total.total))
+            else:
+                self.total_alerted = False
+
+        if self._last_prune is None or timestamp - self._last_prune >= PRUNE_EVERY_SECONDS:
+            self.prune(timestamp)
+        return alerts
+
+    def observe_batch(self, batch, timestamps):
+        """
+        Feed a DepositBatch (with per-row timestamps) in block order, skipping blocks observed before.
+        Returns the alerts triggered across the batch.
+        """
+        alerts = []
+        floor = self.last_block
+        for i, block in enumerate(batch.blocks):
+            if floor is not None and block <= floor:
+                continue
+            alerts.extend(self.observe(timestamps[i], batch.sender(i), batch.amounts[i]))
+            if self.last_block is None or block > self.last_block:
+                self.last_block = block
+        return alerts
+
+    def advance_to(self, timestamp, block_number=None):
+        """Move the window forward on an empty block range so sums decay and rules re-arm."""
+        bucket = int(timestamp) // self.bucket_seconds
+        if self.total is not None:
+            self.total.advance(bucket)
+            if self.total.total < self.total_threshold:
+                self.total_alerted = False
+        if block_number is not None and (self.last_block is None or block_number > self.last_block):
+            self.last_block = block_number
+        if self._last_prune is None or timestamp - self._last_prune >= PRUNE_EVERY_SECONDS:
+            self.prune(timestamp)
+
+    def prune(self, timestamp):
+        """Drop senders with nothing left inside the window."""
+        bucket = int(timestamp) // self.bucket_seconds
+        for sender in [s for s, ring in self.senders.items() if bucket - ring.head >= self.size]:
+            del self.senders[sender]
+            self.alerted_senders.discard(sender)
+        self._last_prune = timestamp
+
+    def sender_total(self, sender):
+        """Current window sum for one sender (as of the last observed bucket)."""
+        ring = self.senders.get(sender)
+        return ring.total if ring else 0.0
+
+    def window_total(self):
+        return self.total.total if self.total else 0.0
@@ -0,0 +1,130 @@
+import discord
+from deposit_monitor import format_large_deposit
+
+HISTORY_PAGE_SIZE = 6  # Most deposit lines per page; fewer if their real length wouldn't fit
+HISTORY_VIEW_TIMEOUT = 900  # Seconds the buttons stay live after the last click
+MAX_MESSAGE_CHARS = 2000  # Discord's message limit
+SUMMARY_HINT = "-# 📊 Window statistics: **Summary** button."
+
+SORT_ORDERS = {
+    "newest": ("Newest first", lambda deposit: -deposit["block_number"]),
+    "oldest": ("Oldest first", lambda deposit: deposit["block_number"]),
+    "largest": ("Largest first", lambda deposit: -deposit["amount"]),
+    "smallest": ("Smallest first", lambda deposit: deposit["amount"]),
+}
+
+class HistoryView(discord.ui.View):
+    """
+    Paginated !history result. The deposits stay here and each page is rendered only when it is shown,
+    so a wide window costs one message plus an edit per click instead of dozens of messages.
+    Pages are cut from the real line lengths so a page never exceeds Discord's limit; the window
+    statistics have their own page behind the Summary button.
+    """
+
+    def __init__(self, deposits, title, summary, sort="newest"):
+        super().__init__(timeout=HISTORY_VIEW_TIMEOUT)
+        self.deposits = list(deposits)
+        self.title = title
+        self.summary = summary
+        self.page = 0
+        self.showing_summary = False
+        self.pages = []  # (first, end) deposit index ranges, recomputed on every sort
+        self.message = None  # Set by the sender, so the buttons can be disabled on timeout
+        self._sort(sort)
+
+    @property
+    def page_count(self):
+        return max(len(self.pages), 1)
+
+    def _sort(self, sort):
+        self.sort = sort
+        self.deposits.sort(key=SORT_ORDERS[sort][1])
+        self.pages = self._paginate()
+        self.page = 0
+
+    def _header(self, page, page_count):
+        return f"{self.title} · page {page}/{page_count} · {SORT_ORDERS[self.sort][0].lower()}"
+
+    def _line(self, index):
+        return f"{index + 1}. {format_large_deposit(self.deposits[index])}"
+
+    def _paginate(self):
+        """Split the deposits into pages of at most HISTORY_PAGE_SIZE lines that fit with the header and hint."""
+        worst = len(self.deposits) or 1  # Header width with the widest page numbers it can show
+        budget = MAX_MESSAGE_CHARS - len(self._header(worst, worst)) - len(SUMMARY_HINT) - 4  # 4: blank-line breaks
+        pages = []
+        first = 0
+        while first < len(self.deposits):
+            end, used = first, 0
+            while end < len(self.deposits) and end - first < HISTORY_PAGE_SIZE:
+                length = len(self._line(end)) + 1
+                if end > first and used + length > budget:
+                    break
+                used += length
+                end += 1
+            pages.append((first, end))
+            first = end
+        return pages
+
+    def render(self):
+        """Text of the current page: header, this page's deposit lines and the Summary hint; or the summary page."""
+        self._update_buttons()
+        if self.showing_summary:
+            return self._render_summary()
+        first, end = self.pages[self.page] if self.pages else (0, 0)
+        lines = [self._header(self.page + 1, self.page_count), ""]
+        lines += [self._line(index) for index in range(first, end)]
+        lines += ["", SUMMARY_HINT]
+        return "\n".join(lines)
+
+    def _render_summary(self):
+        """The statistics page; cut only at line boundaries, so its markdown stays intact."""
+        lines = [self.title, ""]
+        length = len(self.title) + 1
+        for line in self.summary.split("\n"):
+            if length + len(line) + 1 > MAX_MESSAGE_CHARS:
+                break
+            lines.append(line)
+            length += len(line) + 1
+        return "\n".join(lines)
+
+    def _update_buttons(self):
+        self.previous_page.disabled = self.showing_summary or self.page == 0
+        self.next_page.disabled = self.showing_summary or self.page >= self.page_count - 1
+        self.toggle_summary.label = "📄 Deposits" if self.showing_summary else "📊 Summary"
+
+    async def _show(self, interaction):
+        await interaction.response.edit_message(content=self.render(), view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, button):
+        self.page = max(self.page - 1, 0)
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, button):
+        self.page = min(self.page + 1, self.page_count - 1)
+        await self._show(interaction)
+
+    @discord.ui.button(label="📊 Summary", style=discord.ButtonStyle.primary)
+    async def toggle_summary(self, interaction, button):
+        self.showing_summary = not self.showing_summary
+        await self._show(interaction)
+
+    @discord.ui.select(
+        placeholder="Sort by…",
+        options=[discord.SelectOption(label=label, value=value) for value, (label, _key) in SORT_ORDERS.items()],
+    )
+    async def sort_by(self, interaction, select):
+        self._sort(select.values[0])
+        self.showing_summary = False
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message is not None:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass  # Message deleted; nothing to disable
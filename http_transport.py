@@ -0,0 +1,225 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Requests/second allowed per host. Etherscan's free tier allows 5/s; stay a little under it.
+HOST_RATE_LIMITS = {
+    "api.etherscan.io": float(os.getenv("ETHERSCAN_RATE_LIMIT", "4")),
+}
+_safe_api_host = urlparse(os.getenv("BASE_URL") or "").hostname
+if _safe_api_host:
+    HOST_RATE_LIMITS[_safe_api_host] = float(os.getenv("SAFE_API_RATE_LIMIT", "5"))
+_rpc_host = urlparse(os.getenv("SONIC_RPC_URL") or "").hostname
+if _rpc_host:
+    HOST_RATE_LIMITS[_rpc_host] = float(os.getenv("RPC_RATE_LIMIT", "25"))
+DEFAULT_RATE_LIMIT = 10  # Hosts not listed above
+BURST_SECONDS = 1  # Bucket capacity = rate * BURST_SECONDS
+
+DEFAULT_TIMEOUT = 5  # Seconds per attempt
+DEFAULT_MAX_ATTEMPTS = 5  # Attempts per request (the retry budget)
+DEFAULT_BUDGET_SECONDS = 30  # Wall-clock budget per request, including backoff
+BACKOFF_BASE = 0.5  # Seconds; doubled per retry, with jitter
+BACKOFF_MAX = 8
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+POOL_SIZE = 10  # Keep-alive connections per host
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Take one token. Returns True if the caller had to wait (i.e. was throttled)."""
+        waited = False
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            waited = True
+            time.sleep(wait)
+
+    def available(self):
+        """Fraction of the bucket currently available (0.0 - 1.0)."""
+        with self._lock:
+            self._refill()
+            return self.tokens / self.capacity
+
+_lock = threading.Lock()
+_sessions = {}  # host -> requests.Session
+_buckets = {}  # host -> TokenBucket
+_stats = {"requests": 0, "throttled": 0, "retried": 0, "failed": 0, "not_modified": 0}
+
+def _host(url):
+    return urlparse(url).hostname or ""
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+def get_session(url):
+    """Shared keep-alive session for the URL's host."""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+def _bucket(url):
+    host = _host(url)
+    with _lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            rate = HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            bucket = TokenBucket(rate, max(rate * BURST_SECONDS, 1))
+            _buckets[host] = bucket
+        return bucket
+
+def throttle(url):
+    """Block until the URL's host has rate-limit budget for one more call."""
+    if _bucket(url).acquire():
+        _count("throttled")
+
+def rate_limit_headroom(url):
+    """Fraction of the host's rate-limit bucket currently free. Background jobs use this to back off."""
+    return _bucket(url).available()
+
+def transport_stats():
+    """Snapshot of the transport counters: requests, throttled, retried, failed, not_modified."""
+    with _lock:
+        return dict(_stats)
+
+def _backoff(attempt, retry_after=None):
+    if retry_after is not None:
+        return retry_after
+    delay = min(BACKOFF_BASE * (2 ** attempt), BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)  # Jitter so parallel callers don't retry in lockstep
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+def request(method, url, *, timeout=DEFAULT_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS,
+            budget_seconds=DEFAULT_BUDGET_SECONDS, retry_if=None, label="HTTP", **kwargs):
+    """
+    Rate-limited, pooled HTTP call with a per-request retry budget.
+    Retries timeouts, connection errors and 429/5xx (honouring Retry-After) until `max_attempts`
+    or `budget_seconds` is used up. `retry_if(response)` may flag otherwise-OK responses as retryable
+    (e.g. Etherscan's "Max rate limit reached" payload).
+    Returns the final requests.Response (possibly a non-retryable error status), or None if the budget ran out.
+    """
+    deadline = time.monotonic() + budget_seconds
+    session = get_session(url)
+
+    for attempt in range(max_attempts):
+        throttle(url)
+        _count("requests")
+        retry_after = None
+        try:
+            response = session.request(method, url, timeout=timeout, **kwargs)
+            if response.status_code in RETRY_STATUS_CODES:
+                retry_after = _retry_after(response)
+                if response.status_code == 429:
+                    _count("throttled")
+                print(f"⚠️ {label} returned {response.status_code} (attempt {attempt + 1}/{max_attempts}).")
+            elif retry_if is not None and retry_if(response):
+                print(f"⚠️ {label} asked us to slow down (attempt {attempt + 1}/{max_attempts}).")
+                _count("throttled")
+            else:
+                return response
+        except requests.exceptions.Timeout:
+            print(f"⏳ {label} timeout (attempt {attempt + 1}/{max_attempts}): no response within {timeout} seconds.")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ {label} request failed (attempt {attempt + 1}/{max_attempts}): {e}")
+
+        delay = _backoff(attempt, retry_after)
+        if attempt == max_attempts - 1 or time.monotonic() + delay > deadline:
+            break
+        _count("retried")
+        time.sleep(delay)
+
+    _count("failed")
+    print(f"🚨 {label} retry budget exhausted. Skipping this request.")
+    return None
+
+def get_json(url, *, retry_if_json=None, **kwargs):
+    """
+    GET a URL and return the decoded JSON body, or None if the call or the decode failed.
+    `retry_if_json(data)` may flag a decoded body as retryable.
+    """
+    def retry_if(response):
+        if retry_if_json is None:
+            return False
+        try:
+            return retry_if_json(response.json())
+        except ValueError:
+            return False
+
+    response = request("GET", url, retry_if=retry_if, **kwargs)
+    if response is None:
+        return None
+    try:
+        response.raise_for_status()
+        return response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        _count("failed")
+        print(f"❌ {kwargs.get('label', 'HTTP')} request failed: {e}")
+        return None
+
+def get_json_conditional(url, validators=None, **kwargs):
+    """
+    Conditional GET for polling: sends If-None-Match / If-Modified-Since built from `validators` (the ETag and
+    Last-Modified of the previous response), so an unchanged resource costs a bodiless 304.
+    Returns (status, data, validators) with status "changed", "unchanged" or "error"; data is None unless changed.
+    """
+    validators = validators or {}
+    headers = dict(kwargs.pop("headers", None) or {})
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+
+    response = request("GET", url, headers=headers, **kwargs)
+    if response is None:
+        return "error", None, validators
+    if response.status_code == 304:
+        _count("not_modified")
+        return "unchanged", None, validators
+    try:
+        response.raise_for_status()
+        data = response.json()
+    except (requests.exceptions.RequestException, ValueError) as e:
+        _count("failed")
+        print(f"❌ {kwargs.get('label', 'HTTP')} request failed: {e}")
+        return "error", None, validators
+    return "changed", data, {
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+    }
@@ -0,0 +1,203 @@
+import asyncio
+import io
+import os
+import threading
+import time
+import discord
+from http_transport import rate_limit_headroom
+from scan_scheduler import ScanCancelled
+from deposit_monitor import log_backend_url
+
+JOBS_MAX_RUNNING = int(os.getenv("JOBS_MAX_RUNNING", "2"))  # Long scans running at once; the rest queue
+JOBS_MAX_PER_USER = int(os.getenv("JOBS_MAX_PER_USER", "2"))  # Queued + running jobs one user may have
+JOBS_MAX_TOTAL = int(os.getenv("JOBS_MAX_TOTAL", "6"))  # Queued + running jobs overall
+# Fraction of the log backend's rate-limit bucket that must be free for a job to fetch its next range;
+# below it the job waits, so the block watcher and the recheck always have budget left.
+JOB_MIN_HEADROOM = float(os.getenv("JOB_MIN_HEADROOM", "0.3"))
+JOB_PROGRESS_INTERVAL = 5  # Seconds between progress-message edits
+JOB_HISTORY = 10  # Finished jobs listed by !jobs
+
+class Job:
+    """One long-running command (e.g. !history 720), shared by everyone who asked for the same thing."""
+
+    def __init__(self, job_id, kind, key, owner_id, description):
+        self.id = job_id
+        self.kind = kind
+        self.key = key
+        self.owner_id = owner_id
+        self.description = description
+        self.status = "queued"  # queued, running, done, failed, cancelled
+        self.error = None
+        self.progress = None  # (blocks_done, blocks_total) as last reported by the scan
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = []  # ctx of every command attached to this job; results go to all of them
+        self.results_sent = 0  # Once results start going out, later requests can't be attached any more
+        self.status_messages = []  # One progress message per subscriber, edited in place
+        self.task = None
+        self.cancel_event = threading.Event()  # Read by the scan thread through report_progress()
+
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def report_progress(self, done, total):
+        """
+        `progress` callback for the scan functions. Runs in the scan thread: records progress, stops the scan
+        if the job was cancelled, and waits while the API budget is needed by the live monitor.
+        """
+        self.progress = (done, total)
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Raise ScanCancelled if the job was cancelled; otherwise wait for rate-limit headroom. Blocking."""
+        while True:
+            if self.cancel_event.is_set():
+                raise ScanCancelled(f"Job #{self.id} cancelled")
+            if rate_limit_headroom(log_backend_url()) >= JOB_MIN_HEADROOM:
+                return
+            time.sleep(1)
+
+    def status_text(self):
+        """One-line status used in progress messages and !jobs."""
+        emoji = {"queued": "🕓", "running": "⚙️", "done": "✅", "failed": "❌", "cancelled": "🛑"}[self.status]
+        text = f"{emoji} **Job #{self.id}** `{self.description}`: {self.status}"
+        if self.status == "running" and self.progress and self.progress[1]:
+            done, total = self.progress
+            filled = int(10 * done / total)
+            text += f" [{'█' * filled}{'░' * (10 - filled)}] {done / total:.0%} ({done:,}/{total:,} blocks)"
+        if self.status == "failed" and self.error:
+            text += f" ({self.error})"
+        if len(self.subscribers) > 1:
+            text += f" · {len(self.subscribers)} requests attached"
+        if self.finished_at is not None and self.started_at is not None:
+            text += f" · {self.finished_at - self.started_at:,.0f}s"
+        return text
+
+    async def send(self, content=None, payload=None, filename=None, view_factory=None):
+        """
+        Send a result to every attached request's channel. Files and views are single-use, so each channel gets
+        a fresh discord.File and its own `view_factory()` view (whose `message` is set to the sent message).
+        """
+        self.results_sent += 1
+        for ctx in self.subscribers:
+            file = discord.File(io.BytesIO(payload), filename=filename) if payload is not None else None
+            view = view_factory() if view_factory is not None else None
+            try:
+                message = await ctx.send(content=content, file=file, view=view)
+                if view is not None:
+                    view.message = message
+            except discord.HTTPException as e:
+                print(f"Error sending job #{self.id} result: {e}")
+
+    async def refresh_status(self):
+        text = self.status_text()
+        for message in self.status_messages:
+            try:
+                await message.edit(content=text)
+            except discord.HTTPException as e:
+                print(f"Error updating job #{self.id} progress: {e}")
+
+class JobManager:
+    """
+    Tracks long scans started from commands: job IDs, a cap on how many run at once, per-user and global
+    quotas, one progress message per request (edited, not re-posted), cancellation, and de-duplication:
+    an identical request while one is queued or running is attached to it instead of scanning twice.
+    """
+
+    def __init__(self):
+        self.jobs = {}  # id -> Job, active ones plus the last JOB_HISTORY finished
+        self._next_id = 1
+        self._slots = None  # asyncio.Semaphore(JOBS_MAX_RUNNING), created on the running loop
+
+    def active_jobs(self):
+        return [job for job in self.jobs.values() if job.active()]
+
+    async def submit(self, ctx, kind, key, description, work):
+        """
+        Start `work(job)` (a coroutine function) as a job for the command in `ctx`, or attach the request to an
+        identical active job. Replies in `ctx` either way. Returns the Job, or None if a quota refused it.
+        """
+        for job in self.active_jobs():
+            if job.kind == kind and job.key == key and not job.results_sent:
+                if ctx.channel.id not in {sub.channel.id for sub in job.subscribers}:
+                    job.subscribers.append(ctx)
+                    job.status_messages.append(await ctx.send(job.status_text()))
+                else:
+                    await ctx.send(f"🔗 Same request is already job #{job.id}; its results will be posted here.")
+                return job
+
+        active = self.active_jobs()
+        if len(active) >= JOBS_MAX_TOTAL:
+            await ctx.send(f"❌ {len(active)} jobs are already queued or running. Try again later, or `!cancel` one.")
+            return None
+        if sum(1 for job in active if job.owner_id == ctx.author.id) >= JOBS_MAX_PER_USER:
+            await ctx.send(f"❌ You already have {JOBS_MAX_PER_USER} jobs queued or running. See `!jobs`.")
+            return None
+
+        job = Job(self._next_id, kind, key, ctx.author.id, description)
+        self._next_id += 1
+        self.jobs[job.id] = job
+        job.subscribers.append(ctx)
+        job.status_messages.append(await ctx.send(job.status_text()))
+        job.task = asyncio.ensure_future(self._run(job, work))
+        return job
+
+    async def _run(self, job, work):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(JOBS_MAX_RUNNING)
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                await job.refresh_status()
+                ticker = asyncio.ensure_future(self._tick(job))
+                try:
+                    await work(job)
+                finally:
+                    ticker.cancel()
+            job.status = "done"
+        except (ScanCancelled, asyncio.CancelledError):
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Error in job #{job.id} ({job.description}): {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.finished_at = time.time()
+        if job.started_at is None:
+            job.started_at = job.finished_at
+        await job.refresh_status()
+        self._prune()
+
+    async def _tick(self, job):
+        """Edit the progress messages while the job runs, only when the progress moved."""
+        shown = None
+        while True:
+            await asyncio.sleep(JOB_PROGRESS_INTERVAL)
+            if job.progress != shown:
+                shown = job.progress
+                await job.refresh_status()
+
+    def _prune(self):
+        finished = sorted((job for job in self.jobs.values() if not job.active()), key=lambda job: job.finished_at)
+        for job in finished[:-JOB_HISTORY]:
+            del self.jobs[job.id]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job. Returns the Job, or None if there's no such active job."""
+        job = self.jobs.get(job_id)
+        if job is None or not job.active():
+            return None
+        job.cancel_event.set()  # A running scan stops at its next range
+        if job.status == "queued":
+            job.task.cancel()  # Still waiting for a slot: nothing to unwind
+        return job
+
+    def summary_text(self):
+        """Discord-ready list of active and recently finished jobs."""
+        if not self.jobs:
+            return "📋 No background jobs."
+        lines = ["📋 **Background jobs:**"]
+        for job in sorted(self.jobs.values(), key=lambda job: (not job.active(), -job.id)):
+            lines.append(f"- {job.status_text()} · <@{job.owner_id}>")
+        return "\n".join(lines)
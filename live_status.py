@@ -0,0 +1,115 @@
+import asyncio
+import json
+import time
+import discord
+from checkpoints import atomic_write_json
+
+LIVE_STATUS_FILE = "/data/live_status.json"  # channel id -> id of its pinned status message, kept across restarts
+MAX_MESSAGE_CHARS = 2000  # Discord's message limit
+
+class LiveStatusBoard:
+    """
+    One pinned status message per designated channel, edited in place. Rows (lines of the rendered status) are
+    diffed against what each channel last showed, and a channel is only edited when at least one row changed,
+    so outbound Discord calls scale with changes to the queue rather than with reports.
+    """
+
+    def __init__(self, path=LIVE_STATUS_FILE):
+        self.path = path
+        self.message_ids = self._load()
+        self.messages = {}  # channel id -> discord.Message, so edits don't need a fetch first
+        self.rows = {}  # channel id -> rows that channel's message currently shows
+        self.edits = 0
+        self.skipped = 0
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return {int(channel_id): message_id for channel_id, message_id in json.load(f).items()}
+        except FileNotFoundError:
+            return {}
+        except (json.JSONDecodeError, AttributeError, ValueError) as e:
+            print(f"⚠️ Live status file unreadable ({e}); new status messages will be posted.")
+            return {}
+
+    def _save(self):
+        try:
+            atomic_write_json(self.path, {str(channel_id): message_id for channel_id, message_id in self.message_ids.items()})
+        except OSError as e:
+            print(f"⚠️ Could not save live status message ids: {e}")
+
+    @staticmethod
+    def diff(old_rows, new_rows):
+        """Indexes of the rows that differ between two renders (added and removed rows included)."""
+        return [i for i in range(max(len(old_rows), len(new_rows))) if old_rows[i:i + 1] != new_rows[i:i + 1]]
+
+    @staticmethod
+    def render(rows, changed_at):
+        """Message text for `rows`, with a relative 'last changed' stamp Discord keeps current on its own."""
+        footer = f"\n\n-# 📌 Live status · last changed <t:{int(changed_at)}:R>"
+        content = "\n".join(rows)
+        if len(content) + len(footer) > MAX_MESSAGE_CHARS:
+            content = content[:MAX_MESSAGE_CHARS - len(footer) - 8] + "\n…"
+            if content.count("```") % 2:
+                content += "\n```"  # Close a code block the cut left open
+        return content + footer
+
+    async def _message(self, channel):
+        """The channel's status message, fetched once per process; None if there isn't one (any more)."""
+        if channel.id in self.messages:
+            return self.messages[channel.id]
+        message_id = self.message_ids.get(channel.id)
+        if message_id is None:
+            return None
+        try:
+            message = await channel.fetch_message(message_id)
+        except discord.NotFound:
+            return None
+        self.messages[channel.id] = message
+        return message
+
+    async def _post(self, channel, content):
+        message = await channel.send(content)
+        try:
+            await message.pin()
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not pin the live status in {channel.name}: {e}")
+        self.messages[channel.id] = message
+        self.message_ids[channel.id] = message.id
+        self._save()
+        return message
+
+    async def update_channel(self, channel, rows):
+        """
+        Bring one channel's status message up to date with `rows`, posting (and pinning) it if needed.
+        Returns the message, or None if the update failed.
+        """
+        if channel.id in self.rows and not self.diff(self.rows[channel.id], rows):
+            self.skipped += 1
+            return self.messages.get(channel.id)
+
+        content = self.render(rows, time.time())
+        try:
+            message = await self._message(channel)
+            if message is None:
+                message = await self._post(channel, content)
+            else:
+                try:
+                    await message.edit(content=content)
+                except discord.NotFound:  # Deleted by someone: post a fresh one
+                    self.messages.pop(channel.id, None)
+                    message = await self._post(channel, content)
+        except discord.HTTPException as e:
+            print(f"Error updating live status in channel {channel.name}: {e}")
+            return None
+
+        changed = len(self.diff(self.rows.get(channel.id, []), rows))
+        self.rows[channel.id] = list(rows)
+        self.edits += 1
+        print(f"📌 Live status in {channel.name} updated ({changed} row(s) changed).")
+        return message
+
+    async def update(self, channels, rows):
+        """Update every channel's status message concurrently; returns {channel id: message or None}."""
+        messages = await asyncio.gather(*(self.update_channel(channel, rows) for channel in channels))
+        return {channel.id: message for channel, message in zip(channels, messages)}
@@ -0,0 +1,143 @@
+import os
+import time
+import requests
+from dotenv import load_dotenv
+from http_transport import get_session, throttle
+
+# Load environment variables
+load_dotenv()
+
+SONIC_RPC_URL = os.getenv("SONIC_RPC_URL")
+RPC_TIMEOUT = 10  # Seconds per eth_getLogs call before we treat the range as too heavy
+RPC_INITIAL_RANGE = 10_000  # Blocks per request to start with
+RPC_MAX_RANGE = 200_000  # Never merge ranges beyond this
+RPC_MIN_RANGE = 1  # A single block that still fails is a real error, not a range problem
+SPARSE_RESULT_COUNT = 1_000  # Fewer logs than this in a range -> double the next range
+MAX_RPC_ERRORS = 3  # Non-range errors tolerated before giving up
+RPC_RETRY_COOLDOWN = 2  # Seconds slept before retrying after a non-range error (x error count)
+
+# Node error fragments that mean "ask for a smaller range" rather than "something is broken".
+RANGE_ERROR_HINTS = (
+    "too many",
+    "more than",
+    "limit exceeded",
+    "range too large",
+    "range is too large",
+    "block range",
+    "response size",
+    "query timeout",
+    "timed out",
+)
+
+class RangeTooLargeError(Exception):
+    """The node refused or timed out on a block range; retry with a smaller one."""
+
+_rpc_request_id = 0
+
+def rpc_call(method, params, rpc_url=None, timeout=RPC_TIMEOUT):
+    """
+    Minimal JSON-RPC call. Returns the raw `result` (hex strings, same shape Etherscan's proxy returns).
+    Raises RangeTooLargeError for timeouts and result-size errors, RuntimeError for other node errors.
+    """
+    global _rpc_request_id
+    _rpc_request_id += 1
+    payload = {"jsonrpc": "2.0", "id": _rpc_request_id, "method": method, "params": params}
+    try:
+        url = rpc_url or SONIC_RPC_URL
+        throttle(url)
+        response = get_session(url).post(url, json=payload, timeout=timeout)
+        response.raise_for_status()
+        data = response.json()
+    except requests.exceptions.Timeout:
+        raise RangeTooLargeError(f"{method} timed out after {timeout}s")
+
+    if "error" in data:
+        message = str(data["error"].get("message", data["error"]))
+        if any(hint in message.lower() for hint in RANGE_ERROR_HINTS):
+            raise RangeTooLargeError(message)
+        raise RuntimeError(f"{method} failed: {message}")
+    return data.get("result")
+
+def rpc_batch(calls, rpc_url=None, timeout=RPC_TIMEOUT):
+    """
+    Several JSON-RPC calls in one HTTP request. `calls` is a list of (method, params).
+    Returns the results in the same order, with None for calls the node answered with an error.
+    """
+    global _rpc_request_id
+    if not calls:
+        return []
+    first_id = _rpc_request_id + 1
+    _rpc_request_id += len(calls)
+    payload = [
+        {"jsonrpc": "2.0", "id": first_id + i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    url = rpc_url or SONIC_RPC_URL
+    throttle(url)
+    response = get_session(url).post(url, json=payload, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    if isinstance(data, dict):  # Some nodes answer a whole rejected batch with a single error object
+        raise RuntimeError(f"Batch request failed: {data.get('error', data)}")
+    by_id = {item.get("id"): item for item in data}
+    return [by_id.get(first_id + i, {}).get("result") for i in range(len(calls))]
+
+def get_block_number(rpc_url=None):
+    """Latest block number from the RPC node, or None on failure."""
+    try:
+        return int(rpc_call("eth_blockNumber", [], rpc_url=rpc_url), 16)
+    except Exception as e:
+        print(f"❌ RPC eth_blockNumber failed: {e}")
+        return None
+
+def get_logs(address, topics, from_block, to_block, rpc_url=None):
+    """Single eth_getLogs call over [from_block, to_block]. Raises like rpc_call."""
+    return rpc_call("eth_getLogs", [{
+        "address": address,
+        "fromBlock": hex(from_block),
+        "toBlock": hex(to_block),
+        "topics": topics,
+    }], rpc_url=rpc_url)
+
+def scan_logs_rpc(address, topics, from_block, to_block, initial_range=RPC_INITIAL_RANGE, rpc_url=None):
+    """
+    Fetch every log matching `address`/`topics` in [from_block, to_block] straight from the node.
+    When the node answers "too many results" or times out the current range is halved (repeatedly,
+    down to a single block); when a range comes back sparse the next one is doubled, so quiet stretches
+    are merged back into large requests. Other node errors are retried after a growing cooldown.
+    Returns the logs in block order, or None if the scan could not complete.
+    """
+    logs = []
+    span = max(min(initial_range, RPC_MAX_RANGE), RPC_MIN_RANGE)
+    start = from_block
+    errors = 0
+
+    while start <= to_block:
+        end = min(start + span - 1, to_block)
+        try:
+            chunk = get_logs(address, topics, start, end, rpc_url=rpc_url)
+        except RangeTooLargeError as e:
+            if end - start + 1 <= RPC_MIN_RANGE:
+                print(f"🚨 RPC still refusing a single block ({start}): {e}")
+                return None
+            span = max((end - start + 1) // 2, RPC_MIN_RANGE)
+            print(f"✂️ Splitting range {start}-{end}: {e}. New range size: {span}")
+            continue
+        except Exception as e:
+            errors += 1
+            print(f"❌ RPC eth_getLogs failed for blocks {start} to {end} (error {errors}/{MAX_RPC_ERRORS}): {e}")
+            if errors >= MAX_RPC_ERRORS:
+                print("🚨 Too many RPC errors. Aborting log scan.")
+                return None
+            time.sleep(RPC_RETRY_COOLDOWN * errors)  # Give a struggling node room to recover
+            continue
+
+        chunk = chunk or []
+        print(f"✅ RPC returned {len(chunk)} logs from blocks {start} to {end} (range size: {end - start + 1})")
+        logs.extend(chunk)
+        start = end + 1
+
+        if len(chunk) < SPARSE_RESULT_COUNT and span < RPC_MAX_RANGE:
+            span = min(span * 2, RPC_MAX_RANGE)
+
+    return logs
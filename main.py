@@ -1,19 +1,31 @@
 import discord
 from discord.ext import commands, tasks
-from fetch_transactions import fetch_recent_transactions, filter_and_sort_pending_transactions
-from staking_contract import get_staking_balance
-from decode_hex import decode_hex_data, get_function_name
+from fetch_transactions import filter_and_sort_pending_transactions
+from snapshot_cache import SnapshotCache, REPORT_MAX_STALENESS, EXECUTION_MAX_STALENESS
+from recheck_scheduler import RecheckScheduler, run_stage
+from decode_hex import decode_hex_data, get_function_name, export_decode_cache, load_decode_cache
 from execute_transaction import fetch_transaction_by_nonce, execute_transaction  # Execution logic
+from safe_events import poll_safe_events, SAFE_EVENT_POLL_INTERVAL
+from http_transport import transport_stats
+from checkpoints import get_cursor, set_cursor, resume_block
+from mempool_watcher import MempoolWatcher, MEMPOOL_WATCH_ENABLED, MEMPOOL_POLL_INTERVAL
+from deposit_backfill import BACKFILL_ENABLED, BACKFILL_INTERVAL
+from signature_watcher import SignatureWatcher, SIGNATURE_WATCH_ENABLED, SIGNATURE_POLL_INTERVAL
+from live_status import LiveStatusBoard
+from broadcast_queue import BroadcastQueue
+from job_manager import JobManager
+from bot_state import load_state, save_state
 import os
 from dotenv import load_dotenv
 import asyncio
-import json
-from datetime import datetime, timezone  # if not already imported
+import re
+import time
+from datetime import date, datetime, timezone  # if not already imported
 
 # Load environment variables
 load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
-PERSISTENCE_FILE = "/data/last_scanned_block.json"  # /data is the mounted volume
+DEPOSIT_STREAM = "deposits"  # Checkpoint cursor name for the deposit scans (see checkpoints.py)
 
 # Initialize the Discord bot
 intents = discord.Intents.default()
@@ -31,36 +43,141 @@ designated_channels = {
 DAILY_REPORT_UTC_HOUR = 9
 LAST_DAILY_REPORT_DATE = None
 
-# Pause flag
+# Pause flag (restored from /data/bot_state.json at startup when recent; otherwise the bot boots paused)
 paused = True
+pause_reason = "startup"  # Why execution is paused, shown in reports
 
 SONICSCAN_TX_URL = "https://sonicscan.org/tx/"
 
+# Block-following deposit watcher
+DEPOSIT_WATCH_INTERVAL = int(os.getenv("DEPOSIT_WATCH_INTERVAL", "5"))  # Seconds between new-block polls
+DEPOSIT_STATE_MAX_AGE = 300  # Seconds; older watcher state makes readers run a scan themselves
+# Per-stage recheck deadlines (seconds). A late stage is reported from its last result, marked stale.
+RECHECK_DEPOSIT_DEADLINE = float(os.getenv("RECHECK_DEPOSIT_DEADLINE", "60"))
+RECHECK_SNAPSHOT_DEADLINE = float(os.getenv("RECHECK_SNAPSHOT_DEADLINE", "30"))
+# The same recheck error is broadcast at most this often (seconds); a different error goes out right away
+RECHECK_ERROR_BROADCAST_INTERVAL = float(os.getenv("RECHECK_ERROR_BROADCAST_INTERVAL", "3600"))
+recheck_error = {"text": None, "sent_at": 0.0}  # Last broadcast recheck error, cleared by a successful recheck
+flow_baseline = {"fetched_at": None, "net_flow": 0.0}  # flow_tally.net_flow() when the cached snapshot was taken
+deposit_scan_lock = asyncio.Lock()  # Watcher, !report and the recheck must never scan the same blocks twice
+deposit_watch_state = {
+    "alert_triggered": False,  # Whether the most recent scan found a large deposit
+    "message": None,  # Alert text from the most recent scan that found one
+    "clean_since_block": None,  # First block of the current alert-free stretch
+    "last_block": None,  # Highest block covered by the watcher
+    "updated_at": None,  # time.time() of the last successful scan
+}
+# Shared, single-flight staking balance + Safe queue reads; balance/queue changes schedule a recheck
+snapshots = SnapshotCache(
+    on_change=lambda reason: recheck_scheduler.trigger(reason),
+    on_snapshot=lambda snapshot: save_bot_state(),  # Keep the warm-start copy of the queue current
+)
+safe_api_warning_sent = False  # The "Safe API returned nothing" warning goes out once per outage
+mempool_watcher = MempoolWatcher()  # Holds execution while a large deposit is pending (MEMPOOL_WATCH_ENABLED)
+signature_watcher = SignatureWatcher()  # Hands the next nonce to execution as soon as its last signature lands
+live_status = LiveStatusBoard()  # Pinned, edit-in-place queue status per designated channel
+jobs = JobManager()  # Long !history / !deposits scans: quotas, progress, cancellation, de-duplication
+state_save_task = None  # Background write of the warm-start state, see save_bot_state()
+state_save_pending = False  # Set when the state changed while a write was already running
+
 def load_last_scanned_block():
     """
-    Loads the last scanned block number from the persistent JSON file.
+    Loads the last scanned block number from the deposits checkpoint cursor.
     Returns the block number as an integer, or None if not found.
     """
-    try:
-        with open(PERSISTENCE_FILE, "r") as f:
-            data = json.load(f)
-            return data.get("last_scanned_block", None)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return None
+    cursor = get_cursor(DEPOSIT_STREAM)
+    return cursor["block"] if cursor else None
 
-def save_last_scanned_block(block_number):
+def save_last_scanned_block(block_number, block_hash=None):
+    """
+    Atomically saves the given block number (and its hash, for reorg detection) to the deposits cursor.
     """
-    Saves the given block number to the persistent JSON file.
+    set_cursor(DEPOSIT_STREAM, block_number, block_hash)
+
+def bot_state():
+    """The warm-start state: pause flag and reason, daily-report anchor, last queue/balance, decode cache."""
+    return {
+        "paused": paused,
+        "pause_reason": pause_reason,
+        "last_daily_report_date": LAST_DAILY_REPORT_DATE.isoformat() if LAST_DAILY_REPORT_DATE else None,
+        "snapshot": snapshots.latest(),
+        "deposit_watch_state": dict(deposit_watch_state),
+        "decode_cache": export_decode_cache(),
+    }
+
+def save_bot_state():
     """
-    with open(PERSISTENCE_FILE, "w") as f:
-        json.dump({"last_scanned_block": block_number}, f)
+    Persist the warm-start state without blocking the event loop: the write (which fsyncs) runs in a worker
+    thread, and calls made while one is running coalesce into a single follow-up write of the latest state.
+    """
+    global state_save_task, state_save_pending
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        save_state(bot_state())  # No loop yet (or any more): nothing to block
+        return
+    state_save_pending = True
+    if state_save_task is None or state_save_task.done():
+        state_save_task = loop.create_task(write_bot_state())
+
+async def write_bot_state():
+    """Write the state until no change arrived during the last write (see save_bot_state)."""
+    global state_save_pending
+    while state_save_pending:
+        state_save_pending = False
+        await asyncio.to_thread(save_state, bot_state())
+
+def restore_bot_state():
+    """Load the warm-start state saved before the last shutdown, if it's recent enough (see bot_state.py)."""
+    global paused, pause_reason, LAST_DAILY_REPORT_DATE
+    state = load_state()
+    if not state:
+        return
+    paused = bool(state.get("paused", True))
+    pause_reason = state.get("pause_reason") if paused else None
+    if state.get("last_daily_report_date"):
+        LAST_DAILY_REPORT_DATE = date.fromisoformat(state["last_daily_report_date"])
+    snapshots.restore(state.get("snapshot"))
+    deposit_watch_state.update({key: value for key, value in (state.get("deposit_watch_state") or {}).items()
+                                if key in deposit_watch_state})
+    load_decode_cache(state.get("decode_cache"))
+    print(f"🔥 Warm start: execution {'paused (' + str(pause_reason) + ')' if paused else 'active'}, "
+          f"last daily report {LAST_DAILY_REPORT_DATE}.")
+
+def set_paused(value, reason=None):
+    """Pause or resume automated execution, remembering why, and persist it so a restart keeps it."""
+    global paused, pause_reason
+    paused = value
+    pause_reason = reason if value else None
+    save_bot_state()
 
 @bot.event
 async def on_ready():
     print(f"Discord bot connected as {bot.user}")
     print("Bot is running and ready to accept commands!")
+    broadcasts.invalidate_channels()  # Resolve against the fresh guild cache
     # Start the periodic task when the bot is ready
-    periodic_recheck.start()
+    recheck_scheduler.start()
+    if not follow_safe_events.is_running():
+        follow_safe_events.start()
+    if not watch_deposits.is_running():
+        watch_deposits.start()
+    if not compact_deposit_index.is_running():
+        compact_deposit_index.start()
+    if BACKFILL_ENABLED and not backfill_deposit_history.is_running():
+        backfill_deposit_history.start()
+    if MEMPOOL_WATCH_ENABLED and not watch_mempool.is_running():
+        watch_mempool.start()
+    if SIGNATURE_WATCH_ENABLED and not watch_signatures.is_running():
+        watch_signatures.start()
+
+@bot.event
+async def on_guild_join(guild):
+    broadcasts.invalidate_channels()
+
+@bot.event
+async def on_guild_remove(guild):
+    broadcasts.invalidate_channels()
 
 @bot.event
 async def on_message(message):
@@ -89,14 +206,18 @@ async def custom_help(ctx):
 
     # Add categorized commands in the specified order
     embed.add_field(name="📢 \u2003!report", value="Fetch and send a transaction report.", inline=False)
-    embed.add_field(name="⏸️ \u2003!pause", value="Pause automated transaction execution.", inline=False)
+    embed.add_field(name="🔁 \u2003!recheck", value="Recheck (and execute if ready) right away.", inline=False)
+    embed.add_field(name="⏸️ \u2003!pause", value="Pause automated transaction execution (`!pause [reason]`).", inline=False)
     embed.add_field(name="▶️ \u2003!resume", value="Resume automated transaction execution.", inline=False)
     embed.add_field(name="⚔️ \u2003!execute", value="Execute lowest nonce. Respects pause state, token balance and payload data.", inline=False)
     embed.add_field(name="⚡ \u2003!shikai", value="Execute lowest nonce, ignores pause state.", inline=False)
     embed.add_field(name="🔥 \u2003!bankai", value="Execute lowest nonce, ignores pause state and token balance.", inline=False)
     embed.add_field(name="💀 \u2003!shukai9000", value="Ultimate execution weapon. ignores ALL checks (pause, balance, data).", inline=False)
     embed.add_field(name="🕒 \u2003!history", value="Scan large deposits for a past-hours window (no alerts triggered).", inline=False)
-    embed.add_field(name="📄 \u2003!deposits", value="Export ALL deposits in a past-hours window to CSV.", inline=False)
+    embed.add_field(name="🔎 \u2003!depositor", value="Deposit history and totals for one address (`!depositor 0x…`).", inline=False)
+    embed.add_field(name="📄 \u2003!deposits", value="Export ALL deposits in a past-hours window to gzip CSV (or `parquet`).", inline=False)
+    embed.add_field(name="📋 \u2003!jobs", value="List background scans (`!history`, `!deposits`) and their progress.", inline=False)
+    embed.add_field(name="🛑 \u2003!cancel", value="Cancel a queued or running background scan (`!cancel <job id>`).", inline=False)
 
     # Set the embed image
     embed.set_image(url="https://cdn.discordapp.com/attachments/1333959203638874203/1333963513177178204/beets_bleach.png?ex=679acdd5&is=67997c55&hm=eefc8ec5228ca7f64f2040ee8b112e99aaee90682def455f03018e1e5afd9125&")  # Change to your image URL
@@ -105,20 +226,25 @@ async def custom_help(ctx):
     await ctx.send(embed=embed)
 
 @bot.command(name="pause")
-async def pause(ctx):
-    """Pause automated transaction execution."""
-    global paused
-    paused = True
+async def pause(ctx, *, reason: str = None):
+    """Pause automated transaction execution. Usage: !pause [reason]"""
+    set_paused(True, f"!pause by {ctx.author.display_name}" + (f": {reason}" if reason else ""))
     await ctx.send("⏸️ Automated transaction execution has been paused. Rechecks and reports will continue.")
     print("Transaction execution paused.")
 
 @bot.command(name="resume")
 async def resume(ctx):
     """Resume automated transaction execution."""
-    global paused
-    paused = False
+    set_paused(False)
     await ctx.send("▶️ Automated transaction execution has been resumed.")
     print("Transaction execution resumed.")
+    recheck_scheduler.trigger("resume")
+
+@bot.command(name="recheck")
+async def manual_recheck(ctx):
+    """Run a recheck (and any ready execution) now instead of waiting for the next event or heartbeat."""
+    recheck_scheduler.trigger("manual")
+    await ctx.send("🔁 Recheck scheduled; it runs within a few seconds.")
 
 @bot.command(name="report")
 async def report(ctx):
@@ -126,52 +252,40 @@ async def report(ctx):
     await ctx.send("📢 Fetching transaction data...")
     print("📢 Fetching transaction data with REPORT command...")
 
-    from deposit_monitor import check_large_deposits_with_block, FLAG_THRESHOLD, split_long_message
+    from deposit_monitor import FLAG_THRESHOLD, split_long_message
 
     try:
-        # 1) Read the old block from JSON
-        old_persisted_block = load_last_scanned_block()
-
-        if old_persisted_block is None:
-            print("No persisted last_scanned_block found. Using full 65-minute lookback.")
-            start_block = None
+        warm_snapshot = snapshots.warm()
+        if warm_snapshot is not None and deposit_watch_state["last_block"] is not None:
+            # Just restarted: answer from the state saved before the restart while the first live fetch runs
+            deposit_state, snapshot = deposit_watch_state, warm_snapshot
+            asyncio.ensure_future(snapshots.get(max_age=0))
+            warm_note = (f"\n\n🔥 From the state saved before the last restart ({warm_snapshot['age'] / 60:,.0f} min old); "
+                         f"live data is being fetched.")
         else:
-            start_block = old_persisted_block + 1
-
-        # Run deposit monitor from the appropriate block range
-        alert_triggered, deposit_message, new_last_block = check_large_deposits_with_block(start_block)
-
-        # If we get a new block from deposit_monitor:
-        if new_last_block is not None:
-            if old_persisted_block is not None:
-                print(f"✅ Updating last scanned block from {old_persisted_block} to {new_last_block}")
-            else:
-                print(f"✅ Setting last_scanned_block for the first time: {new_last_block}")
-
-            # Save the new block to JSON
-            save_last_scanned_block(new_last_block)
-        else:
-            print("⚠️ Warning: new_last_block returned as None. Retrying from previous block next loop.")
-
-        if alert_triggered:
-            global paused
-            paused = True
-            deposit_report_message = deposit_message
+            # Deposit status comes from the block watcher (it scans on its own if the watcher is stale);
+            # staking balance and pending transactions from the shared snapshot. Both are fetched concurrently.
+            deposit_state, snapshot = await asyncio.gather(
+                latest_deposit_state(), snapshots.get(max_age=REPORT_MAX_STALENESS)
+            )
+            warm_note = ""
+        if deposit_state["alert_triggered"]:
+            deposit_report_message = deposit_state["message"]
         else:
-            deposit_report_message = f"✅ No deposits over {FLAG_THRESHOLD:,.0f} S tokens were found between blocks {start_block} and {new_last_block}."
-
-        # Fetch staking contract balance
-        staking_balance = await asyncio.to_thread(get_staking_balance)
-        staking_balance = round(staking_balance, 1) if staking_balance else 0.0
+            deposit_report_message = (
+                f"✅ No deposits over {FLAG_THRESHOLD:,.0f} S tokens were found between blocks "
+                f"{deposit_state['clean_since_block']} and {deposit_state['last_block']}."
+            )
 
-        # Fetch pending transactions
-        transactions = await asyncio.to_thread(fetch_recent_transactions)
+        # Concurrent !report calls share one snapshot fetch
+        staking_balance = round(snapshot["staking_balance"], 1) if snapshot["staking_balance"] else 0.0
+        transactions = snapshot["transactions"]
         if not transactions:
             await ctx.send(deposit_report_message + "\n\n📌 No pending transactions found.")
             return
 
         # Format the report
-        report = format_transaction_report({
+        report_data = {
             "staking_balance": staking_balance,
             "pending_transactions": [
                 {
@@ -192,10 +306,18 @@ async def report(ctx):
                 }
                 for tx in filter_and_sort_pending_transactions(transactions)
             ]
-        })
+        }
+
+        # The queue goes into the pinned live status (edited only if it changed); reply with a link to it
+        if ctx.guild is not None and designated_channels.get(ctx.guild.id) == ctx.channel.id:
+            status_message = await live_status.update_channel(ctx.channel, status_rows(report_data, deposit_state))
+            if status_message is not None:
+                await ctx.send(f"{deposit_report_message}\n\n📌 Current queue: {status_message.jump_url}{warm_note}")
+                return
 
+        report = format_transaction_report(report_data)
         # Ensure deposit report results are included in the final report
-        report += f"\n{deposit_report_message}"
+        report += f"\n{deposit_report_message}{warm_note}"
 
         # Append pause state message **only if paused**
         if paused:
@@ -217,94 +339,161 @@ async def historical_report(ctx, hours: float):
         await ctx.send("❌ Invalid time range. Please enter a positive number of hours.")
         return
 
-    await ctx.send(f"🔍 Scanning for large deposits in the last **{hours} hours**...")
-
-    # Run scan in a separate asyncio task so the bot stays responsive
-    bot.loop.create_task(run_historical_scan(ctx, hours))
+    # Runs as a tracked background job so the bot stays responsive; identical requests share one scan
+    await jobs.submit(ctx, "history", hours, f"!history {hours:g}", lambda job: run_historical_scan(job, hours))
 
-async def run_historical_scan(ctx, hours):
-    """Runs the historical scan asynchronously without blocking Discord."""
-    try:
-        from deposit_monitor import check_large_deposits_custom, split_long_message
-        _, message = await asyncio.to_thread(check_large_deposits_custom, hours)  # Run in separate thread
+async def run_historical_scan(job, hours):
+    """
+    Job body for !history: scan in a thread (reporting progress to the job), then post the result as one
+    paginated message whose pages are rendered on demand.
+    """
+    from deposit_monitor import find_large_deposits, split_long_message, FLAG_THRESHOLD
+    from history_view import HistoryView
+    result = await asyncio.to_thread(find_large_deposits, hours, job.report_progress)
 
+    if "error" in result:
+        await job.send(f"❌ {result['error']}")
+        return
+    if not result["deposits"]:
+        message = f"✅ No large deposits (≥ {FLAG_THRESHOLD:,.0f} S tokens) were found in the last {hours} hours.\n\n{result['summary']}"
         for part in split_long_message(message):
-            await ctx.send(part)
+            await job.send(part)
+        return
 
-    except Exception as e:
-        await ctx.send(f"❌ Error during historical scan: {e}")
+    title = f"🕒 **{len(result['deposits'])} large deposits** (≥ {FLAG_THRESHOLD:,.0f} S) in the last {hours:g} hours"
+    def view_factory():
+        return HistoryView(result["deposits"], title, result["summary"])
+    first_page = view_factory().render()
+    await job.send(first_page, view_factory=view_factory)
+
+@bot.command(name="depositor")
+async def depositor_report(ctx, address: str):
+    """
+    Deposit history, totals and first/last seen blocks for one address, from the local sender index.
+    Usage: !depositor 0x1234...
+    """
+    if not re.fullmatch(r"0x[0-9a-fA-F]{40}", address):
+        await ctx.send("❌ Invalid address. Usage: `!depositor 0x…` (20-byte hex address).")
+        return
+
+    from deposit_monitor import lookup_depositor, split_long_message
+    from deposit_index import RAW_RETENTION_DAYS, KEEP_RAW_AMOUNT
+    started = time.perf_counter()
+    deposits, summary, complete = await asyncio.to_thread(lookup_depositor, address)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if summary is None:
+        await ctx.send("❌ Error: Could not read the deposit index or fetch the latest block.")
+        return
+
+    address = address.lower()
+    lines = [f"🔎 **Depositor** [{address[:8]}…{address[-4:]}](<https://debank.com/profile/{address}>)"]
+    if summary["count"] == 0 and summary["first_day"] is None:
+        lines.append("No deposits found for this address.")
+    else:
+        lines.append(f"- **Deposits**: {summary['count']:,} totaling {summary['total']:,.1f} S tokens (largest {summary['max']:,.1f} S)")
+        if summary["first_block"] is not None:
+            lines.append(f"- **First seen**: block {summary['first_block']} | **Last seen**: block {summary['last_block']}")
+        if summary["first_day"] is not None:
+            lines.append(f"- **Active since**: <t:{summary['first_day']}:d>")
+        if summary["compacted_through_block"] is not None:
+            lines.append(
+                f"-# Totals only cover the last {RAW_RETENTION_DAYS} days, plus older deposits of at least "
+                f"{KEEP_RAW_AMOUNT:,.0f} S: smaller deposits up to block {summary['compacted_through_block']} "
+                "were compacted into daily rollups, which don't keep per-address amounts."
+            )
+        if deposits:
+            lines.append(f"- **Latest {len(deposits)}**:")
+            for deposit in deposits:
+                lines.append(
+                    f"  {deposit['amount']:,.1f} S at block {deposit['block_number']} "
+                    f"([SonicScan TX]({SONICSCAN_TX_URL}{deposit['tx_hash']}))"
+                )
+    if not complete:
+        lines.append("⚠️ Some block ranges could not be fetched; history may be incomplete.")
+    lines.append(f"-# answered in {elapsed_ms:,.0f} ms")
+    for part in split_long_message("\n".join(lines)):
+        await ctx.send(part)
 
 @bot.command(name="deposits")
-async def export_all_deposits_csv(ctx, hours: float):
+async def export_all_deposits_csv(ctx, hours: float, fmt: str = "csv"):
     """
     Fetches ALL deposits to the staking contract in the last `hours` hours,
-    writes them to a CSV (TxHash, Address, Amount, RunningTotal),
-    and sends that CSV as an attachment in Discord.
-    Usage: !deposits 24
+    streams them into gzip-compressed CSV (TxHash, Address, Amount, RunningTotal) or Parquet,
+    and sends the result as one or more attachments under Discord's upload limit.
+    Usage: !deposits 24 [csv|parquet]
     """
+    from deposit_export import parquet_available, EXPORT_FORMATS
+
     # 1) Validate user input
     if hours <= 0:
         await ctx.send("❌ Invalid time range. Please enter a positive number of hours.")
         return
-
-    # 2) Acknowledge in Discord
-    await ctx.send(f"🔍 Fetching ALL deposits for the last {hours} hours...")
-
-    # 3) Fetch deposits (this may take a while if hours is large, so run in a thread)
-    from deposit_monitor import fetch_all_deposits_custom
-    try:
-        deposit_list = await asyncio.to_thread(fetch_all_deposits_custom, hours)
-    except Exception as e:
-        await ctx.send(f"❌ Error retrieving deposits: {e}")
+    fmt = fmt.lower()
+    if fmt not in EXPORT_FORMATS:
+        await ctx.send(f"❌ Unknown format `{fmt}`. Use one of: {', '.join(EXPORT_FORMATS)}.")
         return
-
-    # 4) If no deposits found, let the user know
-    if not deposit_list:
-        await ctx.send(f"✅ No deposits found in the past {hours} hours.")
+    if fmt == "parquet" and not parquet_available():
+        await ctx.send("❌ Parquet export is not available on this deployment (pyarrow missing). Use `csv`.")
         return
 
-    # 5) Build the CSV file in-memory or in a temp file
-    import csv
-    import tempfile
-
-    # We'll keep a running total
-    running_total = 0.0
-
-    # Create a temporary file
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".csv") as tmpfile:
-        csv_writer = csv.writer(tmpfile)
-        # Write the header
-        csv_writer.writerow(["Tx Hash", "Depositor Address", "Deposit Amount", "Running Total"])
-
-        # Iterate over each deposit, compute running total
-        for deposit in deposit_list:
-            tx_hash = deposit["tx_hash"]
-            sender = deposit["sender"]
-            amount = deposit["amount"]
-            # Update running total
-            running_total += amount
-
-            # Round both the deposit amount and the running total to 1 decimal place
-            csv_writer.writerow([
-                tx_hash,
-                sender,
-                f"{amount:,.1f}",
-                f"{running_total:,.1f}"
-            ])
+    # 2) Run as a tracked background job (progress message, !cancel); identical exports share one job
+    await jobs.submit(ctx, "deposits", (hours, fmt), f"!deposits {hours:g} {fmt}", lambda job: run_deposit_export(job, hours, fmt))
+
+async def run_deposit_export(job, hours, fmt):
+    """Job body for !deposits: stream the export in a thread and post each part as soon as it's full."""
+    from deposit_monitor import iter_all_deposits_custom, split_long_message
+    from deposit_export import iter_export_parts
+    from deposit_batch import DepositStats
+
+    # Stream deposits -> running total -> compressed parts, sending each part as soon as it's full.
+    # The pipeline runs in a thread; each part is handed back to the Discord loop and awaited
+    # before the next one is built, so at most one part is ever held in memory.
+    loop = asyncio.get_running_loop()
+    summary = {"count": 0, "total": 0.0, "parts": 0}
+    stats = DepositStats()  # Statistics accumulated while the rows stream past
+
+    def run_export():
+        deposits = iter_all_deposits_custom(hours, progress=job.report_progress)
+        for filename, payload in iter_export_parts(deposits, fmt, summary, stats=stats):
+            job.checkpoint()  # Stop between parts if cancelled
+            summary["parts"] += 1
+            send = job.send(
+                content=f"📎 Part {summary['parts']} ({summary['count']:,} deposits so far)",
+                payload=payload, filename=filename,
+            )
+            asyncio.run_coroutine_threadsafe(send, loop).result()
 
-        temp_csv_filename = tmpfile.name  # We'll send this file in Discord
+    await asyncio.to_thread(run_export)
 
-    # 6) Send the CSV as an attachment
-    try:
-        await ctx.send(
-            content=f"✅ Found {len(deposit_list)} deposits in the past {hours} hours totaling {running_total:,.1f} S tokens. Here is the CSV file:",
-            file=discord.File(temp_csv_filename, filename="all_deposits.csv")
-        )
-    finally:
-        # 7) Clean up the temp file from the filesystem
-        import os
-        if os.path.exists(temp_csv_filename):
-            os.remove(temp_csv_filename)
+    # Summarise (or let the user know nothing was found)
+    if not summary["count"]:
+        await job.send(f"✅ No deposits found in the past {hours} hours.")
+        return
+    await job.send(
+        f"✅ Found {summary['count']} deposits in the past {hours} hours totaling {summary['total']:,.1f} S tokens "
+        f"({summary['parts']} file{'s' if summary['parts'] != 1 else ''})."
+    )
+    for part in split_long_message(await asyncio.to_thread(stats.summary_text)):
+        await job.send(part)
+
+@bot.command(name="jobs")
+async def list_jobs(ctx):
+    """List queued, running and recently finished background jobs."""
+    from deposit_monitor import split_long_message
+    for part in split_long_message(jobs.summary_text()):
+        await ctx.send(part)
+
+@bot.command(name="cancel")
+async def cancel_job(ctx, job_id: int):
+    """
+    Cancel a queued or running background job.
+    Usage: !cancel 3
+    """
+    job = jobs.cancel(job_id)
+    if job is None:
+        await ctx.send(f"❌ No queued or running job #{job_id}. See `!jobs`.")
+        return
+    await ctx.send(f"🛑 Cancelling job #{job.id} (`{job.description}`); it stops at its next block range.")
 
 @bot.command(name="execute")
 async def execute(ctx):
@@ -313,15 +502,17 @@ async def execute(ctx):
         await ctx.send("⏸️ The bot is currently paused. Transaction execution is disabled.")
         print("Execution attempt blocked due to pause state.")
         return
+    if mempool_watcher.is_holding():
+        await ctx.send("⏳ A large deposit is pending in the mempool. Execution is held until it lands.")
+        print("Execution attempt blocked by a pending large deposit.")
+        return
 
     await ctx.send("⚔️ Checking for executable transactions...")
 
-    # Fetch staking contract balance
-    staking_balance = get_staking_balance()
-    staking_balance = round(staking_balance, 1) if staking_balance else 0.0
-
-    # Fetch pending transactions
-    transactions = fetch_recent_transactions()
+    # Staking balance and pending transactions from the shared snapshot (one upstream fetch per burst)
+    snapshot = await snapshots.get(max_age=EXECUTION_MAX_STALENESS)
+    staking_balance = round(snapshot["staking_balance"], 1) if snapshot["staking_balance"] else 0.0
+    transactions = snapshot["transactions"]
     pending_transactions = filter_and_sort_pending_transactions(transactions)
 
     if not pending_transactions:
@@ -375,7 +566,7 @@ async def execute(ctx):
         return
 
     # Fetch the transaction details by nonce
-    transaction = fetch_transaction_by_nonce(nonce)
+    transaction = await asyncio.to_thread(fetch_transaction_by_nonce, nonce)
     if not transaction:
         await ctx.send(f"❌ No transaction found for nonce {nonce}.")
         print(f"No transaction found for nonce {nonce}.")
@@ -383,7 +574,8 @@ async def execute(ctx):
 
     # Execute the transaction and check for receipt boolean
     transaction["_wait_for_receipt"] = True
-    res = execute_transaction(transaction)
+    res = await asyncio.to_thread(execute_transaction, transaction)
+    snapshots.invalidate()
 
     if isinstance(res, dict) and res.get("ok"):
         txh = res["tx_hash"]
@@ -408,12 +600,10 @@ async def force_execute(ctx):
     """Execute lowest nonce, ignores pause state."""
     await ctx.send("⚡ Overriding pause state, executing the lowest nonce transaction...")
 
-    # Fetch staking contract balance
-    staking_balance = get_staking_balance()
-    staking_balance = round(staking_balance, 1) if staking_balance else 0.0
-
-    # Fetch pending transactions
-    transactions = fetch_recent_transactions()
+    # Staking balance and pending transactions from the shared snapshot (one upstream fetch per burst)
+    snapshot = await snapshots.get(max_age=EXECUTION_MAX_STALENESS)
+    staking_balance = round(snapshot["staking_balance"], 1) if snapshot["staking_balance"] else 0.0
+    transactions = snapshot["transactions"]
     pending_transactions = filter_and_sort_pending_transactions(transactions)
 
     if not pending_transactions:
@@ -467,7 +657,7 @@ async def force_execute(ctx):
         return
 
     # Fetch the transaction details by nonce
-    transaction = fetch_transaction_by_nonce(nonce)
+    transaction = await asyncio.to_thread(fetch_transaction_by_nonce, nonce)
     if not transaction:
         await ctx.send(f"❌ No transaction found for nonce {nonce}.")
         print(f"No transaction found for nonce {nonce}.")
@@ -475,7 +665,8 @@ async def force_execute(ctx):
 
     # Execute the transaction
     transaction["_wait_for_receipt"] = True
-    res = execute_transaction(transaction)
+    res = await asyncio.to_thread(execute_transaction, transaction)
+    snapshots.invalidate()
 
     if isinstance(res, dict) and res.get("ok"):
         txh = res["tx_hash"]
@@ -500,12 +691,10 @@ async def force_execute_no_checks(ctx):
     """Execute lowest nonce, ignores pause state AND token balance."""
     await ctx.send("🔥 Overriding pause state AND token balance, executing the lowest nonce transaction...")
 
-    # Fetch staking contract balance
-    staking_balance = get_staking_balance()
-    staking_balance = round(staking_balance, 1) if staking_balance else 0.0
-
-    # Fetch pending transactions
-    transactions = fetch_recent_transactions()
+    # Staking balance and pending transactions from the shared snapshot (one upstream fetch per burst)
+    snapshot = await snapshots.get(max_age=EXECUTION_MAX_STALENESS)
+    staking_balance = round(snapshot["staking_balance"], 1) if snapshot["staking_balance"] else 0.0
+    transactions = snapshot["transactions"]
     pending_transactions = filter_and_sort_pending_transactions(transactions)
 
     if not pending_transactions:
@@ -542,7 +731,7 @@ async def force_execute_no_checks(ctx):
         return
 
     # Fetch the transaction details by nonce
-    transaction = fetch_transaction_by_nonce(nonce)
+    transaction = await asyncio.to_thread(fetch_transaction_by_nonce, nonce)
     if not transaction:
         await ctx.send(f"❌ No transaction found for nonce {nonce}.")
         print(f"No transaction found for nonce {nonce}.")
@@ -550,7 +739,8 @@ async def force_execute_no_checks(ctx):
 
     # Execute the transaction and wait for receipt boolean
     transaction["_wait_for_receipt"] = True
-    res = execute_transaction(transaction)
+    res = await asyncio.to_thread(execute_transaction, transaction)
+    snapshots.invalidate()
 
     if isinstance(res, dict) and res.get("ok"):
         txh = res["tx_hash"]
@@ -576,12 +766,9 @@ async def ultimate_force_execute(ctx):
     """Ultimate command to execute the lowest nonce, ignoring all checks except signature count."""
     await ctx.send("💀 Unleashing ultimate power! Executing the lowest nonce transaction...")
 
-    # Fetch staking contract balance
-    staking_balance = get_staking_balance()
-    staking_balance = round(staking_balance, 1) if staking_balance else 0.0
-
-    # Fetch pending transactions
-    transactions = fetch_recent_transactions()
+    # Staking balance and pending transactions from the shared snapshot (one upstream fetch per burst)
+    snapshot = await snapshots.get(max_age=EXECUTION_MAX_STALENESS)
+    transactions = snapshot["transactions"]
     pending_transactions = filter_and_sort_pending_transactions(transactions)
 
     if not pending_transactions:
@@ -619,7 +806,7 @@ async def ultimate_force_execute(ctx):
         return
 
     # Fetch the actual transaction details by nonce
-    transaction = fetch_transaction_by_nonce(nonce)
+    transaction = await asyncio.to_thread(fetch_transaction_by_nonce, nonce)
     if not transaction:
         await ctx.send(f"❌ No transaction found for nonce {nonce}.")
         print(f"No transaction found for nonce {nonce}.")
@@ -627,7 +814,8 @@ async def ultimate_force_execute(ctx):
 
     # Execute the transaction regardless of data decode status
     transaction["_wait_for_receipt"] = True
-    res = execute_transaction(transaction)
+    res = await asyncio.to_thread(execute_transaction, transaction)
+    snapshots.invalidate()
 
     if isinstance(res, dict) and res.get("ok"):
         result = res["tx_hash"]  # keep your existing message formatting below
@@ -663,68 +851,66 @@ async def ultimate_force_execute(ctx):
         await ctx.send(f"❌ Transaction {nonce} could not be executed.")
         print(f"Transaction {nonce} could not be executed.\n")
 
-@tasks.loop(hours=1)
-async def periodic_recheck():
+async def periodic_recheck(reasons=None):
+    """
+    Recheck the queue and execute what's ready. Run by recheck_scheduler on events and on a backing-off heartbeat.
+    Returns a fingerprint of the state it saw (balance, pending nonces/confirmations, pause state), or None on error.
+    """
+    global safe_api_warning_sent
     print("Performing periodic recheck...")
-    global paused, LAST_DAILY_REPORT_DATE
+    print(f"HTTP transport counters: {transport_stats()}")
+    global LAST_DAILY_REPORT_DATE
 
-    from deposit_monitor import check_large_deposits_with_block, split_long_message
     import asyncio
 
     try:
-        # 1) Read the old block from JSON
-        old_persisted_block = load_last_scanned_block()
-
-        if old_persisted_block is None:
-            print("No persisted last_scanned_block found. Using full 65-minute lookback.")
-            start_block = None
-        else:
-            start_block = old_persisted_block + 1
-
-        # Run deposit monitor from the appropriate block range inside a seperate thread to avoid bricking discord heart beat.
-        alert_triggered, deposit_message, new_last_block = \
-            await asyncio.to_thread(check_large_deposits_with_block, start_block)
-
-        # If we get a new block from deposit_monitor:
-        if new_last_block is not None:
-            if old_persisted_block is not None:
-                print(f"✅ Updating last scanned block from {old_persisted_block} to {new_last_block}")
-            else:
-                print(f"✅ Setting last_scanned_block for the first time: {new_last_block}")
-
-            # Save the new block to JSON
-            save_last_scanned_block(new_last_block)
-        else:
-            print("⚠️ Warning: new_last_block returned as None. Retrying from previous block next loop.")
-
-        # 4) Failsafe: re-check that we actually have a persisted value
+        # Stage 1, concurrently: the deposit state and a fresh balance/queue snapshot don't depend on each other,
+        # so the recheck waits for the slower of the two, each under its own deadline.
+        # Large deposits are caught (and alerted/paused on) by the block watcher within seconds;
+        # the recheck only reads its latest state, scanning itself if the watcher has gone quiet.
+        # The snapshot joins a fetch already in flight for a command.
+        (deposit_state, deposit_late), (snapshot, snapshot_late) = await asyncio.gather(
+            run_stage("deposit scan", latest_deposit_state(), RECHECK_DEPOSIT_DEADLINE),
+            run_stage("balance and Safe queue", snapshots.get(max_age=0), RECHECK_SNAPSHOT_DEADLINE),
+        )
+        stale_stages = []
+        if deposit_late:
+            deposit_state = deposit_watch_state  # Whatever the watcher saw last
+            stale_stages.append("deposit scan")
+        if snapshot_late:
+            snapshot = snapshots.latest()
+            if snapshot is None:
+                print("Recheck: no balance/queue snapshot within the deadline and none cached. Skipping this recheck.")
+                return None
+            # A Discord timestamp rather than an age in seconds: the text stays the same until a new fetch
+            # lands, so the live status isn't re-edited on every recheck just because the age ticked up
+            stale_stages.append(f"balance and Safe queue (as of <t:{int(snapshot['fetched_at'])}:R>)")
+        if deposit_state["alert_triggered"]:
+            print("Deposit watcher reported a large deposit in its latest scan. Execution stays paused.")
+
+        # Failsafe: re-check that we actually have a persisted value
         check_block = load_last_scanned_block()
         if check_block is None:
             print("🚨 Critical: last_scanned_block is STILL None! Will revert to full 65-minute lookback next loop.")
 
-        # Handle deposit alerts and pause logic
-        if alert_triggered:
-            for chunk in split_long_message(deposit_message):
-                await broadcast_message(chunk)
-            if not paused:  # Only pause if not already paused
-                paused = True                
-                print("Deposit monitor triggered a pause due to a large deposit.")
-            else:
-                print("Deposit monitor detected large deposit while already paused.")
-            return  # Exit early if a large deposit was found
-
-        # Fetch staking contract balance
-        staking_balance = await asyncio.to_thread(get_staking_balance)
-        staking_balance = round(staking_balance, 1) if staking_balance else 0.0
-        print(f"Staking Contract Balance: {staking_balance} S tokens")
-
-        # Fetch pending transactions
-        transactions = await asyncio.to_thread(fetch_recent_transactions)
+        # Stage 2: decode, report and execute on whatever stage 1 produced
+        staking_balance = round(snapshot["staking_balance"], 1) if snapshot["staking_balance"] else 0.0
+        print(f"Staking Contract Balance: {staking_balance} S tokens (block {snapshot['block_number']})")
+        transactions = snapshot["transactions"]
         pending_transactions = filter_and_sort_pending_transactions(transactions)
+        fingerprint = (
+            staking_balance,
+            tuple((tx["nonce"], tx.get("signature_count", 0)) for tx in pending_transactions),
+            paused,
+        )
         if transactions == []:
-            await broadcast_message(
-                "⚠️  Gnosis Safe API either shat the bed again or there are legitimately no pending transactions."
-                "If the CEO of staking is on smoke break...again, then don't tell franz, you fucken snitch.")
+            if not safe_api_warning_sent:  # Event-driven rechecks can run often; warn once per outage
+                await broadcast_message(
+                    "⚠️  Gnosis Safe API either shat the bed again or there are legitimately no pending transactions."
+                    "If the CEO of staking is on smoke break...again, then don't tell franz, you fucken snitch.")
+                safe_api_warning_sent = True
+        else:
+            safe_api_warning_sent = False
 
         # Log pending transactions
         if not pending_transactions:
@@ -774,7 +960,7 @@ async def periodic_recheck():
         print(f"Staking Headroom (Pending Total - Staking Contract Balance): {total_available_tokens} S tokens")
 
         # Prepare the full report for all pending transactions
-        full_report = format_transaction_report({
+        report_data = {
             "staking_balance": staking_balance,
             "pending_transactions": [
                 {
@@ -797,7 +983,8 @@ async def periodic_recheck():
                 }
                 for tx in pending_transactions
             ]
-        }, header="Periodic Recheck Report")
+        }
+        full_report = format_transaction_report(report_data, header="Periodic Recheck Report")
 
         # Append no_tx_message if there are no transactions
         if not pending_transactions:
@@ -854,15 +1041,30 @@ async def periodic_recheck():
             decoded = decode_hex_data(hex_data) if hex_data else {}
             signature_count = lowest_transaction["signature_count"]
             confirmations_required = lowest_transaction["confirmations_required"]
+        # Follow the next nonce's signatures between rechecks (stops watching once it is fully signed)
+        signature_watcher.watch(
+            pending_transactions[0] if decoded else None, float(decoded.get("amountInTokens", 0.0)) if decoded else 0.0
+        )
+
+        if stale_stages:
+            full_report += (
+                f"\n\n🕰️ **Stale:** {', '.join(stale_stages)} missed the recheck deadline; "
+                f"those figures are from the last successful fetch. Execution waits for fresh data."
+            )
 
         # Add paused state message to the report
         if paused:
             print("Periodic recheck: Execution is paused.")
             full_report += "\n\n⏸️ **Note:** Automated transaction execution is currently paused. Rechecks and reports will continue."
+        elif stale_stages:
+            print(f"Periodic recheck: not executing on stale data ({', '.join(stale_stages)}).")
+        elif mempool_watcher.is_holding():
+            print("Periodic recheck: Execution is held for a pending large deposit.")
+            full_report += "\n\n⏳ **Note:** A large deposit is pending in the mempool. Execution is held until it lands."
         else:
             if decoded:
                 while True:
-                    if paused:  # Break the execution loop if pause is triggered during execution
+                    if paused or mempool_watcher.is_holding():  # Break the execution loop if pause is triggered during execution
                         print("Pause detected during execution. Stopping transaction execution.")
                         break
                     if signature_count < confirmations_required:
@@ -873,13 +1075,18 @@ async def periodic_recheck():
                         print(f"Transaction {nonce} is ready to execute. Executing now...")
 
                         # Execute with receipt gating and 3 attempts spaced 60s
-                        transaction = fetch_transaction_by_nonce(nonce)
+                        # Off the event loop so the deposit watcher can still pause us mid-execution
+                        transaction = await asyncio.to_thread(fetch_transaction_by_nonce, nonce)
                         if transaction:
                             attempts = 0
                             succeeded = False
                             while attempts < 3 and not succeeded:
+                                if paused or mempool_watcher.is_holding():
+                                    print("Pause detected before execution attempt. Stopping transaction execution.")
+                                    break
                                 transaction["_wait_for_receipt"] = True
-                                res = execute_transaction(transaction)
+                                res = await asyncio.to_thread(execute_transaction, transaction)
+                                snapshots.invalidate()
                                 if isinstance(res, dict) and res.get("ok"):
                                     txh = res["tx_hash"]
                                     await broadcast_message(
@@ -896,6 +1103,8 @@ async def periodic_recheck():
                                         f"- Transaction Hash: {txh}"
                                     )
                                     succeeded = True
+                                    # The next nonce may be executable right away
+                                    recheck_scheduler.trigger("executed", force=True)
                                     break
                                 else:
                                     attempts += 1
@@ -905,13 +1114,13 @@ async def periodic_recheck():
                                             f"Retrying in 60 seconds…"
                                         )
                                         for _ in range(60):
-                                            if paused:  # respect pause during cooldown
+                                            if paused or mempool_watcher.is_holding():  # respect pause during cooldown
                                                 break
                                             await asyncio.sleep(1)
 
                             if not succeeded:
                                 # After 3 failures, pause and ping same IDs as your >100k alert
-                                paused = True
+                                set_paused(True, f"nonce {nonce} reverted 3 times")
                                 await broadcast_message(
                                     "🚨 **Transaction Reverted Alert** 🚨\n"
                                     "This transaction reverted 3 consecutive times and automation is now paused. "
@@ -925,31 +1134,232 @@ async def periodic_recheck():
                         print("Insufficient balance for the next transaction.")
                         break
 
+        # Live status: edited in place, and only when one of its rows changed
+        await refresh_live_status(status_rows(report_data, deposit_state, stale_stages))
+
         # Anchored daily report (once after 09:00 UTC)
         now_utc = datetime.now(timezone.utc)
         today = now_utc.date()
         target_today = now_utc.replace(hour=DAILY_REPORT_UTC_HOUR, minute=0, second=0, microsecond=0)
 
         if (now_utc >= target_today) and (LAST_DAILY_REPORT_DATE != today):
-            for part in split_long_message(full_report):
-                await broadcast_message(part)
+            await broadcast_message(full_report)
             LAST_DAILY_REPORT_DATE = today
+            save_bot_state()
+
+        recheck_error["text"] = None
+        return None if stale_stages else fingerprint  # A stale recheck shouldn't let the heartbeat back off
 
     except Exception as e:
         print(f"Error during periodic recheck: {e}")
-        await broadcast_message(f"Error during periodic recheck: {e}")
+        text = f"Error during periodic recheck: {e}"
+        now = time.time()
+        if text != recheck_error["text"] or now - recheck_error["sent_at"] >= RECHECK_ERROR_BROADCAST_INTERVAL:
+            recheck_error.update(text=text, sent_at=now)
+            await broadcast_message(text)
+        return None
 
-async def broadcast_message(message):
-    """Broadcast a message to all servers the bot is in."""
+recheck_scheduler = RecheckScheduler(periodic_recheck)  # Event-driven replacement for the hourly loop
+
+async def run_deposit_scan():
+    """
+    Scan every block since the persisted checkpoint for large deposits, advance the checkpoint,
+    and pause + alert straight away if one is found. Returns the updated deposit_watch_state.
+    """
+    from deposit_monitor import check_large_deposits_with_block, get_block_hash, flow_tally
+    from deposit_index import forget_blocks
+
+    async with deposit_scan_lock:
+        counts_before, net_flow_before = dict(flow_tally.counts), flow_tally.net_flow()
+        old_persisted_block = load_last_scanned_block()
+        # Resume right after the cursor, or a few blocks before it if the cursor's block hash changed (reorg)
+        start_block = await asyncio.to_thread(resume_block, DEPOSIT_STREAM, get_block_hash, on_reorg=forget_blocks)
+        if start_block is None:
+            print("No persisted last_scanned_block found. Using full 65-minute lookback.")
+
+        # Run deposit monitor inside a separate thread to avoid bricking the discord heart beat.
+        alert_triggered, deposit_message, new_last_block = \
+            await asyncio.to_thread(check_large_deposits_with_block, start_block)
+
+        if new_last_block is None:
+            print("⚠️ Warning: new_last_block returned as None. Retrying from previous block next loop.")
+            return deposit_watch_state
+
+        # Deposits, withdrawals and undelegations move the staking balance: recheck the queue against it,
+        # but only when the move could make the next nonce executable (or stop it being so)
+        if flow_tally.counts != counts_before and flow_may_change_execution(flow_tally, counts_before, net_flow_before):
+            recheck_scheduler.trigger("contract flow")
+
+        if start_block is None or new_last_block >= start_block:
+            if old_persisted_block is not None:
+                print(f"✅ Updating last scanned block from {old_persisted_block} to {new_last_block}")
+            else:
+                print(f"✅ Setting last_scanned_block for the first time: {new_last_block}")
+            block_hash = await asyncio.to_thread(get_block_hash, new_last_block, True)
+            save_last_scanned_block(new_last_block, block_hash)
+
+        scanned_from = start_block if start_block is not None else new_last_block
+        if alert_triggered or deposit_watch_state["clean_since_block"] is None:
+            deposit_watch_state["clean_since_block"] = new_last_block + 1 if alert_triggered else scanned_from
+        deposit_watch_state["alert_triggered"] = alert_triggered
+        deposit_watch_state["message"] = deposit_message if alert_triggered else None
+        deposit_watch_state["last_block"] = new_last_block
+        deposit_watch_state["updated_at"] = time.time()
+
+    if alert_triggered:
+        if not paused:  # Only pause if not already paused
+            set_paused(True, "large deposit alert")
+            print("Deposit watcher triggered a pause due to a large deposit.")
+        else:
+            print("Deposit watcher detected large deposit while already paused.")
+        await broadcast_message(deposit_message)
+    mempool_watcher.release_landed(new_last_block)  # Any held deposit mined by now was scanned (and paused for) above
+    return deposit_watch_state
+
+def flow_may_change_execution(tally, counts_before, net_flow_before):
+    """
+    True if the contract flows `tally` saw since `counts_before` could change whether the next nonce is executable:
+    the snapshot balance plus the net flow since that snapshot lands on the other side of its amount. Events
+    other than deposits and withdrawals, or a missing snapshot or undecodable amount, always count.
+    """
+    if any(count > counts_before.get(name, 0) for name, count in tally.counts.items()
+           if name not in ("Deposited", "Withdrawn")):
+        return True
+    snapshot = snapshots.latest()
+    if snapshot is None or snapshot["staking_balance"] is None:
+        return True
+    if flow_baseline["fetched_at"] != snapshot["fetched_at"]:
+        flow_baseline.update(fetched_at=snapshot["fetched_at"], net_flow=net_flow_before)
+    pending = filter_and_sort_pending_transactions(snapshot["transactions"] or [])
+    if not pending:
+        return False  # Nothing queued for the balance to matter to
+    decoded = decode_hex_data(pending[0].get("data")) if pending[0].get("data") else None
+    if not isinstance(decoded, dict) or "amountInTokens" not in decoded:
+        return True
+    amount = float(decoded["amountInTokens"])
+    balance = snapshot["staking_balance"]
+    estimated = balance + tally.net_flow() - flow_baseline["net_flow"]
+    return (balance >= amount) != (estimated >= amount)
+
+async def latest_deposit_state():
+    """The watcher's latest deposit state, running a scan first if it's older than DEPOSIT_STATE_MAX_AGE."""
+    updated_at = deposit_watch_state["updated_at"]
+    if updated_at is None or time.time() - updated_at > DEPOSIT_STATE_MAX_AGE:
+        print("Deposit watcher state is stale. Scanning now.")
+        await run_deposit_scan()
+    return deposit_watch_state
+
+@tasks.loop(seconds=DEPOSIT_WATCH_INTERVAL)
+async def watch_deposits():
+    """Follow new blocks and pause + alert within seconds of a large deposit landing."""
+    try:
+        await run_deposit_scan()
+    except Exception as e:
+        print(f"Error in deposit watcher: {e}")
+
+@tasks.loop(seconds=SAFE_EVENT_POLL_INTERVAL)
+async def follow_safe_events():
+    """Follow Safe execution events so executed nonces drop out of reports even when the Safe API lags."""
+    new_executions = await asyncio.to_thread(poll_safe_events)
+    if new_executions:
+        print(f"🔗 Safe event follower recorded {new_executions} new on-chain execution(s).")
+        recheck_scheduler.trigger("safe execution")
+
+@tasks.loop(seconds=BACKFILL_INTERVAL)
+async def backfill_deposit_history():
+    """Walk deposit history into the index in the background, one checkpointed range at a time."""
+    from deposit_backfill import backfill_step
+    if deposit_scan_lock.locked():
+        return  # Live scanning goes first
+    try:
+        status = await asyncio.to_thread(backfill_step)
+    except Exception as e:
+        print(f"Error in deposit backfill: {e}")
+        return
+    if status == "done":
+        print("📚 Deposit history backfill complete.")
+        backfill_deposit_history.stop()
+
+@tasks.loop(hours=24)
+async def compact_deposit_index():
+    """Daily retention pass: fold old raw deposits into the rollups so /data stays bounded."""
+    from deposit_index import compact_index
+    from deposit_monitor import get_block_by_time
+    await asyncio.to_thread(compact_index, block_at=get_block_by_time)
+
+@tasks.loop(seconds=MEMPOOL_POLL_INTERVAL)
+async def watch_mempool():
+    """Hold execution as soon as a large deposit shows up in the mempool, before it is mined."""
+    new_holds = await asyncio.to_thread(mempool_watcher.poll)
+    for hold in new_holds or []:
+        await broadcast_message(
+            f"⏳ **Pending deposit:** {hold['amount']:,.1f} $S deposit by [DeBank Wallet](<https://debank.com/profile/{hold['sender']}>) "
+            f"is waiting to be mined ([SonicScan TX]({SONICSCAN_TX_URL}{hold['tx_hash']})). Execution is held until it lands."
+        )
+
+@tasks.loop(seconds=SIGNATURE_POLL_INTERVAL)
+async def watch_signatures():
+    """Run the execution path within seconds of the next nonce reaching its signature threshold."""
+    ready = await asyncio.to_thread(signature_watcher.poll)
+    if ready is None:
+        return
+    if paused or mempool_watcher.is_holding():
+        print(f"Nonce {ready['nonce']} is fully signed but execution is paused/held; leaving it to the next recheck.")
+        return
+    snapshot = await snapshots.get(max_age=EXECUTION_MAX_STALENESS)
+    if (snapshot["staking_balance"] or 0.0) < ready["amount"]:
+        print(f"Nonce {ready['nonce']} is fully signed but the balance doesn't cover it yet; waiting for a balance change.")
+        return
+    recheck_scheduler.trigger("signature threshold", urgent=True)
+
+def designated_text_channels():
+    """The designated channel of every guild the bot is in (where it can send)."""
+    channels = []
     for guild in bot.guilds:
         if guild.id in designated_channels:
-            channel_id = designated_channels[guild.id]
-            channel = discord.utils.get(guild.text_channels, id=channel_id)
+            channel = discord.utils.get(guild.text_channels, id=designated_channels[guild.id])
             if channel and channel.permissions_for(guild.me).send_messages:
-                try:
-                    await channel.send(message)
-                except Exception as send_error:
-                    print(f"Error sending message to channel {channel.name}: {send_error}")
+                channels.append(channel)
+    return channels
+
+def status_rows(report_data, deposit_state, stale_stages=()):
+    """
+    Rows of the live status: the queue table plus one line each for execution and deposit state.
+    Nothing volatile (block numbers, times) goes in, so an unchanged queue renders identical rows.
+    """
+    rows = format_transaction_report(report_data, header="Live Queue Status").split("\n")
+    if paused:
+        rows.append(f"⏸️ Automated execution is paused ({pause_reason or 'no reason given'}).")
+    elif mempool_watcher.is_holding():
+        rows.append("⏳ Execution is held for a large deposit pending in the mempool.")
+    else:
+        rows.append("▶️ Automated execution is active.")
+    if deposit_state["alert_triggered"]:
+        rows.append("🚨 The deposit watcher flagged a large deposit in its latest scan.")
+    elif deposit_state["clean_since_block"] is not None:
+        rows.append(f"✅ No large deposits since block {deposit_state['clean_since_block']}.")
+    else:
+        rows.append("✅ No large deposits in the latest scan.")
+    if stale_stages:
+        rows.append(f"🕰️ Stale: {', '.join(stale_stages)}.")
+    return rows
+
+async def refresh_live_status(rows):
+    """Bring the pinned status message in every designated channel up to date."""
+    try:
+        await live_status.update(broadcasts.channels(), rows)
+    except Exception as e:
+        print(f"Error refreshing live status: {e}")
+
+broadcasts = BroadcastQueue(designated_text_channels)  # Cached channels, concurrent per-channel send queues
+
+async def broadcast_message(message):
+    """
+    Broadcast a message to the designated channel of every server the bot is in, all guilds at once.
+    Long messages are split into parts here, so de-duplication applies to the whole message.
+    """
+    from deposit_monitor import split_long_message
+    await broadcasts.broadcast(message, parts=split_long_message(message))
 
 def format_transaction_report(result, header=None):
     """Format the transaction report for Discord with color-coded statuses."""
@@ -990,4 +1400,5 @@ def format_transaction_report(result, header=None):
     return "\n".join(report_lines)
 
 if __name__ == "__main__":
+    restore_bot_state()
     bot.run(DISCORD_TOKEN)
\ No newline at end of file
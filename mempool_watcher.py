@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from log_scanner import rpc_call, rpc_batch, SONIC_RPC_URL
+
+# Load environment variables
+load_dotenv()
+
+CONTRACT_ADDRESS = "0xE5DA20F15420aD15DE0fa650600aFc998bbE3955"
+DEPOSIT_SELECTOR = "0xd0e30db0"  # deposit() on the staking contract (see decode_hex._SELECTOR_TO_NAME)
+DECIMALS = 10**18  # Convert wei to human-readable format
+MEMPOOL_WATCH_ENABLED = os.getenv("MEMPOOL_WATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+MEMPOOL_RPC_URL = os.getenv("MEMPOOL_RPC_URL") or SONIC_RPC_URL  # Needs a node that exposes its txpool
+MEMPOOL_POLL_INTERVAL = int(os.getenv("MEMPOOL_POLL_INTERVAL", "2"))  # Seconds between filter polls
+MEMPOOL_HOLD_THRESHOLD = float(os.getenv("MEMPOOL_HOLD_THRESHOLD", "100000"))  # S tokens; same as FLAG_THRESHOLD
+MEMPOOL_HOLD_SECONDS = 180  # A hold lapses if its deposit hasn't been mined by then
+MAX_LOOKUPS_PER_POLL = 500  # Pending tx hashes resolved per poll when the node only returns hashes; the rest wait
+DROPPED_AFTER_POLLS = 2  # Polls a held tx must be unknown to the node before its hold is released as dropped
+
+class MempoolWatcher:
+    """
+    Polls a pending-transaction filter for deposit() calls to the staking contract and holds execution
+    while a large one is waiting to be mined. A hold is released when the node drops the transaction, or
+    once it is mined and the block watcher has scanned its block (and paused), see release_landed().
+    All node access goes through `rpc_url`, so a local JSON-RPC stand-in can drive it.
+    """
+
+    def __init__(self, rpc_url=MEMPOOL_RPC_URL, threshold=MEMPOOL_HOLD_THRESHOLD, hold_seconds=MEMPOOL_HOLD_SECONDS,
+                 contract_address=CONTRACT_ADDRESS):
+        self.rpc_url = rpc_url
+        self.threshold = threshold
+        self.hold_seconds = hold_seconds
+        self.contract_address = contract_address.lower()
+        self.filter_id = None
+        self.full_tx_filter = True  # Ask for whole transactions first; fall back to hashes if refused
+        self.holds = {}  # tx hash -> {"tx_hash", "sender", "amount", "seen_at", "block_number", "missing"}
+        self.seen = {}  # tx hash -> seen_at, so each pending tx is inspected once
+        self.backlog = []  # Hashes from the filter not looked up yet (the filter returns each hash only once)
+        self._lock = threading.Lock()  # poll() runs in a worker thread, is_holding() on the event loop
+
+    def _new_filter(self):
+        if self.full_tx_filter:
+            try:
+                self.filter_id = rpc_call("eth_newPendingTransactionFilter", [True], rpc_url=self.rpc_url)
+                return
+            except RuntimeError:
+                self.full_tx_filter = False
+        self.filter_id = rpc_call("eth_newPendingTransactionFilter", [], rpc_url=self.rpc_url)
+
+    def _changes(self):
+        """New pending entries since the last poll (tx objects or hashes), recreating the filter if it expired."""
+        if self.filter_id is None:
+            self._new_filter()
+            return []
+        try:
+            return rpc_call("eth_getFilterChanges", [self.filter_id], rpc_url=self.rpc_url) or []
+        except RuntimeError as e:
+            if "filter not found" not in str(e).lower():
+                raise
+            print("🔁 Pending-transaction filter expired on the node; recreating it.")
+            self._new_filter()
+            return []
+
+    def _resolve(self, entries):
+        """
+        Turn filter entries into transaction dicts, batching hash lookups into one request. At most
+        MAX_LOOKUPS_PER_POLL hashes are looked up per poll, oldest first; the rest stay in the backlog for the
+        next polls, since the filter won't return them again.
+        """
+        txs = [entry for entry in entries if isinstance(entry, dict)]
+        self.backlog.extend(entry for entry in entries if isinstance(entry, str))
+        hashes = []
+        while self.backlog and len(hashes) < MAX_LOOKUPS_PER_POLL:
+            tx_hash = self.backlog.pop(0)
+            if tx_hash not in self.seen and tx_hash not in hashes:
+                hashes.append(tx_hash)
+        if self.backlog:
+            print(f"⚠️ {len(self.backlog)} pending transactions left to inspect on the next poll.")
+        if hashes:
+            try:
+                results = rpc_batch([("eth_getTransactionByHash", [tx_hash]) for tx_hash in hashes], rpc_url=self.rpc_url)
+            except Exception:
+                self.backlog[:0] = hashes  # Nothing was inspected; try these first next time
+                raise
+            txs.extend(tx for tx in results if tx)
+        return txs
+
+    def _is_deposit(self, tx):
+        return (
+            (tx.get("to") or "").lower() == self.contract_address
+            and (tx.get("input") or tx.get("data") or "").lower().startswith(DEPOSIT_SELECTOR)
+        )
+
+    def _track_holds(self):
+        """
+        Look up every held tx in one batch: note the block of mined ones, release ones the node no longer knows.
+        A tx has to be missing for DROPPED_AFTER_POLLS polls, since a failed lookup in the batch also reads as None.
+        """
+        with self._lock:
+            pending = [tx_hash for tx_hash, hold in self.holds.items() if hold["block_number"] is None]
+        if not pending:
+            return
+        results = rpc_batch([("eth_getTransactionByHash", [tx_hash]) for tx_hash in pending], rpc_url=self.rpc_url)
+        for tx_hash, tx in zip(pending, results):
+            with self._lock:
+                hold = self.holds.get(tx_hash)
+                if hold is None:
+                    continue
+                if tx and tx.get("blockNumber"):
+                    hold["block_number"] = int(tx["blockNumber"], 16)
+                    continue
+                hold["missing"] = 0 if tx else hold["missing"] + 1
+                if hold["missing"] < DROPPED_AFTER_POLLS:
+                    continue
+            print(f"🗑️ Pending {hold['amount']:,.1f} S deposit {tx_hash} was dropped from the mempool; releasing its hold.")
+            self.release(tx_hash)
+
+    def poll(self, now=None):
+        """
+        Inspect pending transactions since the last poll and follow up on held ones. Blocking; run it in a thread
+        from the Discord loop. Returns a list of newly held deposits ({"tx_hash", "sender", "amount", "seen_at", ...}),
+        or None if the node call failed.
+        """
+        now = time.time() if now is None else now
+        try:
+            self._track_holds()
+            txs = self._resolve(self._changes())
+        except Exception as e:
+            print(f"❌ Mempool poll failed: {e}")
+            self.filter_id = None
+            return None
+
+        new_holds = []
+        with self._lock:
+            for tx in txs:
+                tx_hash = tx.get("hash")
+                if not tx_hash or tx_hash in self.seen:
+                    continue
+                self.seen[tx_hash] = now
+                if not self._is_deposit(tx):
+                    continue
+                value = tx.get("value") or "0x0"
+                amount = (int(value, 16) if isinstance(value, str) else int(value)) / DECIMALS
+                if amount >= self.threshold:
+                    hold = {"tx_hash": tx_hash, "sender": tx.get("from"), "amount": amount, "seen_at": now,
+                            "block_number": None, "missing": 0}
+                    self.holds[tx_hash] = hold
+                    new_holds.append(hold)
+                    print(f"⏳ Pending {amount:,.1f} S deposit {tx_hash} seen in the mempool; holding execution.")
+
+            self._expire(now)
+        return new_holds
+
+    def _expire(self, now):
+        """Drop lapsed holds and forget old pending hashes. Caller holds the lock."""
+        for tx_hash in [h for h, hold in self.holds.items() if now - hold["seen_at"] >= self.hold_seconds]:
+            del self.holds[tx_hash]
+        for tx_hash in [h for h, seen_at in self.seen.items() if now - seen_at >= self.hold_seconds]:
+            del self.seen[tx_hash]
+
+    def is_holding(self, now=None):
+        """True while a large pending deposit is waiting to be mined."""
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+            return bool(self.holds)
+
+    def release(self, tx_hash=None):
+        """Drop one hold (its deposit was dropped or has been scanned), or all of them."""
+        with self._lock:
+            if tx_hash is None:
+                self.holds.clear()
+            else:
+                self.holds.pop(tx_hash, None)
+
+    def release_landed(self, scanned_through_block):
+        """
+        Release holds whose deposit was mined at or before `scanned_through_block`: the block watcher has seen
+        them by then and paused if needed. Returns the released holds.
+        """
+        with self._lock:
+            landed = [hold for hold in self.holds.values()
+                      if hold["block_number"] is not None and hold["block_number"] <= scanned_through_block]
+        for hold in landed:
+            print(f"✅ Held deposit {hold['tx_hash']} landed in block {hold['block_number']} and was scanned; releasing its hold.")
+            self.release(hold["tx_hash"])
+        return landed
@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+import os
+import time
+
+RECHECK_DEBOUNCE = float(os.getenv("RECHECK_DEBOUNCE", "5"))  # Seconds to let a burst of events settle
+RECHECK_MIN_GAP = 15  # Seconds between two rechecks, however many events arrive
+HEARTBEAT_MIN = int(os.getenv("RECHECK_HEARTBEAT_MIN", "300"))  # Heartbeat right after something changed
+HEARTBEAT_MAX = 3600  # Quiet periods back off to this, the old fixed hourly cadence
+
+# Set while a recheck runs, so state changes it observes itself don't schedule another one
+in_recheck = contextvars.ContextVar("in_recheck", default=False)
+
+async def run_stage(name, awaitable, deadline):
+    """
+    Await one recheck stage under its own deadline. Returns (result, timed_out). The stage is shielded, so a
+    timeout leaves it running in the background: a late deposit scan still finishes and checkpoints.
+    """
+    try:
+        return await asyncio.wait_for(asyncio.shield(awaitable), timeout=deadline), False
+    except asyncio.TimeoutError:
+        print(f"⏳ Recheck stage '{name}' missed its {deadline:.0f}s deadline; using its last result, marked stale.")
+        return None, True
+
+class RecheckScheduler:
+    """
+    Runs `recheck(reasons)` when something happens (new confirmation, balance change, deposit, manual command)
+    instead of on a fixed hourly loop. Bursts of events are debounced into one run, runs are spaced at least
+    RECHECK_MIN_GAP apart, and a heartbeat keeps rechecks going when nothing happens: it doubles from
+    HEARTBEAT_MIN up to HEARTBEAT_MAX while consecutive heartbeats see the same state, and resets on any change.
+    `recheck` returns a fingerprint of the state it saw (anything comparable), or None.
+    """
+
+    def __init__(self, recheck):
+        self.recheck = recheck
+        self.pending = {}  # reason -> number of events since the last run
+        self.heartbeat = HEARTBEAT_MIN
+        self.last_fingerprint = None
+        self.last_run = None  # time.monotonic() of the last finished run
+        self.runs = 0
+        self.urgent = False  # Set by an urgent trigger: the next run skips the debounce and the minimum gap
+        self._event = None
+        self._task = None
+
+    def trigger(self, reason, force=False, urgent=False):
+        """
+        Ask for a recheck soon. Events raised from inside a running recheck are ignored unless `force`
+        (e.g. a follow-up after a successful execution). `urgent` runs it without the debounce and minimum
+        gap, for events where seconds matter (a transaction just reached its signature threshold).
+        """
+        if in_recheck.get() and not force:
+            return
+        self.pending[reason] = self.pending.get(reason, 0) + 1
+        self.urgent = self.urgent or urgent
+        if self._event is not None:
+            self._event.set()
+
+    def start(self):
+        """Start the scheduler on the running event loop (idempotent)."""
+        if self.is_running():
+            return
+        self._event = asyncio.Event()
+        if self.pending:
+            self._event.set()
+        self._task = asyncio.ensure_future(self._run_forever())
+
+    def is_running(self):
+        return self._task is not None and not self._task.done()
+
+    def next_heartbeat_in(self):
+        """Seconds until the next heartbeat recheck."""
+        if self.last_run is None:
+            return 0
+        return max(self.heartbeat - (time.monotonic() - self.last_run), 0)
+
+    async def _run_forever(self):
+        self.pending.setdefault("startup", 1)
+        self._event.set()
+        while True:
+            timeout = self.heartbeat if self.last_run is None else self.next_heartbeat_in()
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout=timeout)
+                if not self.urgent:
+                    await asyncio.sleep(RECHECK_DEBOUNCE)  # Let the rest of the burst arrive
+            except asyncio.TimeoutError:
+                self.pending.setdefault("heartbeat", 1)
+
+            if self.last_run is not None and not self.urgent:
+                gap = RECHECK_MIN_GAP - (time.monotonic() - self.last_run)
+                if gap > 0:
+                    await asyncio.sleep(gap)
+
+            reasons, self.pending = self.pending, {}
+            self.urgent = False
+            self._event.clear()
+            await self._run_once(reasons)
+
+    async def _run_once(self, reasons):
+        print(f"🔁 Recheck triggered by: {', '.join(f'{reason} x{count}' for reason, count in reasons.items())}")
+        token = in_recheck.set(True)
+        try:
+            fingerprint = await self.recheck(reasons)
+        except Exception as e:
+            print(f"Error in scheduled recheck: {e}")
+            fingerprint = None
+        finally:
+            in_recheck.reset(token)
+        self.runs += 1
+        self.last_run = time.monotonic()
+
+        if set(reasons) == {"heartbeat"} and fingerprint is not None and fingerprint == self.last_fingerprint:
+            self.heartbeat = min(self.heartbeat * 2, HEARTBEAT_MAX)  # Nothing changed: back off
+        else:
+            self.heartbeat = HEARTBEAT_MIN
+        self.last_fingerprint = fingerprint
+        print(f"🔁 Next heartbeat recheck in {self.heartbeat} s unless something happens first.")
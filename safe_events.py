@@ -0,0 +1,131 @@
+import os
+from web3 import Web3
+from eth_abi.abi import decode
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SAFE_ADDRESS = os.getenv("SAFE_ADDRESS")
+SONIC_RPC_URL = os.getenv("SONIC_RPC_URL")
+SAFE_EVENT_POLL_INTERVAL = 5  # Seconds between log polls (Sonic produces ~1 block/s)
+SAFE_EVENT_LOOKBACK = 5_000  # Blocks scanned on the first poll after boot
+SAFE_EVENT_MAX_RANGE = 5_000  # Max blocks per eth_getLogs call
+
+# Safe events. Topics are derived from the signatures so there are no magic hashes to get wrong.
+EXECUTION_SUCCESS_TOPIC = Web3.to_hex(Web3.keccak(text="ExecutionSuccess(bytes32,uint256)"))
+EXECUTION_FAILURE_TOPIC = Web3.to_hex(Web3.keccak(text="ExecutionFailure(bytes32,uint256)"))
+# Only emitted by SafeL2 deployments; carries the nonce inside `additionalInfo`.
+SAFE_MULTISIG_TX_TOPIC = Web3.to_hex(Web3.keccak(
+    text="SafeMultiSigTransaction(address,uint256,bytes,uint8,uint256,uint256,uint256,address,address,bytes,bytes)"
+))
+SAFE_MULTISIG_TX_TYPES = [
+    "address", "uint256", "bytes", "uint8", "uint256", "uint256", "uint256", "address", "address", "bytes", "bytes"
+]
+
+web3 = Web3(Web3.HTTPProvider(SONIC_RPC_URL))
+
+# Local view of what the chain has executed, updated as new blocks arrive.
+executed_safe_tx_hashes = set()  # safeTxHash of every ExecutionSuccess/ExecutionFailure seen
+executed_nonces = set()  # nonces recovered from SafeMultiSigTransaction events
+highest_executed_nonce = None  # Safe nonces are sequential, anything at or below this is spent
+last_followed_block = None
+
+def _topic_hex(value):
+    """Normalise a topic/hash (HexBytes or str) to a lowercase 0x-prefixed string."""
+    return Web3.to_hex(value).lower() if not isinstance(value, str) else value.lower()
+
+def _execution_tx_hash(log):
+    """
+    Extract the safeTxHash from an ExecutionSuccess/ExecutionFailure log.
+    Safe >= 1.4 indexes txHash (topics[1]); 1.3 puts it in the first data word.
+    """
+    if len(log["topics"]) > 1:
+        return _topic_hex(log["topics"][1])
+    data = _topic_hex(log["data"])
+    return "0x" + data[2:66]
+
+def _multisig_tx_nonce(log):
+    """Decode the Safe nonce from a SafeMultiSigTransaction log, or None if it can't be decoded."""
+    try:
+        data = log["data"]
+        data = bytes(data) if not isinstance(data, str) else bytes.fromhex(data[2:] if data.startswith("0x") else data)
+        params = decode(SAFE_MULTISIG_TX_TYPES, data)
+        nonce, _sender, _threshold = decode(["uint256", "address", "uint256"], params[10])
+        return int(nonce)
+    except Exception as e:
+        print(f"Error decoding SafeMultiSigTransaction log: {e}")
+        return None
+
+def _record_log(log):
+    """Apply a single Safe log to the local executed-state. Returns True if it marked something executed."""
+    global highest_executed_nonce
+    topic0 = _topic_hex(log["topics"][0])
+
+    if topic0 in (EXECUTION_SUCCESS_TOPIC, EXECUTION_FAILURE_TOPIC):
+        # A failed execution still consumes the nonce, so both count as executed.
+        safe_tx_hash = _execution_tx_hash(log)
+        if safe_tx_hash in executed_safe_tx_hashes:
+            return False
+        executed_safe_tx_hashes.add(safe_tx_hash)
+        outcome = "succeeded" if topic0 == EXECUTION_SUCCESS_TOPIC else "FAILED"
+        print(f"🔗 On-chain execution {outcome} for safeTxHash {safe_tx_hash}")
+        return True
+
+    if topic0 == SAFE_MULTISIG_TX_TOPIC:
+        nonce = _multisig_tx_nonce(log)
+        if nonce is None or nonce in executed_nonces:
+            return False
+        executed_nonces.add(nonce)
+        if highest_executed_nonce is None or nonce > highest_executed_nonce:
+            highest_executed_nonce = nonce
+        print(f"🔗 On-chain execution seen for Safe nonce {nonce}")
+        return True
+
+    return False
+
+def poll_safe_events():
+    """
+    Pull Safe execution events from the last followed block up to the chain head and
+    update the local executed-state. Blocking; run it in a thread from the Discord loop.
+    Returns the number of newly recorded executions, or None if the RPC call failed.
+    """
+    global last_followed_block
+    if not SAFE_ADDRESS:
+        return None
+
+    try:
+        latest_block = web3.eth.block_number
+        from_block = latest_block - SAFE_EVENT_LOOKBACK if last_followed_block is None else last_followed_block + 1
+        if from_block > latest_block:
+            return 0
+
+        new_executions = 0
+        while from_block <= latest_block:
+            to_block = min(from_block + SAFE_EVENT_MAX_RANGE - 1, latest_block)
+            logs = web3.eth.get_logs({
+                "address": Web3.to_checksum_address(SAFE_ADDRESS),
+                "fromBlock": from_block,
+                "toBlock": to_block,
+                "topics": [[EXECUTION_SUCCESS_TOPIC, EXECUTION_FAILURE_TOPIC, SAFE_MULTISIG_TX_TOPIC]],
+            })
+            for log in logs:
+                if _record_log(log):
+                    new_executions += 1
+            last_followed_block = to_block
+            from_block = to_block + 1
+
+        return new_executions
+    except Exception as e:
+        print(f"Error following Safe events: {e}")
+        return None
+
+def is_executed_on_chain(tx):
+    """True if the chain has already executed this Safe API transaction, even if the API hasn't caught up."""
+    safe_tx_hash = (tx.get("safeTxHash") or "").lower()
+    if safe_tx_hash and safe_tx_hash in executed_safe_tx_hashes:
+        return True
+    nonce = tx.get("nonce")
+    if nonce is None:
+        return False
+    return nonce in executed_nonces or (highest_executed_nonce is not None and nonce <= highest_executed_nonce)
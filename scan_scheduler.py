@@ -0,0 +1,112 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+SCAN_CONCURRENCY = int(os.getenv("SCAN_CONCURRENCY", "4"))  # Max block ranges in flight at once
+INITIAL_CHUNK = 25_000  # Blocks per range to start with
+MIN_CHUNK = 3_125  # Minimum chunk size before a failing range is given up on
+MAX_CHUNK = 200_000  # Never grow ranges beyond this
+ADDITIVE_STEP = 5_000  # Chunk growth per successful range (additive increase)
+DECREASE_FACTOR = 2  # Chunk shrink divisor per failed range (multiplicative decrease)
+RETRY_LIMIT = 2  # Failures tolerated for a range already at MIN_CHUNK
+RETRY_COOLDOWN = 5  # Seconds slept before re-fetching a failed range (x attempt number)
+
+class ScanCancelled(Exception):
+    """Raised from a `progress` callback to abandon a scan (e.g. a cancelled background job)."""
+
+def _fetch_with_cooldown(fetch_range, start, end, attempt):
+    """Worker body: back off before retries so a struggling API gets room to recover."""
+    if attempt:
+        time.sleep(RETRY_COOLDOWN * attempt)
+    return fetch_range(start, end)
+
+def scan_block_range(from_block, to_block, fetch_range, concurrency=SCAN_CONCURRENCY,
+                     initial_chunk=INITIAL_CHUNK, min_chunk=MIN_CHUNK, max_chunk=MAX_CHUNK, progress=None):
+    """
+    Fetch [from_block, to_block] as disjoint ranges, up to `concurrency` at a time.
+
+    `fetch_range(start, end)` must return a list of logs, or None on failure. The chunk size grows by
+    ADDITIVE_STEP after every success and is divided by DECREASE_FACTOR after every failure (AIMD);
+    failed ranges are re-queued at the new size. `progress(blocks_done, blocks_total)` is called after
+    each completed range and may raise ScanCancelled to stop the scan. Blocking; run it in a thread from the Discord loop.
+
+    Returns (logs, complete): logs from every successful range reassembled in block order, and
+    False for `complete` if some range still failed at the minimum chunk size.
+    """
+    if from_block > to_block:
+        return [], True
+
+    total_blocks = to_block - from_block + 1
+    done_blocks = 0
+    chunk = max(min(initial_chunk, max_chunk), min_chunk)
+    next_start = from_block
+    retry_queue = []  # (start, end, attempt)
+    results = {}  # range start -> logs
+    in_flight = {}  # future -> (start, end, attempt)
+    complete = True
+
+    with ThreadPoolExecutor(max_workers=max(concurrency, 1)) as pool:
+        while next_start <= to_block or retry_queue or in_flight:
+            # Top up the pool: failed ranges first, then fresh ranges at the current chunk size.
+            while len(in_flight) < max(concurrency, 1) and complete and (retry_queue or next_start <= to_block):
+                if retry_queue:
+                    start, end, attempt = retry_queue.pop(0)
+                    if end - start + 1 > chunk:
+                        # Re-split the failed range at the shrunken size; the tail waits its turn.
+                        retry_queue.insert(0, (start + chunk, end, attempt))
+                        end = start + chunk - 1
+                else:
+                    start, end, attempt = next_start, min(next_start + chunk - 1, to_block), 0
+                    next_start = end + 1
+                print(f"🔄 Querying blocks {start} to {end} (Chunk size: {chunk}, in flight: {len(in_flight) + 1})")
+                future = pool.submit(_fetch_with_cooldown, fetch_range, start, end, attempt)
+                in_flight[future] = (start, end, attempt)
+
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start, end, attempt = in_flight.pop(future)
+                try:
+                    logs = future.result()
+                except Exception as e:
+                    print(f"❌ Range {start}-{end} raised: {e}")
+                    logs = None
+
+                if logs is not None:
+                    results[start] = logs
+                    done_blocks += end - start + 1
+                    chunk = min(chunk + ADDITIVE_STEP, max_chunk)
+                    print(f"✅ Retrieved {len(logs)} logs from blocks {start} to {end}.")
+                    if progress:
+                        try:
+                            progress(done_blocks, total_blocks)
+                        except ScanCancelled:
+                            raise
+                        except Exception as e:
+                            print(f"Error reporting scan progress: {e}")
+                    continue
+
+                chunk = max(chunk // DECREASE_FACTOR, min_chunk)
+                attempt += 1
+                if end - start + 1 <= min_chunk and attempt > RETRY_LIMIT:
+                    print(f"🚨 ERROR: Blocks {start} to {end} failed {attempt} times at minimal chunk size.")
+                    complete = False
+                    continue
+                print(f"⚠️ Blocks {start} to {end} failed (attempt {attempt}). Reducing chunk size to {chunk} and retrying.")
+                retry_queue.append((start, end, attempt))
+
+            if not complete:
+                # Stop handing out work; let in-flight ranges drain so their results are kept.
+                retry_queue.clear()
+                next_start = to_block + 1
+
+    logs = []
+    for start in sorted(results):
+        logs.extend(results[start])
+    return logs, complete
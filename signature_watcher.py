@@ -0,0 +1,85 @@
+import os
+import threading
+from dotenv import load_dotenv
+from http_transport import get_json_conditional
+
+# Load environment variables
+load_dotenv()
+
+BASE_URL = os.getenv("BASE_URL")
+SIGNATURE_WATCH_ENABLED = os.getenv("SIGNATURE_WATCH_ENABLED", "true").lower() in ("1", "true", "yes")
+SIGNATURE_POLL_INTERVAL = int(os.getenv("SIGNATURE_POLL_INTERVAL", "3"))  # Seconds between confirmation polls
+
+class SignatureWatcher:
+    """
+    Watches the confirmations of the one transaction that can execute next (the lowest pending nonce) so it can
+    be handed to execution seconds after its last signature, instead of at the next recheck.
+    Each poll is a conditional GET of that single transaction, so while nobody signs it costs a bodiless 304.
+    The target and its threshold come from the recheck's snapshot via watch(); nothing else is re-fetched.
+    """
+
+    def __init__(self, base_url=BASE_URL):
+        self.base_url = base_url
+        self.target = None  # {"safe_tx_hash", "nonce", "amount", "signature_count", "confirmations_required"}
+        self.validators = {}  # ETag / Last-Modified of the target's last response
+        self.polls = 0
+        self.unchanged = 0
+        self._lock = threading.Lock()  # poll() runs in a worker thread, watch() on the event loop
+
+    def watch(self, tx, amount=0.0):
+        """
+        Point the watcher at `tx` (a Safe API transaction with signature_count / confirmations_required),
+        or stop watching with None. Transactions that already have enough signatures aren't watched.
+        """
+        with self._lock:
+            if tx is None or not tx.get("safeTxHash") or tx["signature_count"] >= tx["confirmations_required"]:
+                self.target = None
+                return
+            if self.target is None or self.target["safe_tx_hash"] != tx["safeTxHash"]:
+                self.validators = {}
+                print(f"✍️ Watching nonce {tx['nonce']} for signatures "
+                      f"({tx['signature_count']}/{tx['confirmations_required']}).")
+            self.target = {
+                "safe_tx_hash": tx["safeTxHash"],
+                "nonce": tx["nonce"],
+                "amount": amount,
+                "signature_count": tx["signature_count"],
+                "confirmations_required": tx["confirmations_required"],
+            }
+
+    def poll(self):
+        """
+        Check the watched transaction once. Blocking; run it in a thread from the Discord loop.
+        Returns the target dict when it has just reached its threshold (it is then no longer watched), else None.
+        """
+        with self._lock:
+            target, validators = self.target, self.validators
+        if target is None:
+            return None
+
+        url = f"{self.base_url}/api/v1/multisig-transactions/{target['safe_tx_hash']}/"
+        status, data, validators = get_json_conditional(
+            url, validators, timeout=5, max_attempts=2, budget_seconds=8, label="Gnosis API (signatures)"
+        )
+        self.polls += 1
+        if status == "unchanged":
+            self.unchanged += 1
+        if status != "changed":
+            return None
+
+        with self._lock:
+            if self.target is not target:  # A recheck re-pointed the watcher while we were polling
+                return None
+            self.validators = validators
+            if data.get("isExecuted"):
+                self.target = None
+                return None
+            signature_count = len(data.get("confirmations") or [])
+            if signature_count < target["confirmations_required"]:
+                if signature_count != target["signature_count"]:
+                    print(f"✍️ Nonce {target['nonce']} now has {signature_count}/{target['confirmations_required']} signatures.")
+                target["signature_count"] = signature_count
+                return None
+            self.target = None
+        print(f"✅ Nonce {target['nonce']} reached {signature_count}/{target['confirmations_required']} signatures.")
+        return dict(target, signature_count=signature_count)
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from decimal import Decimal
+from fetch_transactions import fetch_recent_transactions
+from staking_contract import get_staking_balance, get_block_number
+
+REPORT_MAX_STALENESS = 30  # Seconds; !report can show a snapshot this old
+EXECUTION_MAX_STALENESS = 5  # Seconds; execution decisions need a near-live view
+
+class SnapshotCache:
+    """
+    Shared view of the staking balance and the Safe queue. Concurrent callers are coalesced onto one
+    in-flight fetch (single flight), and callers that can tolerate `max_age` seconds of staleness
+    are served from the last snapshot without any upstream call.
+    Snapshots are dicts: staking_balance, transactions, block_number, fetched_at, age.
+    `on_change(reason)` is called when a fetch sees the balance or the queue (nonces, confirmations) change;
+    `on_snapshot(snapshot)` after every fetch whose balance or queue differs from the previous fetch (or is the first).
+    """
+
+    def __init__(self, on_change=None, on_snapshot=None):
+        self.on_change = on_change
+        self.on_snapshot = on_snapshot
+        self._fingerprints = None  # (balance, queue) as of the previous fetch
+        self._snapshot = None
+        self._inflight = None  # asyncio.Task of the fetch currently running, if any
+        self._generation = 0  # Bumped by invalidate() so fetches started before it aren't cached
+        self.fetches = 0
+        self.coalesced = 0
+
+    async def _fetch_balance(self):
+        # Pin the balance to a block so the snapshot says exactly what it saw
+        block_number = await asyncio.to_thread(get_block_number)
+        staking_balance = await asyncio.to_thread(
+            get_staking_balance, block_number if block_number is not None else "latest"
+        )
+        return block_number, staking_balance
+
+    async def _fetch(self):
+        generation = self._generation
+        # The chain reads and the Safe API call don't depend on each other: the fetch takes as long as the slower one
+        (block_number, staking_balance), transactions = await asyncio.gather(
+            self._fetch_balance(),
+            asyncio.to_thread(fetch_recent_transactions),
+        )
+        self.fetches += 1
+        snapshot = {
+            "staking_balance": staking_balance,
+            "transactions": transactions,
+            "block_number": block_number,
+            "fetched_at": time.time(),
+        }
+        if generation == self._generation:
+            self._snapshot = snapshot
+        self._notify_changes(staking_balance, transactions, snapshot)
+        return snapshot
+
+    def _notify_changes(self, staking_balance, transactions, snapshot):
+        """Compare against the previous fetch and report balance / queue changes to on_change and on_snapshot."""
+        queue = tuple(sorted(
+            (tx.get("nonce"), tx.get("signature_count", 0), bool(tx.get("isExecuted"))) for tx in transactions or []
+        ))
+        fingerprints = (staking_balance, queue)
+        previous, self._fingerprints = self._fingerprints, fingerprints
+        if self.on_snapshot is not None and fingerprints != previous and staking_balance is not None and transactions:
+            self.on_snapshot(snapshot)
+        if previous is None or self.on_change is None:
+            return
+        if transactions and queue != previous[1]:
+            self.on_change("queue change")
+        if staking_balance is not None and staking_balance != previous[0]:
+            self.on_change("balance change")
+
+    async def get(self, max_age=REPORT_MAX_STALENESS):
+        """
+        A snapshot no older than `max_age` seconds. max_age=0 always waits for a fetch, but joins one
+        that is already running rather than starting another.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and max_age > 0 and time.time() - snapshot["fetched_at"] <= max_age:
+            return dict(snapshot, age=time.time() - snapshot["fetched_at"])
+
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._fetch())
+        else:
+            self.coalesced += 1
+        # Shield so one caller being cancelled doesn't cancel the fetch everyone else is waiting on
+        snapshot = await asyncio.shield(self._inflight)
+        return dict(snapshot, age=time.time() - snapshot["fetched_at"])
+
+    def latest(self):
+        """The last cached snapshot however old it is (with its age), or None. For reports when a fetch is late."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        return dict(snapshot, age=time.time() - snapshot["fetched_at"])
+
+    def warm(self):
+        """
+        The snapshot restored from before a restart (see restore), with its age, until the first live fetch
+        completes; None after that or if nothing was restored. Lets the first report go out without waiting upstream.
+        """
+        if self.fetches or self._snapshot is None:
+            return None
+        return self.latest()
+
+    def restore(self, snapshot):
+        """Seed the cache with a snapshot saved before a restart. Its fetched_at is kept, so get() still refreshes it."""
+        if snapshot and snapshot.get("fetched_at") and "transactions" in snapshot:
+            self._snapshot = {key: snapshot.get(key) for key in ("staking_balance", "transactions", "block_number", "fetched_at")}
+            if self._snapshot["staking_balance"] is not None:
+                # Saved as a float (JSON has no Decimal); fetches return a Decimal, so restore one
+                self._snapshot["staking_balance"] = Decimal(str(self._snapshot["staking_balance"]))
+
+    def invalidate(self):
+        """Forget the cached snapshot (e.g. after an execution changed the balance and the queue)."""
+        self._generation += 1
+        self._snapshot = None
+        self._inflight = None  # Later callers start a fresh fetch; current waiters still get theirs
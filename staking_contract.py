@@ -14,11 +14,19 @@ web3 = Web3(Web3.HTTPProvider(SONIC_RPC_URL))
 if not web3.is_connected():
     raise ConnectionError("Unable to connect to the Sonic blockchain. Check the SONIC_RPC_URL.")
 
-def get_staking_balance():
-    """Fetch the S token balance (native token) of the staking contract."""
+def get_block_number():
+    """Current block number from the Sonic RPC, or None on failure."""
+    try:
+        return web3.eth.block_number
+    except Exception as e:
+        print(f"Error fetching block number: {e}")
+        return None
+
+def get_staking_balance(block_identifier="latest"):
+    """Fetch the S token balance (native token) of the staking contract, optionally as of a given block."""
     try:
         # Query the native token balance of the staking contract
-        balance_wei = web3.eth.get_balance(web3.to_checksum_address(STAKING_CONTRACT_ADDRESS))
+        balance_wei = web3.eth.get_balance(web3.to_checksum_address(STAKING_CONTRACT_ADDRESS), block_identifier)
         
         # Convert from Wei to human-readable S tokens (18 decimals)
         balance_tokens = web3.from_wei(balance_wei, 'ether')
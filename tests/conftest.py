@@ -0,0 +1,19 @@
+import os
+import sys
+
+# Modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def index_db(tmp_path, monkeypatch):
+    """A fresh deposit index in tmp_path, with the block resolver's anchors cleared."""
+    import block_resolver
+    import deposit_index
+    monkeypatch.setattr(deposit_index, "DEPOSIT_INDEX_FILE", str(tmp_path / "deposit_index.db"))
+    monkeypatch.setattr(deposit_index, "_migrated", False)
+    monkeypatch.setattr(block_resolver, "_anchor_times", [])
+    monkeypatch.setattr(block_resolver, "_anchor_blocks", [])
+    return deposit_index
@@ -0,0 +1,66 @@
+import json
+import time
+from decimal import Decimal
+
+from bot_state import load_state, save_state
+
+
+def test_state_round_trips_with_decimal_balance(tmp_path):
+    path = str(tmp_path / "bot_state.json")
+    snapshot = {
+        "staking_balance": Decimal("1234567.891"),
+        "transactions": [{"nonce": 7, "signature_count": 2, "confirmations_required": 3}],
+        "block_number": 12345,
+        "fetched_at": time.time(),
+        "age": 0.5,
+    }
+    save_state({
+        "paused": True,
+        "pause_reason": "large deposit alert",
+        "last_daily_report_date": "2026-10-19",
+        "snapshot": snapshot,
+        "decode_cache": {"0xabc": {"validatorId": "5", "amountInTokens": "10000.0"}},
+    }, path)
+
+    state = load_state(path)
+    assert state["paused"] is True
+    assert state["pause_reason"] == "large deposit alert"
+    assert state["last_daily_report_date"] == "2026-10-19"
+    assert state["snapshot"]["staking_balance"] == 1234567.891
+    assert state["snapshot"]["transactions"][0]["nonce"] == 7
+    assert state["decode_cache"]["0xabc"]["validatorId"] == "5"
+
+
+def test_later_changes_overwrite_the_file(tmp_path):
+    path = str(tmp_path / "bot_state.json")
+    save_state({"paused": False, "snapshot": {"staking_balance": Decimal("1")}}, path)
+    save_state({"paused": True, "pause_reason": "large deposit alert", "snapshot": {"staking_balance": Decimal("2")}}, path)
+    state = load_state(path)
+    assert state["paused"] is True
+    assert state["snapshot"]["staking_balance"] == 2.0
+
+
+def test_old_or_unreadable_state_starts_cold(tmp_path):
+    path = tmp_path / "bot_state.json"
+    path.write_text(json.dumps({"paused": False, "saved_at": time.time() - 10}))
+    assert load_state(str(path), max_age=5) == {}
+    path.write_text("{not json")
+    assert load_state(str(path)) == {}
+    assert load_state(str(tmp_path / "missing.json")) == {}
+
+
+def test_restored_snapshot_balance_is_a_decimal_again(tmp_path, monkeypatch):
+    import sys
+    import types
+    monkeypatch.setitem(sys.modules, "fetch_transactions", types.SimpleNamespace(fetch_recent_transactions=None))
+    monkeypatch.setitem(sys.modules, "staking_contract",
+                        types.SimpleNamespace(get_staking_balance=None, get_block_number=None))
+    monkeypatch.delitem(sys.modules, "snapshot_cache", raising=False)
+    from snapshot_cache import SnapshotCache
+
+    path = str(tmp_path / "bot_state.json")
+    save_state({"snapshot": {"staking_balance": Decimal("250000.5"), "transactions": [],
+                             "block_number": 1, "fetched_at": time.time()}}, path)
+    cache = SnapshotCache()
+    cache.restore(load_state(path)["snapshot"])
+    assert cache.latest()["staking_balance"] == Decimal("250000.5")
@@ -0,0 +1,67 @@
+import asyncio
+
+from broadcast_queue import BroadcastQueue
+
+
+class FakeChannel:
+    def __init__(self, channel_id, failures=0):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.failures = failures  # Sends that fail before the channel starts accepting
+        self.sent = []
+
+    async def send(self, message):
+        await asyncio.sleep(0)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("503 Service Unavailable")
+        self.sent.append(message)
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_duplicate_is_merged_only_after_it_was_delivered():
+    channels = [FakeChannel(1), FakeChannel(2)]
+    queue = BroadcastQueue(lambda: channels)
+
+    async def scenario():
+        assert await queue.broadcast("alert") == 2
+        assert await queue.broadcast("alert") == 0
+    run(scenario())
+    assert [channel.sent for channel in channels] == [["alert"], ["alert"]]
+    assert queue.merged == 1
+
+
+def test_failed_broadcast_can_be_retried():
+    channel = FakeChannel(1, failures=1)
+    queue = BroadcastQueue(lambda: [channel])
+
+    async def scenario():
+        assert await queue.broadcast("alert") == 0
+        assert await queue.broadcast("alert") == 1
+    run(scenario())
+    assert channel.sent == ["alert"]
+    assert queue.merged == 0
+
+
+def test_parts_are_not_deduplicated_across_messages():
+    channel = FakeChannel(1)
+    queue = BroadcastQueue(lambda: [channel])
+
+    async def scenario():
+        await queue.broadcast("report A\n```", parts=["report A", "```"])
+        await queue.broadcast("report B\n```", parts=["report B", "```"])
+    run(scenario())
+    assert channel.sent == ["report A", "```", "report B", "```"]
+
+
+def test_concurrent_duplicate_waits_for_the_first_copy():
+    channel = FakeChannel(1)
+    queue = BroadcastQueue(lambda: [channel])
+
+    async def scenario():
+        return await asyncio.gather(queue.broadcast("alert"), queue.broadcast("alert"))
+    assert run(scenario()) == [1, 0]
+    assert channel.sent == ["alert"]
@@ -0,0 +1,51 @@
+import pytest
+
+import checkpoints
+
+
+@pytest.fixture
+def cursors(tmp_path, monkeypatch):
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_FILE", str(tmp_path / "checkpoints.json"))
+    monkeypatch.setattr(checkpoints, "LEGACY_CHECKPOINT_FILE", str(tmp_path / "last_scanned_block.json"))
+    monkeypatch.setattr(checkpoints, "_cursors", None)
+    monkeypatch.setattr(checkpoints, "_reorg_checks", {})
+    return checkpoints
+
+
+def test_block_hash_is_only_checked_every_few_calls(cursors):
+    chain = {}
+    lookups = []
+
+    def block_hash(block):
+        lookups.append(block)
+        return chain.get(block)
+
+    for block in range(100, 110):
+        chain[block] = f"0x{block:x}"
+        cursors.set_cursor("deposits", block, chain[block])
+        assert cursors.resume_block("deposits", block_hash, check_every=4) == block + 1
+    assert lookups == [100, 104, 108]
+
+
+def test_reorg_rewinds_from_the_last_verified_block(cursors):
+    chain = {block: f"0x{block:x}" for block in range(100, 120)}
+    rewound = []
+    cursors.set_cursor("deposits", 100, chain[100])
+    assert cursors.resume_block("deposits", chain.get, reorg_depth=5, check_every=4) == 101
+
+    for block in (103, 106, 109):
+        cursors.set_cursor("deposits", block, chain[block])
+        cursors.resume_block("deposits", chain.get, reorg_depth=5, on_reorg=rewound.append, check_every=4)
+    cursors.set_cursor("deposits", 112, chain[112])
+    chain.update({block: f"0xfork{block:x}" for block in range(102, 120)})
+
+    assert cursors.resume_block("deposits", chain.get, reorg_depth=5, on_reorg=rewound.append, check_every=4) == 96
+    assert rewound == [96]
+
+
+def test_failed_lookup_is_retried_next_call(cursors):
+    calls = []
+    cursors.set_cursor("deposits", 100, "0x64")
+    assert cursors.resume_block("deposits", lambda block: calls.append(block), check_every=4) == 101
+    assert cursors.resume_block("deposits", lambda block: calls.append(block) or "0x64", check_every=4) == 101
+    assert calls == [100, 100]
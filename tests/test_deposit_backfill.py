@@ -0,0 +1,68 @@
+import pytest
+
+import checkpoints
+import deposit_backfill
+from deposit_backfill import BACKFILL_STREAM, backfill_step
+
+
+@pytest.fixture
+def backfill(index_db, tmp_path, monkeypatch):
+    """backfill_step over contract history 1000-1299, with a scripted rate-limit budget; returns (fetches, budget)."""
+    monkeypatch.setattr(checkpoints, "CHECKPOINT_FILE", str(tmp_path / "checkpoints.json"))
+    monkeypatch.setattr(checkpoints, "_cursors", None)
+    monkeypatch.setattr(deposit_backfill, "_span", 100)
+    monkeypatch.setattr(deposit_backfill, "_target_block", None)
+    monkeypatch.setattr(deposit_backfill, "BACKFILL_MAX_RANGE", 100)
+    monkeypatch.setattr(deposit_backfill, "get_contract_deploy_block", lambda: 1000)
+    monkeypatch.setattr(deposit_backfill, "get_latest_block", lambda: 1299)
+    monkeypatch.setattr(deposit_backfill, "log_backend_url", lambda: "https://logs.invalid")
+    fetches, budget = [], [1.0]
+    monkeypatch.setattr(deposit_backfill, "fetch_deposit_logs", lambda start, end: fetches.append((start, end)) or [])
+    monkeypatch.setattr(deposit_backfill, "rate_limit_headroom", lambda url: budget[0])
+    return fetches, budget
+
+
+def test_backfill_resumes_from_its_cursor(backfill):
+    fetches, _ = backfill
+    checkpoints.set_cursor(BACKFILL_STREAM, 1099)  # A previous process got this far
+
+    assert backfill_step() == "progress"
+    assert backfill_step() == "done"
+    assert fetches == [(1100, 1199), (1200, 1299)]
+    assert checkpoints.get_cursor(BACKFILL_STREAM)["block"] == 1299
+    assert backfill_step() == "done"
+    assert len(fetches) == 2
+
+
+def test_backfill_yields_without_skipping_and_skips_covered_blocks(backfill, index_db):
+    fetches, budget = backfill
+    assert index_db.record_deposits([], 1040, 1059)  # Already indexed by the live watcher
+
+    budget[0] = 0.1
+    assert backfill_step() == "yielded"  # Not even the head is read while the budget is tight
+    assert fetches == [] and checkpoints.get_cursor(BACKFILL_STREAM) is None
+
+    budget[0] = 1.0
+    assert backfill_step() == "progress"
+    assert fetches == [(1000, 1039), (1060, 1099)]
+    assert checkpoints.get_cursor(BACKFILL_STREAM)["block"] == 1099
+
+
+def test_backfill_yielding_between_gaps_resumes_at_the_next_gap(backfill, index_db, monkeypatch):
+    fetches, budget = backfill
+    assert index_db.record_deposits([], 1040, 1059)
+
+    def fetch_then_run_low(start, end):
+        fetches.append((start, end))
+        budget[0] = 0.1  # The live watcher used the budget meanwhile
+        return []
+
+    monkeypatch.setattr(deposit_backfill, "fetch_deposit_logs", fetch_then_run_low)
+    assert backfill_step() == "yielded"
+    assert fetches == [(1000, 1039)]
+    assert checkpoints.get_cursor(BACKFILL_STREAM) is None  # The cursor never moves past an unfetched gap
+
+    budget[0] = 1.0
+    assert backfill_step() == "progress"
+    assert fetches == [(1000, 1039), (1060, 1099)]  # The fetched gap is covered now, so it's skipped
+    assert checkpoints.get_cursor(BACKFILL_STREAM)["block"] == 1099
@@ -0,0 +1,48 @@
+import random
+
+import block_resolver
+from deposit_batch import DepositStats, HOUR_CHUNK_ROWS
+
+SENDERS = ["0x" + f"{n:02x}" * 20 for n in range(1, 9)]
+
+
+def test_streamed_statistics_match_the_window(monkeypatch):
+    monkeypatch.setattr(block_resolver, "_anchor_times", [3600 * 300, 3600 * 310])
+    monkeypatch.setattr(block_resolver, "_anchor_blocks", [0, 36_000])
+    rng = random.Random(7)
+    rows = [(block, rng.choice(SENDERS), rng.uniform(1, 50_000)) for block in range(0, 36_000, 3)]
+
+    stats = DepositStats()
+    for row in rows:
+        stats.add(*row)
+
+    amounts = sorted(amount for _, _, amount in rows)
+    assert len(stats) == len(rows) > HOUR_CHUNK_ROWS
+    assert abs(stats.total - sum(amounts)) < 1e-3
+    assert stats.max == amounts[-1]
+    for p, value in stats.percentiles().items():
+        exact = amounts[round((len(amounts) - 1) * p / 100)]
+        assert abs(value - exact) / exact < 0.02
+
+    hours = stats.per_hour()
+    assert len(hours) == 10
+    assert sum(count for _, count, _ in hours) == len(rows)
+
+    totals = {}
+    for _, sender, amount in rows:
+        totals[sender] = totals.get(sender, 0.0) + amount
+    expected = sorted(totals, key=totals.get, reverse=True)[:5]
+    assert [sender for sender, _, _ in stats.top_depositors()] == expected
+    assert "Top depositors" in stats.summary_text()
+
+
+def test_without_block_anchors_the_hourly_line_is_left_out(monkeypatch):
+    monkeypatch.setattr(block_resolver, "_anchor_times", [])
+    monkeypatch.setattr(block_resolver, "_anchor_blocks", [])
+    stats = DepositStats()
+    stats.add(10, SENDERS[0], 5.0)
+    stats.add(11, SENDERS[1], 0.0)
+    assert stats.per_hour() == []
+    assert stats.percentiles()[50] == 0.0
+    assert "Active hours" not in stats.summary_text()
+    assert DepositStats().summary_text().endswith("no deposits in this window.")
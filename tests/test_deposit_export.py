@@ -0,0 +1,36 @@
+import io
+import os
+
+import pytest
+
+import deposit_export
+
+
+def rows(count):
+    total = 0.0
+    for n in range(count):
+        amount = 1 + n % 977
+        total += amount
+        yield {
+            "block_number": n,
+            "tx_hash": "0x" + os.urandom(32).hex(),  # Random hashes barely compress, like real ones
+            "sender": "0x" + os.urandom(20).hex(),
+            "amount": float(amount),
+            "running_total": total,
+        }
+
+
+def test_parquet_parts_stay_under_the_limit():
+    max_bytes = 1024 * 1024
+    pq = pytest.importorskip("pyarrow.parquet")
+    parts = list(deposit_export.iter_parquet_parts(rows(60_000), max_bytes=max_bytes))
+    assert len(parts) > 1
+    assert all(len(data) <= max_bytes for _, data in parts)
+    assert sum(pq.read_table(io.BytesIO(data)).num_rows for _, data in parts) == 60_000
+
+
+def test_csv_parts_stay_under_the_limit():
+    max_bytes = 1024 * 1024
+    parts = list(deposit_export.iter_csv_gz_parts(rows(60_000), max_bytes=max_bytes))
+    assert len(parts) > 1
+    assert all(len(data) <= max_bytes for _, data in parts)
@@ -0,0 +1,131 @@
+import block_resolver
+
+DAY = 86400
+NOW = 1_760_000_000 // DAY * DAY
+SENDER = "0x" + "ab" * 20
+
+
+def deposit_log(block, amount, log_index=0, timestamp=None, sender=SENDER):
+    """A raw Deposit log in RPC shape (no timestamp unless given)."""
+    log = {
+        "blockNumber": hex(block),
+        "logIndex": hex(log_index),
+        "transactionHash": f"0x{block:064x}",
+        "topics": ["0xtopic", "0x" + "0" * 24 + sender[2:]],
+        "data": "0x" + f"{int(amount * 10**18):064x}" + f"{int(amount * 10**18):064x}",
+    }
+    if timestamp is not None:
+        log["timeStamp"] = hex(timestamp)
+    return log
+
+
+def fake_headers(monkeypatch, times, calls=None):
+    """Serve eth_getBlockByNumber from `times` ({block: timestamp}); other blocks are unavailable."""
+    def read_header(block):
+        if calls is not None:
+            calls.append(block)
+        if block not in times:
+            return None
+        block_resolver.add_anchor(times[block], block)
+        return times[block], block
+    monkeypatch.setattr(block_resolver, "SONIC_RPC_URL", "http://rpc.invalid")
+    monkeypatch.setattr(block_resolver, "_read_header", read_header)
+
+
+def day_total(index, day_start):
+    totals = index.rollup_totals(day_start, day_start + DAY)
+    return totals["count"], totals["total"]
+
+
+def test_rpc_logs_are_dated_from_block_headers(index_db, monkeypatch):
+    day = NOW - 3 * DAY
+    fake_headers(monkeypatch, {1000: day + 100})
+    assert index_db.record_deposits([deposit_log(1000, 5)], 1000, 1000)
+    assert day_total(index_db, day) == (1, 5.0)
+
+
+def test_undated_rows_wait_for_a_timestamp_instead_of_using_now(index_db, monkeypatch):
+    day = NOW - 3 * DAY
+    fake_headers(monkeypatch, {})
+    assert index_db.record_deposits([deposit_log(1000, 5)], 1000, 1000)
+    assert day_total(index_db, NOW // DAY * DAY) == (0, 0)
+    assert day_total(index_db, day) == (0, 0)
+
+    fake_headers(monkeypatch, {1000: day + 100})
+    assert index_db.compact_index(now=NOW, block_at=lambda timestamp: None) == 0
+    assert day_total(index_db, day) == (1, 5.0)
+
+
+def test_compaction_cutoff_is_a_block_number(index_db):
+    old_day = NOW - 100 * DAY
+    logs = [deposit_log(100, 1, timestamp=old_day), deposit_log(200, 2, timestamp=old_day + 60),
+            deposit_log(300, 3, timestamp=NOW - DAY)]
+    assert index_db.record_deposits(logs, 100, 300)
+
+    cutoffs = []
+    deleted = index_db.compact_index(now=NOW, block_at=lambda timestamp: cutoffs.append(timestamp) or 150)
+    assert cutoffs == [NOW - index_db.RAW_RETENTION_DAYS * DAY]
+    assert deleted == 1
+    assert index_db.compacted_through_block() == 150
+    assert [d["block_number"] for d in index_db.query_deposits(0, 1000)] == [200, 300]
+    assert day_total(index_db, old_day) == (2, 3.0)
+
+
+def test_rows_below_the_watermark_are_rolled_up_once(index_db):
+    old_day = NOW - 100 * DAY
+    assert index_db.record_deposits([deposit_log(100, 1, timestamp=old_day)], 100, 100)
+    index_db.compact_index(now=NOW, block_at=lambda timestamp: 500)
+    assert index_db.compacted_through_block() == 500
+
+    # Re-scanning a compacted block must not count its deposit a second time
+    assert index_db.record_deposits([deposit_log(100, 1, timestamp=old_day)], 100, 100)
+    assert day_total(index_db, old_day) == (1, 1.0)
+
+    # A block never scanned before still lands in the rollups, even below the watermark
+    assert index_db.record_deposits([deposit_log(300, 4, timestamp=old_day + 60)], 300, 300)
+    assert day_total(index_db, old_day) == (2, 5.0)
+
+
+def test_sender_totals_say_when_compaction_dropped_rows(index_db):
+    old_day = NOW - 100 * DAY
+    logs = [deposit_log(100, 1, timestamp=old_day), deposit_log(300, 2, timestamp=NOW - DAY)]
+    assert index_db.record_deposits(logs, 100, 300)
+
+    _, summary = index_db.query_sender_deposits(SENDER)
+    assert (summary["count"], summary["total"], summary["compacted_through_block"]) == (2, 3.0, None)
+
+    index_db.compact_index(now=NOW, block_at=lambda timestamp: 200)
+    _, summary = index_db.query_sender_deposits(SENDER)
+    assert (summary["count"], summary["total"], summary["compacted_through_block"]) == (1, 2.0, 200)
+    assert summary["first_day"] == old_day
+
+    _, other = index_db.query_sender_deposits("0x" + "cd" * 20)
+    assert other["compacted_through_block"] is None
+
+
+def test_daily_depositor_lists_are_folded_after_hourly_retention(index_db):
+    other = "0x" + "cd" * 20
+    old_day = NOW - (index_db.HOURLY_RETENTION_DAYS + 10) * DAY
+    logs = [deposit_log(100, 1, timestamp=old_day), deposit_log(101, 2, timestamp=old_day + 60, sender=other),
+            deposit_log(200, 3, timestamp=old_day + DAY), deposit_log(300, 4, timestamp=NOW - DAY)]
+    assert index_db.record_deposits(logs, 100, 300)
+    assert index_db.rollup_totals(old_day, old_day + 2 * DAY)["depositors"] == 2
+
+    index_db.compact_index(now=NOW, block_at=lambda timestamp: 250)
+    with index_db._connect() as conn:
+        assert conn.execute(
+            "SELECT COUNT(*) FROM rollup_depositors WHERE granularity = 'day' AND bucket_start < ?", (NOW - DAY,)
+        ).fetchone()[0] == 0
+    # The stored per-day counts stand in: SENDER deposited on both days, so it is counted twice
+    assert index_db.rollup_totals(old_day, old_day + 2 * DAY)["depositors"] == 3
+    assert index_db.rollup_totals(old_day, NOW)["depositors"] == 4
+
+    _, summary = index_db.query_sender_deposits(SENDER)
+    assert summary["first_day"] == old_day
+    assert summary["compacted_through_block"] == 250
+
+    # A late row for a folded day still reaches its counts
+    assert index_db.record_deposits([deposit_log(50, 5, timestamp=old_day + 120, sender="0x" + "ef" * 20)], 50, 50)
+    assert index_db.rollup_totals(old_day, old_day + DAY)["depositors"] == 3
+    _, late = index_db.query_sender_deposits("0x" + "ef" * 20)
+    assert late["first_day"] == old_day
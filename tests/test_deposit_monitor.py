@@ -0,0 +1,129 @@
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import deposit_monitor
+from deposit_monitor import WATCHED_TOPICS, DEPOSIT_EVENT_TOPIC, ETHERSCAN_MAX_LOGS
+
+
+def log(topic, block, index=0):
+    return {"topics": [topic], "blockNumber": hex(block), "logIndex": hex(index) if index else "0x",
+            "transactionHash": f"0x{block:064x}", "data": "0x"}
+
+
+@pytest.fixture
+def etherscan(monkeypatch):
+    """Fake getLogs: serves `chain` (topic -> logs) honouring topic0, the block range and the result cap."""
+    chain = {topic: [] for topic in WATCHED_TOPICS}
+    requests = []
+
+    def make_request(url):
+        query = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+        requests.append(query)
+        assert "topic0" in query, "getLogs must always be topic0-filtered"
+        low, high = int(query["fromBlock"]), int(query["toBlock"])
+        rows = [row for row in chain[query["topic0"]] if low <= int(row["blockNumber"], 16) <= high]
+        return {"result": rows[:ETHERSCAN_MAX_LOGS]}
+
+    monkeypatch.setattr(deposit_monitor, "DEPOSIT_LOG_BACKEND", "etherscan")
+    monkeypatch.setattr(deposit_monitor, "make_request", make_request)
+    return chain, requests
+
+
+def test_every_watched_event_is_fetched_with_its_own_topic_filter(etherscan):
+    chain, requests = etherscan
+    other = WATCHED_TOPICS[1]
+    chain[DEPOSIT_EVENT_TOPIC] = [log(DEPOSIT_EVENT_TOPIC, 105, 2)]
+    chain[other] = [log(other, 105, 1), log(other, 101)]
+
+    logs, scan_end = deposit_monitor.fetch_watched_logs(100, 110)
+    assert scan_end == 110
+    assert [(int(row["blockNumber"], 16), row["topics"][0]) for row in logs] == [
+        (101, other), (105, other), (105, DEPOSIT_EVENT_TOPIC)]
+    assert {query["topic0"] for query in requests} == set(WATCHED_TOPICS)
+
+
+def test_a_capped_topic_trims_every_topic_to_the_same_end(etherscan):
+    chain, _ = etherscan
+    other = WATCHED_TOPICS[-1]
+    chain[DEPOSIT_EVENT_TOPIC] = [log(DEPOSIT_EVENT_TOPIC, 100 + n // 100, n % 100 + 1) for n in range(ETHERSCAN_MAX_LOGS + 50)]
+    chain[other] = [log(other, 103), log(other, 109)]
+
+    logs, scan_end = deposit_monitor.fetch_watched_logs(100, 120)
+    assert scan_end == 108  # The capped page stopped inside block 109
+    assert max(int(row["blockNumber"], 16) for row in logs) == 108
+    assert sum(row["topics"][0] == other for row in logs) == 1  # Block 109's event is left for the next scan
+
+
+def test_cap_inside_a_single_block_fails_the_range(etherscan):
+    chain, _ = etherscan
+    chain[WATCHED_TOPICS[-1]] = [log(WATCHED_TOPICS[-1], 100, n + 1) for n in range(ETHERSCAN_MAX_LOGS + 1)]
+    assert deposit_monitor.fetch_watched_logs(100, 120) == (None, None)
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    """iter_deposits_indexed over a window the index already covers, with scans recorded instead of run."""
+    scans = []
+    monkeypatch.setattr(deposit_monitor, "compacted_through_block", lambda: None)
+    monkeypatch.setattr(deposit_monitor, "fill_index_gaps", lambda *args, **kwargs: True)
+    monkeypatch.setattr(deposit_monitor, "scan_block_range",
+                        lambda start, end, *args, **kwargs: scans.append((start, end)) or ([], True))
+    return scans
+
+
+def test_index_failure_before_the_first_row_falls_back_to_a_rescan(indexed, monkeypatch):
+    def unavailable(from_block, to_block):
+        raise OSError("unable to open database file")
+        yield
+
+    monkeypatch.setattr(deposit_monitor, "iter_deposits", unavailable)
+    assert list(deposit_monitor.iter_deposits_indexed(100, 200)) == []
+    assert indexed == [(100, 200)]
+
+
+def test_index_failure_mid_stream_raises_instead_of_repeating_rows(indexed, monkeypatch):
+    def interrupted(from_block, to_block):
+        yield {"block_number": 100}
+        yield {"block_number": 101}
+        raise OSError("disk I/O error")
+
+    monkeypatch.setattr(deposit_monitor, "iter_deposits", interrupted)
+    seen = []
+    with pytest.raises(OSError):
+        for deposit in deposit_monitor.iter_deposits_indexed(100, 200):
+            seen.append(deposit["block_number"])
+    assert seen == [100, 101]
+    assert indexed == []
+
+
+def test_compacted_range_is_streamed_slice_by_slice(indexed, monkeypatch, capsys):
+    monkeypatch.setattr(deposit_monitor, "STREAM_SCAN_BLOCKS", 10)
+    monkeypatch.setattr(deposit_monitor, "compacted_through_block", lambda: 124)
+    monkeypatch.setattr(deposit_monitor, "iter_deposits", lambda from_block, to_block: iter([{"block_number": 125}]))
+    monkeypatch.setattr(deposit_monitor, "decode_deposit_log", lambda log: log)
+
+    def scan(start, end, *args, **kwargs):
+        indexed.append((start, end))
+        return [{"block_number": start}], start != 110  # The middle slice loses a range
+
+    monkeypatch.setattr(deposit_monitor, "scan_block_range", scan)
+    deposits = deposit_monitor.iter_deposits_indexed(100, 130)
+    assert next(deposits) == {"block_number": 100}
+    assert indexed == [(100, 109)]  # Later slices aren't fetched until they're consumed
+    assert [deposit["block_number"] for deposit in deposits] == [110, 120, 125]
+    assert indexed == [(100, 109), (110, 119), (120, 124)]
+    assert "Export will be partial" in capsys.readouterr().out
+
+
+def test_monitor_scans_and_reports_only_confirmed_blocks(monkeypatch):
+    scans = []
+    monkeypatch.setattr(deposit_monitor, "DEPOSIT_CONFIRMATIONS", 2)
+    monkeypatch.setattr(deposit_monitor, "get_latest_block", lambda: 200)
+    monkeypatch.setattr(deposit_monitor, "fetch_watched_logs", lambda start, end: scans.append((start, end)) or ([], end))
+    monkeypatch.setattr(deposit_monitor, "record_deposits", lambda *args: True)
+
+    assert deposit_monitor.check_large_deposits_with_block(150) == (False, "message", 198)
+    assert scans == [(150, 198)]
+    assert deposit_monitor.check_large_deposits_with_block(199)[2] == 198  # Nothing confirmed yet: cursor stays
+    assert scans == [(150, 198)]
@@ -0,0 +1,64 @@
+import asyncio
+import random
+
+from deposit_batch import DepositStats
+from history_view import HistoryView, HISTORY_PAGE_SIZE, MAX_MESSAGE_CHARS, SORT_ORDERS
+
+
+def deposits(count):
+    rng = random.Random(3)
+    return [{
+        "block_number": 40_000_000 + n,
+        "sender": "0x" + rng.randbytes(20).hex(),
+        "tx_hash": "0x" + rng.randbytes(32).hex(),
+        "amount": rng.uniform(100_000, 9_999_999),
+    } for n in range(count)]
+
+
+def summary(rows):
+    stats = DepositStats()
+    for row in rows:
+        stats.add(row["block_number"], row["sender"], row["amount"])
+    return stats.summary_text()
+
+
+def balanced(text):
+    """Markdown links and bold markers are all closed."""
+    return text.count("[") == text.count("]") and text.count("(<") == text.count(">)") and text.count("**") % 2 == 0
+
+
+def test_full_pages_fit_and_keep_valid_markdown():
+    rows = deposits(40)
+    title = "🕒 **40 large deposits** (≥ 100,000 S) in the last 720 hours"
+
+    async def scenario():
+        view = HistoryView(rows, title, summary(rows))
+        shown = []
+        for sort in SORT_ORDERS:
+            view._sort(sort)
+            for page in range(view.page_count):
+                view.page = page
+                shown.append(view.render())
+        view.showing_summary = True
+        return view, shown, view.render()
+
+    view, pages, summary_page = asyncio.run(scenario())
+    assert sum(end - first for first, end in view.pages) == 40
+    assert all(end - first <= HISTORY_PAGE_SIZE for first, end in view.pages)
+    for text in pages + [summary_page]:
+        assert len(text) <= MAX_MESSAGE_CHARS
+        assert balanced(text)
+    assert summary_page.endswith(summary(rows).split("\n")[-1])  # The whole summary, nothing chopped
+
+
+def test_long_title_gets_fewer_lines_per_page():
+    rows = deposits(12)
+
+    async def scenario():
+        return HistoryView(rows, "🕒 " + "x" * 900, summary(rows))
+
+    view = asyncio.run(scenario())
+    assert len(view.pages) > 2
+    for page in range(view.page_count):
+        view.page = page
+        assert len(view.render()) <= MAX_MESSAGE_CHARS
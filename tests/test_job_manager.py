@@ -0,0 +1,116 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import job_manager
+from job_manager import JobManager
+from scan_scheduler import ScanCancelled
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+    async def edit(self, content=None):
+        self.content = content
+
+
+class FakeContext:
+    """The bits of a command context JobManager uses: author, channel and send()."""
+
+    def __init__(self, user_id, channel_id=1):
+        self.author = SimpleNamespace(id=user_id)
+        self.channel = SimpleNamespace(id=channel_id)
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        message = FakeMessage(content)
+        self.sent.append(message)
+        return message
+
+
+@pytest.fixture
+def quotas(monkeypatch):
+    monkeypatch.setattr(job_manager, "JOBS_MAX_RUNNING", 1)
+    monkeypatch.setattr(job_manager, "JOBS_MAX_PER_USER", 2)
+    monkeypatch.setattr(job_manager, "JOBS_MAX_TOTAL", 3)
+    monkeypatch.setattr(job_manager, "rate_limit_headroom", lambda url: 1.0)
+
+
+def blocking_work(release):
+    async def work(job):
+        while not release.is_set():
+            await asyncio.to_thread(job.checkpoint)  # Where a real scan checks for cancellation
+            await asyncio.sleep(0.01)
+    return work
+
+
+def test_quotas_refuse_jobs_over_the_per_user_and_global_caps(quotas):
+    async def scenario():
+        manager, release = JobManager(), asyncio.Event()
+        alice = FakeContext(1)
+        first = await manager.submit(alice, "history", 1, "!history 1", blocking_work(release))
+        second = await manager.submit(alice, "history", 2, "!history 2", blocking_work(release))
+        assert await manager.submit(alice, "history", 3, "!history 3", blocking_work(release)) is None
+        assert "You already have 2 jobs" in alice.sent[-1].content
+        third = await manager.submit(FakeContext(2), "history", 4, "!history 4", blocking_work(release))
+        assert await manager.submit(FakeContext(3), "history", 5, "!history 5", blocking_work(release)) is None
+
+        await asyncio.sleep(0.05)
+        assert [job.status for job in (first, second, third)] == ["running", "queued", "queued"]  # One slot
+        release.set()
+        await asyncio.gather(first.task, second.task, third.task)
+        assert [job.status for job in (first, second, third)] == ["done", "done", "done"]
+
+    asyncio.run(scenario())
+
+
+def test_identical_request_attaches_to_the_running_job(quotas):
+    async def scenario():
+        manager, release = JobManager(), asyncio.Event()
+        runs = []
+
+        async def work(job):
+            runs.append(job.id)
+            await release.wait()
+            await job.send(content="results")
+
+        here, there, again = FakeContext(1, channel_id=10), FakeContext(2, channel_id=20), FakeContext(3, channel_id=10)
+        job = await manager.submit(here, "history", 720, "!history 720", work)
+        assert await manager.submit(there, "history", 720, "!history 720", work) is job
+        assert await manager.submit(again, "history", 720, "!history 720", work) is job
+        release.set()
+        await job.task
+        return job, runs, here, there, again
+
+    job, runs, here, there, again = asyncio.run(scenario())
+    assert runs == [job.id]  # Scanned once
+    assert len(job.subscribers) == 2
+    assert here.sent[-1].content == "results" and there.sent[-1].content == "results"
+    assert "already job #1" in again.sent[-1].content  # Same channel: pointed at the existing job
+
+
+def test_cancel_stops_running_and_queued_jobs(quotas):
+    async def scenario():
+        manager, release = JobManager(), asyncio.Event()
+        running = await manager.submit(FakeContext(1), "history", 1, "!history 1", blocking_work(release))
+        queued = await manager.submit(FakeContext(2), "history", 2, "!history 2", blocking_work(release))
+        await asyncio.sleep(0.05)
+        assert manager.cancel(queued.id) is queued
+        assert manager.cancel(running.id) is running
+        await asyncio.gather(running.task, queued.task, return_exceptions=True)
+        return manager, running, queued
+
+    manager, running, queued = asyncio.run(scenario())
+    assert (running.status, queued.status) == ("cancelled", "cancelled")
+    assert manager.cancel(running.id) is None  # Already finished
+    assert manager.active_jobs() == []
+
+
+def test_checkpoint_raises_once_cancelled():
+    job = job_manager.Job(1, "history", 1, 1, "!history 1")
+    job.cancel_event.set()
+    with pytest.raises(ScanCancelled):
+        job.report_progress(10, 100)
+    assert job.progress == (10, 100)
@@ -0,0 +1,72 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import discord
+
+from live_status import LiveStatusBoard
+
+
+class FakeMessage:
+    def __init__(self, message_id, content):
+        self.id = message_id
+        self.content = content
+        self.deleted = False
+        self.edits = 0
+
+    async def edit(self, content=None):
+        if self.deleted:
+            raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+        self.content = content
+        self.edits += 1
+
+    async def pin(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, channel_id=1):
+        self.id = channel_id
+        self.name = f"channel-{channel_id}"
+        self.posted = []
+
+    async def send(self, content):
+        message = FakeMessage(100 + len(self.posted), content)
+        self.posted.append(message)
+        return message
+
+    async def fetch_message(self, message_id):
+        for message in self.posted:
+            if message.id == message_id:
+                return message
+        raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+
+
+def test_unchanged_rows_skip_the_edit(tmp_path):
+    board, channel = LiveStatusBoard(path=tmp_path / "live_status.json"), FakeChannel()
+
+    async def scenario():
+        first = await board.update_channel(channel, ["nonce 7: 2/3", "balance 10"])
+        assert await board.update_channel(channel, ["nonce 7: 2/3", "balance 10"]) is first
+        await board.update_channel(channel, ["nonce 7: 3/3", "balance 10"])
+        return first
+
+    message = asyncio.run(scenario())
+    assert len(channel.posted) == 1  # Posted once, then edited in place
+    assert (board.edits, board.skipped, message.edits) == (2, 1, 1)
+    assert message.content.startswith("nonce 7: 3/3")
+
+
+def test_deleted_status_message_is_reposted_and_remembered(tmp_path):
+    path = tmp_path / "live_status.json"
+    board, channel = LiveStatusBoard(path=path), FakeChannel()
+
+    async def scenario():
+        first = await board.update_channel(channel, ["row 1"])
+        first.deleted = True
+        return first, await board.update_channel(channel, ["row 2"])
+
+    first, second = asyncio.run(scenario())
+    assert second is not first and second.content.startswith("row 2")
+    assert json.loads(path.read_text()) == {"1": second.id}
+    assert LiveStatusBoard(path=path).message_ids == {1: second.id}  # Survives a restart
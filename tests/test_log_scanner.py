@@ -0,0 +1,35 @@
+import log_scanner
+from log_scanner import RangeTooLargeError
+
+
+def test_node_errors_are_retried_after_a_growing_cooldown(monkeypatch):
+    sleeps = []
+    answers = [RuntimeError("bad gateway"), RuntimeError("bad gateway"), [{"blockNumber": "0x1"}]]
+
+    def get_logs(address, topics, start, end, rpc_url=None):
+        answer = answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    monkeypatch.setattr(log_scanner, "get_logs", get_logs)
+    monkeypatch.setattr(log_scanner.time, "sleep", sleeps.append)
+    assert log_scanner.scan_logs_rpc("0xcontract", [], 1, 10) == [{"blockNumber": "0x1"}]
+    assert sleeps == [log_scanner.RPC_RETRY_COOLDOWN, 2 * log_scanner.RPC_RETRY_COOLDOWN]
+
+
+def test_range_errors_split_without_sleeping(monkeypatch):
+    sleeps = []
+    ranges = []
+
+    def get_logs(address, topics, start, end, rpc_url=None):
+        ranges.append((start, end))
+        if end - start + 1 > 4:
+            raise RangeTooLargeError("query returned more than 10000 results")
+        return []
+
+    monkeypatch.setattr(log_scanner, "get_logs", get_logs)
+    monkeypatch.setattr(log_scanner.time, "sleep", sleeps.append)
+    assert log_scanner.scan_logs_rpc("0xcontract", [], 1, 8, initial_range=8) == []
+    assert ranges[:3] == [(1, 8), (1, 4), (5, 8)]
+    assert sleeps == []
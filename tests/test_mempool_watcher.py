@@ -0,0 +1,136 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import mempool_watcher
+from mempool_watcher import MempoolWatcher, CONTRACT_ADDRESS, DEPOSIT_SELECTOR, DROPPED_AFTER_POLLS
+
+DEPOSITOR = "0x" + "ab" * 20
+
+
+class FakeNode:
+    """Just enough of a JSON-RPC node for the watcher: a pending-tx filter and eth_getTransactionByHash."""
+
+    def __init__(self):
+        self.hashes_only = False  # Refuse full-tx filters, like most public nodes
+        self.lookups = 0
+        self.txs = {}  # hash -> tx dict; blockNumber None while pending
+        self.unseen = []  # hashes the filter hasn't returned yet
+
+    def submit(self, tx_hash, amount, to=CONTRACT_ADDRESS, selector=DEPOSIT_SELECTOR):
+        self.txs[tx_hash] = {"hash": tx_hash, "from": DEPOSITOR, "to": to, "input": selector,
+                             "value": hex(int(amount * 10**18)), "blockNumber": None}
+        self.unseen.append(tx_hash)
+
+    def mine(self, tx_hash, block):
+        self.txs[tx_hash]["blockNumber"] = hex(block)
+
+    def drop(self, tx_hash):
+        del self.txs[tx_hash]
+
+    def answer(self, request):
+        method, params = request["method"], request["params"]
+        if method == "eth_newPendingTransactionFilter":
+            if params and self.hashes_only:
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32602, "message": "invalid params"}}
+            result = "0xf1"
+        elif method == "eth_getFilterChanges":
+            pending = [tx_hash for tx_hash in self.unseen if tx_hash in self.txs]
+            result = pending if self.hashes_only else [self.txs[tx_hash] for tx_hash in pending]
+            self.unseen = []
+        elif method == "eth_getTransactionByHash":
+            self.lookups += 1
+            result = self.txs.get(params[0])
+        else:
+            return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+        return {"jsonrpc": "2.0", "id": request["id"], "result": result}
+
+
+@pytest.fixture
+def node():
+    fake = FakeNode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            reply = [fake.answer(item) for item in body] if isinstance(body, list) else fake.answer(body)
+            data = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    fake.url = f"http://127.0.0.1:{server.server_port}"
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+def watcher_for(node):
+    watcher = MempoolWatcher(rpc_url=node.url, threshold=100_000, hold_seconds=180)
+    assert watcher.poll(now=0) == []  # First poll creates the filter
+    return watcher
+
+
+def test_hold_is_released_once_the_landed_deposit_is_scanned(node):
+    watcher = watcher_for(node)
+    node.submit("0xsmall", 5_000)
+    node.submit("0xother", 500_000, selector="0xa9059cbb")
+    node.submit("0xlarge", 250_000)
+
+    held = watcher.poll(now=1)
+    assert [hold["tx_hash"] for hold in held] == ["0xlarge"]
+    assert watcher.is_holding(now=1)
+
+    node.mine("0xlarge", 1_000)
+    assert watcher.poll(now=2) == []
+    assert watcher.release_landed(999) == []  # The block watcher hasn't reached the block yet
+    assert watcher.is_holding(now=2)
+    assert [hold["tx_hash"] for hold in watcher.release_landed(1_000)] == ["0xlarge"]
+    assert not watcher.is_holding(now=2)
+
+
+def test_hold_is_released_when_the_deposit_is_dropped(node):
+    watcher = watcher_for(node)
+    node.submit("0xlarge", 250_000)
+    assert len(watcher.poll(now=1)) == 1
+
+    node.drop("0xlarge")
+    for poll in range(DROPPED_AFTER_POLLS - 1):
+        watcher.poll(now=2 + poll)
+        assert watcher.is_holding(now=2 + poll)  # One missing lookup isn't enough
+    watcher.poll(now=10)
+    assert not watcher.is_holding(now=10)
+
+
+def test_hold_lapses_if_the_deposit_never_lands(node):
+    watcher = watcher_for(node)
+    node.submit("0xlarge", 250_000)
+    watcher.poll(now=1)
+    assert watcher.is_holding(now=100)
+    assert not watcher.is_holding(now=181)
+
+
+def test_hashes_over_the_lookup_cap_are_inspected_on_later_polls(node, monkeypatch):
+    monkeypatch.setattr(mempool_watcher, "MAX_LOOKUPS_PER_POLL", 3)
+    node.hashes_only = True
+    watcher = watcher_for(node)
+    for i in range(7):
+        node.submit(f"0xsmall{i}", 5_000)
+    node.submit("0xlarge", 250_000)  # Arrives last in a burst bigger than the cap
+
+    assert watcher.poll(now=1) == []
+    assert node.lookups == 3
+    assert watcher.poll(now=2) == []
+    held = watcher.poll(now=3)
+    assert [hold["tx_hash"] for hold in held] == ["0xlarge"]
+    assert node.lookups == 8  # Every hash looked up exactly once
+    assert watcher.backlog == []
@@ -0,0 +1,90 @@
+import asyncio
+
+import recheck_scheduler
+from recheck_scheduler import RecheckScheduler
+
+
+def test_a_burst_of_events_runs_one_recheck(monkeypatch):
+    monkeypatch.setattr(recheck_scheduler, "RECHECK_DEBOUNCE", 0.05)
+    monkeypatch.setattr(recheck_scheduler, "RECHECK_MIN_GAP", 0)
+    runs = []
+
+    async def recheck(reasons):
+        runs.append(dict(reasons))
+        return "state"
+
+    async def scenario():
+        scheduler = RecheckScheduler(recheck)
+        scheduler.start()
+        await asyncio.sleep(0.1)  # The startup recheck
+        for _ in range(3):
+            scheduler.trigger("contract flow")
+            await asyncio.sleep(0.01)
+        scheduler.trigger("queue change")
+        await asyncio.sleep(0.15)
+        scheduler._task.cancel()
+
+    asyncio.run(scenario())
+    assert runs == [{"startup": 1}, {"contract flow": 3, "queue change": 1}]
+
+
+def test_events_raised_by_the_recheck_itself_are_ignored_unless_forced():
+    scheduler = RecheckScheduler(None)
+
+    async def recheck(reasons):
+        scheduler.trigger("queue change")
+        scheduler.trigger("executed", force=True)
+
+    scheduler.recheck = recheck
+    asyncio.run(scheduler._run_once({"manual": 1}))
+    assert scheduler.pending == {"executed": 1}
+
+
+def test_heartbeat_backs_off_while_nothing_changes(monkeypatch):
+    monkeypatch.setattr(recheck_scheduler, "HEARTBEAT_MIN", 300)
+    monkeypatch.setattr(recheck_scheduler, "HEARTBEAT_MAX", 1200)
+    states = iter(["a", "a", "a", "a", "a", "b", "b"])
+
+    async def recheck(reasons):
+        return next(states)
+
+    scheduler = RecheckScheduler(recheck)
+    seen = []
+    for reasons in ({"startup": 1}, {"heartbeat": 1}, {"heartbeat": 1}, {"heartbeat": 1},
+                    {"manual": 1}, {"heartbeat": 1}, {"heartbeat": 1}):
+        asyncio.run(scheduler._run_once(reasons))
+        seen.append(scheduler.heartbeat)
+    # Doubles up to the cap, resets on an event and on a changed state
+    assert seen == [300, 600, 1200, 1200, 300, 300, 600]
+
+
+def test_failed_recheck_does_not_back_off(monkeypatch):
+    monkeypatch.setattr(recheck_scheduler, "HEARTBEAT_MIN", 300)
+
+    async def recheck(reasons):
+        raise RuntimeError("Safe API down")
+
+    scheduler = RecheckScheduler(recheck)
+    scheduler.heartbeat = 1200
+    asyncio.run(scheduler._run_once({"heartbeat": 1}))
+    assert scheduler.heartbeat == 300
+    assert scheduler.runs == 1
+
+
+def test_a_late_stage_times_out_but_keeps_running():
+    finished = []
+
+    async def slow_scan():
+        await asyncio.sleep(0.1)
+        finished.append("scan")
+        return "state"
+
+    async def scenario():
+        fast = await recheck_scheduler.run_stage("snapshot", asyncio.sleep(0, result="snapshot"), deadline=1)
+        late = await recheck_scheduler.run_stage("deposit scan", slow_scan(), deadline=0.01)
+        assert finished == []
+        await asyncio.sleep(0.15)  # Shielded: the scan still finishes (and would checkpoint)
+        return fast, late
+
+    assert asyncio.run(scenario()) == (("snapshot", False), (None, True))
+    assert finished == ["scan"]
@@ -0,0 +1,55 @@
+import pytest
+
+import signature_watcher
+from signature_watcher import SignatureWatcher
+
+
+def pending_tx(signature_count, nonce=7, safe_tx_hash="0xsafe7"):
+    return {"safeTxHash": safe_tx_hash, "nonce": nonce, "signature_count": signature_count, "confirmations_required": 3}
+
+
+@pytest.fixture
+def safe_api(monkeypatch):
+    """Scripted Gnosis API: each poll pops the next (status, data) and records the validators it was sent."""
+    responses, sent = [], []
+
+    def get_json_conditional(url, validators, **kwargs):
+        sent.append((url, dict(validators)))
+        status, data = responses.pop(0)
+        return status, data, {"etag": f"W/\"{len(sent)}\""} if status == "changed" else validators
+
+    monkeypatch.setattr(signature_watcher, "get_json_conditional", get_json_conditional)
+    return responses, sent
+
+
+def test_unchanged_response_keeps_the_target_and_its_validators(safe_api):
+    responses, sent = safe_api
+    watcher = SignatureWatcher(base_url="https://safe.invalid")
+    watcher.watch(pending_tx(2), amount=1_000)
+    responses += [("changed", {"confirmations": [{}, {}]}), ("unchanged", None)]
+
+    assert watcher.poll() is None
+    assert watcher.poll() is None
+    assert sent[1] == ("https://safe.invalid/api/v1/multisig-transactions/0xsafe7/", {"etag": 'W/"1"'})
+    assert (watcher.polls, watcher.unchanged) == (2, 1)
+    assert watcher.target["nonce"] == 7
+
+
+def test_reaching_the_threshold_hands_the_target_over_once(safe_api):
+    responses, _ = safe_api
+    watcher = SignatureWatcher(base_url="https://safe.invalid")
+    watcher.watch(pending_tx(2), amount=1_000)
+    responses.append(("changed", {"confirmations": [{}, {}, {}]}))
+
+    ready = watcher.poll()
+    assert (ready["nonce"], ready["amount"], ready["signature_count"]) == (7, 1_000, 3)
+    assert watcher.target is None
+    assert watcher.poll() is None  # Nothing is polled once the target is handed over
+
+
+def test_fully_signed_transactions_are_not_watched(safe_api):
+    watcher = SignatureWatcher(base_url="https://safe.invalid")
+    watcher.watch(pending_tx(3))
+    assert watcher.target is None
+    assert watcher.poll() is None
+    assert safe_api[1] == []